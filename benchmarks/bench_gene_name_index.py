@@ -0,0 +1,118 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Micro-benchmark comparing the per-row cost of locating V gene choices with a linear scan and the GeneNameIndex.
+
+Run with ImmunoProbs installed (or from the repository root with PYTHONPATH=.):
+
+    python benchmarks/bench_gene_name_index.py [num_rows]
+"""
+
+
+import sys
+import timeit
+
+import numpy
+import pandas
+
+from immuno_probs.model.default_models import get_default_model_file_paths
+from immuno_probs.model.gene_name_index import GeneNameIndex
+
+
+def linear_scan(genes, ref_genes, use_allele):
+    """Locates the given genes by scanning the reference gene names, as done before the GeneNameIndex was added.
+
+    Parameters
+    ----------
+    genes : list
+        Containing gene string values that need to be located.
+    ref_genes : list
+        Containing reference gene string values.
+    use_allele : bool
+        If True, the allele information from the input genes is used.
+
+    Returns
+    -------
+    tuple
+        A sorted tuple with the genes that where located in the reference genes list, like 'GeneNameIndex.locate'.
+
+    """
+    located_genes = set()
+    for name in genes:
+        name = name.split('*')
+        name[0] = name[0].split('-')
+        family, gene, allele = [None] * 3
+        if len(name[0]) == 2:
+            family, gene = name[0][0], name[0][1]
+        else:
+            family = name[0][0]
+        if len(name) == 2 and use_allele:
+            allele = name[1]
+        if family and not gene:
+            if allele:
+                located_genes.update([i for i in ref_genes if family in i and '*' + allele in i])
+            else:
+                located_genes.update([i for i in ref_genes if family in i])
+        elif family and gene:
+            if allele:
+                located_genes.update([i for i in ref_genes if family + '-' + gene in i and '*' + allele in i])
+            else:
+                located_genes.update([i for i in ref_genes if family + '-' + gene in i])
+    return tuple(sorted(located_genes))
+
+
+def main(num_rows=100000):
+    """Times both methods on randomly drawn gene choice strings for the build-in human T-cell beta model.
+
+    Parameters
+    ----------
+    num_rows : int, optional
+        The number of gene choice strings (rows) to resolve (default: 100000).
+
+    """
+    # Collect the reference V gene names and create gene choices with families, genes and alleles.
+    anchors = get_default_model_file_paths(name='human-t-beta')['v_anchors']
+    ref_genes = pandas.read_csv(anchors, sep='\t', header=0).iloc[:, 0].tolist()
+    tokens = sorted(set(
+        [i.split('*')[0].split('-')[0] for i in ref_genes]
+        + [i.split('*')[0] for i in ref_genes]
+        + ref_genes))
+    rng = numpy.random.RandomState(42)
+    choices = ['|'.join(rng.choice(tokens, size=rng.randint(1, 4), replace=False)) for _ in range(num_rows)]
+
+    # Time both methods and verify the results are identical.
+    start = timeit.default_timer()
+    expected = [linear_scan(i.split('|'), ref_genes, True) for i in choices]
+    scan_time = timeit.default_timer() - start
+    start = timeit.default_timer()
+    gene_index = GeneNameIndex(ref_genes)
+    located = [gene_index.locate(i, True) for i in choices]
+    index_time = timeit.default_timer() - start
+    start = timeit.default_timer()
+    memoized = [gene_index.locate(i, True) for i in choices]
+    memoized_time = timeit.default_timer() - start
+    assert located == expected == memoized
+
+    print('{} rows, {} reference genes, {} distinct choices'.format(num_rows, len(ref_genes), len(set(choices))))
+    print('linear scan:      {:8.3f} s ({:.2f} us/row)'.format(scan_time, 1e6 * scan_time / num_rows))
+    print('GeneNameIndex:    {:8.3f} s ({:.2f} us/row)'.format(index_time, 1e6 * index_time / num_rows))
+    print('memoized lookups: {:8.3f} s ({:.2f} us/row)'.format(memoized_time, 1e6 * memoized_time / num_rows))
+    print('speedup:          {:8.1f}x (first pass), {:.1f}x (memoized)'.format(
+        scan_time / index_time, scan_time / memoized_time))
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:]])
@@ -0,0 +1,109 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Micro-benchmark comparing the dynamic programming longest common substring with the suffix automaton lookups.
+
+CDR3 like sequences are created by joining the end of a V gene, random insertions and the start of a J gene from the
+build-in human T-cell beta reference genes. Each sequence is compared against its V and J gene, as done by the convert
+tool. Run with ImmunoProbs installed (or from the repository root with PYTHONPATH=.):
+
+    python benchmarks/bench_longest_substring.py [num_rows]
+"""
+
+
+import sys
+import timeit
+
+from Bio import SeqIO
+import numpy
+
+from immuno_probs.convert.adaptive_sequence_convertor import AdaptiveSequenceConvertor
+from immuno_probs.model.default_models import get_default_model_file_paths
+
+
+def dynamic_programming(full, partial):
+    """Finds the longest common substring the way AdaptiveSequenceConvertor did before using suffix automatons.
+
+    Parameters
+    ----------
+    full : str
+        A full length sequence string.
+    partial : str
+        A partial length sequence string to compare against the full length sequence.
+
+    Returns
+    -------
+    str
+        The longest substring from the compared input strings.
+
+    """
+    var_1 = [[0] * (1 + len(partial)) for i in range(1 + len(full))]
+    index_1, index_2 = 0, 0
+    for x in range(1, 1 + len(full)):
+        for y in range(1, 1 + len(partial)):
+            if full[x - 1] == partial[y - 1]:
+                var_1[x][y] = var_1[x - 1][y - 1] + 1
+                if var_1[x][y] > index_1:
+                    index_1 = var_1[x][y]
+                    index_2 = x
+            else:
+                var_1[x][y] = 0
+    return full[index_2 - index_1: index_2]
+
+
+def main(num_rows=2000):
+    """Times both methods on the V and J gene comparisons for randomly created CDR3 sequences.
+
+    Parameters
+    ----------
+    num_rows : int, optional
+        The number of CDR3 sequences (rows) to compare against their V and J gene (default: 2000).
+
+    """
+    # Collect the reference genes and create the CDR3 like sequences.
+    files = get_default_model_file_paths(name='human-t-beta')
+    ref_genes = {}
+    for gene in ['V', 'J']:
+        ref_genes[gene] = [str(i.seq).upper() for i in SeqIO.parse(files['reference'][gene], 'fasta')]
+    rng = numpy.random.RandomState(42)
+    pairs = []
+    for _ in range(num_rows):
+        v_gene = ref_genes['V'][rng.randint(len(ref_genes['V']))]
+        j_gene = ref_genes['J'][rng.randint(len(ref_genes['J']))]
+        cdr3 = (v_gene[-rng.randint(10, 30):]
+                + ''.join(rng.choice(list('ACGT'), size=rng.randint(0, 15)))
+                + j_gene[:rng.randint(10, 30)])
+        pairs.extend([(v_gene, cdr3), (j_gene, cdr3)])
+
+    # Time both methods and verify the results are identical.
+    start = timeit.default_timer()
+    expected = [dynamic_programming(full, partial) for full, partial in pairs]
+    dp_time = timeit.default_timer() - start
+    start = timeit.default_timer()
+    located = [AdaptiveSequenceConvertor.find_longest_substring(full, partial) for full, partial in pairs]
+    automaton_time = timeit.default_timer() - start
+    assert located == expected
+
+    print('{} rows, {} comparisons, {} V and {} J reference genes'.format(
+        num_rows, len(pairs), len(ref_genes['V']), len(ref_genes['J'])))
+    print('dynamic programming: {:8.3f} s ({:.2f} us/comparison)'.format(dp_time, 1e6 * dp_time / len(pairs)))
+    print('suffix automaton:    {:8.3f} s ({:.2f} us/comparison)'.format(
+        automaton_time, 1e6 * automaton_time / len(pairs)))
+    print('speedup:             {:8.1f}x'.format(dp_time / automaton_time))
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:]])
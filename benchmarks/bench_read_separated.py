@@ -0,0 +1,130 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark comparing the python engine reader with the C engine, dtype declared read_separated_to_dataframe.
+
+A separated file in the Adaptive export layout is generated (5 million rows by default) and read in with the columns the
+convert tool uses. Run with ImmunoProbs installed (or from the repository root with PYTHONPATH=.):
+
+    python benchmarks/bench_read_separated.py [num_rows]
+"""
+
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+import numpy
+import pandas
+
+from immuno_probs.util.io import read_separated_to_dataframe
+
+
+COLUMNS = ['nt_sequence', 'aa_sequence', 'frame_type', 'cdr3_length', 'v_resolved', 'j_resolved']
+
+
+def python_engine_reader(file, separator, cols):
+    """Reads the file the way read_separated_to_dataframe did before using the C engine.
+
+    Parameters
+    ----------
+    file : str
+        File path to be read in as dataframe.
+    separator : str
+        A separator character used for separating the fields in the file.
+    cols : list
+        Containing column names to keep.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The dataframe with the selected columns.
+
+    """
+    return pandas.read_csv(file, sep=separator, comment='#', header=0, usecols=lambda value: value in cols,
+                           na_values=['na', 'unknown', 'unresolved', 'no data'], engine='python')
+
+
+def generate_file(file, num_rows, seed=42):
+    """Writes a tab separated file with random Adaptive like sequence data.
+
+    Parameters
+    ----------
+    file : str
+        The file path to write to.
+    num_rows : int
+        The number of rows to generate.
+    seed : int, optional
+        The seed for the random number generator (default: 42).
+
+    """
+    rng = numpy.random.RandomState(seed)
+    bases = numpy.array(list('ACGT'))
+    v_genes = numpy.array(['TCRBV{:02d}-{:02d}*01'.format(i, j) for i in range(1, 31) for j in range(1, 4)] + ['unresolved'])
+    j_genes = numpy.array(['TCRBJ{:02d}-{:02d}*01'.format(i, j) for i in range(1, 3) for j in range(1, 8)])
+    block_size = 500000
+    for start in range(0, num_rows, block_size):
+        size = min(block_size, num_rows - start)
+        nt_seqs = bases[rng.randint(0, 4, size=(size, 87))].view('S87').ravel()
+        dataframe = pandas.DataFrame({
+            'nt_sequence': nt_seqs,
+            'aa_sequence': [i[:15] for i in nt_seqs],
+            'count (templates/reads)': rng.randint(1, 100, size=size),
+            'frame_type': numpy.array(['In', 'Out', 'Stop'])[rng.randint(0, 3, size=size)],
+            'cdr3_length': rng.randint(24, 60, size=size),
+            'v_resolved': v_genes[rng.randint(0, len(v_genes), size=size)],
+            'j_resolved': j_genes[rng.randint(0, len(j_genes), size=size)],
+        }, columns=['nt_sequence', 'aa_sequence', 'count (templates/reads)', 'frame_type', 'cdr3_length', 'v_resolved',
+                    'j_resolved'])
+        dataframe.to_csv(file, sep='\t', index=False, header=start == 0, mode='w' if start == 0 else 'a')
+
+
+def main(num_rows=5000000):
+    """Times both readers on a generated file.
+
+    Parameters
+    ----------
+    num_rows : int, optional
+        The number of rows in the generated file (default: 5000000).
+
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        file = os.path.join(directory, 'adaptive_export.tsv')
+        generate_file(file, num_rows)
+        print('{} rows, {:.1f} MB'.format(num_rows, os.path.getsize(file) / 1e6))
+
+        start = timeit.default_timer()
+        expected = python_engine_reader(file, '\t', COLUMNS)
+        python_time = timeit.default_timer() - start
+        start = timeit.default_timer()
+        result = read_separated_to_dataframe(file=file, separator='\t', cols=list(COLUMNS))
+        c_time = timeit.default_timer() - start
+        pandas.testing.assert_frame_equal(result.astype(object), expected.astype(object))
+
+        print('python engine:        {:8.2f} s, {:8.1f} MB in memory'.format(
+            python_time, expected.memory_usage(deep=True).sum() / 1e6))
+        print('C engine with dtypes: {:8.2f} s, {:8.1f} MB in memory'.format(
+            c_time, result.memory_usage(deep=True).sum() / 1e6))
+        print('speedup:              {:8.1f}x'.format(python_time / c_time))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:]])
@@ -23,10 +23,15 @@ import olga.generation_probability as olga_pgen
 import pandas
 import numpy
 
+from immuno_probs.util.cache import LRUCache
 from immuno_probs.util.conversion import nucleotides_to_aminoacids
 from immuno_probs.util.processing import multiprocess_array
 
 
+_WORKER_DATA = {}
+SEED_BLOCK_SIZE = 100
+
+
 class OlgaContainer(object):
     """Generates and/or evaluates CDR3 sequences using given an IGoR model.
 
@@ -46,19 +51,31 @@ class OlgaContainer(object):
         The name of the V gene choice column to use.
     j_gene_choice_col : str
         The name of the J gene choice column to use.
-
+    cache_size : int, optional
+        The maximum number of evaluated sequences to keep in an in-memory LRU cache that persists across calls of the
+        'evaluate' function (default: 0, no cache is used).
+    pgen_store : immuno_probs.util.cache.PgenStore, optional
+        A persistent store that is consulted for evaluated sequences not found in the in-memory cache, and to which new
+        results are written back (default: None, no store is used).
 
     Methods
     -------
-    generate(num_seqs)
+    generate_chunks(num_seqs, chunk_size, num_threads=1, seed=None)
+        Yields pandas.DataFrame chunks with nucleotide and aminoacid CDR3 sequences.
+    generate(num_seqs, num_threads=1, seed=None)
         Returns pandas.DataFrame with nucleotide and aminoacid CDR3 sequences.
     evaluate(seq, num_threads, use_allele=True, default_allele=None)
         Returns the generation probability value for the given sequences.
 
     """
-    def __init__(self, igor_model, nt_col, nt_p_col, aa_col, aa_p_col, v_gene_choice_col, j_gene_choice_col):
+    def __init__(self, igor_model, nt_col, nt_p_col, aa_col, aa_p_col, v_gene_choice_col, j_gene_choice_col,
+                 cache_size=0, pgen_store=None):
         super(OlgaContainer, self).__init__()
         self.igor_model = igor_model
+        self.cache = None
+        if cache_size > 0:
+            self.cache = LRUCache(max_size=cache_size)
+        self.pgen_store = pgen_store
         self.col_names = {
             'NT_COL': nt_col,
             'NT_P_COL': nt_p_col,
@@ -68,19 +85,13 @@ class OlgaContainer(object):
             'J_GENE_CHOICE_COL': j_gene_choice_col,
         }
 
-    def generate(self, num_seqs):
-        """Generate a given number of CDR3 sequences through OLGA.
-
-        Parameters
-        ----------
-        num_seqs : int
-            An integer specifying the number of sequences to generate.
+    def _load_generation_model(self):
+        """Private function for creating the OLGA sequence generation object for the model.
 
         Returns
         -------
-        pandas.DataFrame
-            Containing columns with sequence index, nucleotide CDR3 sequence, amino acid CDR3 sequence, the index of the
-            chosen V gene and the index of the chosen J gene.
+        SequenceGenerationVJ or SequenceGenerationVDJ OLGA object
+            The sequence generation object class for a VJ or VDJ model.
 
         Raises
         ------
@@ -88,90 +99,196 @@ class OlgaContainer(object):
             When the model type does not equal 'VDJ' or 'VJ'.
 
         """
-        # Create the dataframe and set the generation objects.
-        generated_seqs = pandas.DataFrame(
-            columns=[self.col_names['NT_COL'], self.col_names['AA_COL'],
-                     self.col_names['V_GENE_CHOICE_COL'],
-                     self.col_names['J_GENE_CHOICE_COL']])
-        seq_gen_model = None
         if self.igor_model.get_type() == "VDJ":
-            seq_gen_model = olga_seq_gen.SequenceGenerationVDJ(
+            return olga_seq_gen.SequenceGenerationVDJ(
                 self.igor_model.get_generative_model(),
                 self.igor_model.get_genomic_data())
-        elif self.igor_model.get_type() == "VJ":
-            seq_gen_model = olga_seq_gen.SequenceGenerationVJ(
+        if self.igor_model.get_type() == "VJ":
+            return olga_seq_gen.SequenceGenerationVJ(
                 self.igor_model.get_generative_model(),
                 self.igor_model.get_genomic_data())
-        else:
-            raise TypeError("OLGA could not create a SequenceGeneration object since model is not of type 'VDJ' or 'VJ'")
+        raise TypeError("OLGA could not create a SequenceGeneration object since model is not of type 'VDJ' or 'VJ'")
 
-        # Generate the sequences, add them to the dataframe and return.
-        for _ in range(num_seqs):
-            generated_seq = seq_gen_model.gen_rnd_prod_CDR3()
-            generated_seqs = generated_seqs.append({
-                self.col_names['NT_COL']: generated_seq[0],
-                self.col_names['AA_COL']: generated_seq[1],
-                self.col_names['V_GENE_CHOICE_COL']: self.igor_model.get_genomic_data().genV[generated_seq[2]][0],
-                self.col_names['J_GENE_CHOICE_COL']: self.igor_model.get_genomic_data().genJ[generated_seq[3]][0]
-            }, ignore_index=True)
-        return generated_seqs
+    def _load_evaluation_model(self):
+        """Private function for creating the OLGA generation probability object for the model.
 
-    @staticmethod
-    def _locate_genes(genes, ref_genes, use_allele, default_allele):
-        """Locates all the given gene values in the reference gene list.
+        Returns
+        -------
+        GenerationProbabilityVJ or GenerationProbabilityVDJ OLGA object
+            The generation probability object class for a VJ or VDJ model.
 
-        If a gene family value is specified instead of the whole gene (family + gene identifier), all possible genes within
-        that family are located.
+        Raises
+        ------
+        TypeError
+            When the model type does not equal 'VDJ' or 'VJ'.
+
+        """
+        if self.igor_model.get_type() == "VDJ":
+            return olga_pgen.GenerationProbabilityVDJ(
+                self.igor_model.get_generative_model(),
+                self.igor_model.get_genomic_data())
+        if self.igor_model.get_type() == "VJ":
+            return olga_pgen.GenerationProbabilityVJ(
+                self.igor_model.get_generative_model(),
+                self.igor_model.get_genomic_data())
+        raise TypeError("OLGA could not create a GenerationProbability object since model is not of type 'VDJ' or 'VJ'")
+
+    def _generate(self, args):
+        """Private function for generating CDR3 sequences by using OLGA.
+
+        The sequences are generated in blocks of 'SEED_BLOCK_SIZE' sequences, each block seeds the random number generator
+        with its own stream derived from the seed value and the block's position in the output. A range that starts halfway
+        a block first generates (and discards) the block's preceding sequences. This makes the output independent of the
+        worker that processes the range and of how the sequences are divided into ranges.
 
         Parameters
         ----------
-        genes : list
-            Containing gene string values that need to be located.
-        ref_genes : list
-            Containing reference gene string values.
-        use_allele : bool
-            If True, the allele information from the input genes is used instead of the 'default_allele' value.
-        default_allele : str
-            A default allele value to use when spliting gene choices, and 'use_allele' option is False.
+        args : list
+            The arguments from the 'multiprocess_array' function. Consists of an array with start position and number of
+            sequences pairs and additional kwargs like a SequenceGeneration object and the seed value.
 
         Returns
         -------
-        list
-            A list with the genes that where located in the reference genes list. If no genes where found, an empty list
-            is returned.
+        pandas.DataFrame
+            Containing columns with nucleotide CDR3 sequence, amino acid CDR3 sequence, the name of the chosen V gene and
+            the name of the chosen J gene.
 
         """
-        # For each given gene, split up the name into family, gene and allele.
-        located_genes = set()
-        allele = default_allele
-        for name in genes:
-            name = name.split('*')
-            name[0] = name[0].split('-')
-            family, gene, allele = [None] * 3
-            if len(name[0]) == 2:
-                family, gene = name[0][0], name[0][1]
+        # Set the arguments and the gene index to name arrays.
+        ary, kwargs = args
+        seq_gen_model = kwargs["model"]
+        seed = kwargs["seed"]
+        v_gene_names = numpy.array([i[0] for i in self.igor_model.get_genomic_data().genV], dtype=object)
+        j_gene_names = numpy.array([i[0] for i in self.igor_model.get_genomic_data().genJ], dtype=object)
+
+        generated_seqs = []
+        for start, num_seqs in ary:
+
+            # Seed the block's own stream and skip to the start position, or seed from system entropy when no seed given.
+            if seed is None:
+                numpy.random.seed()
             else:
-                family = name[0][0]
-            if len(name) == 2 and use_allele:
-                allele = name[1]
-
-            # Collect the subsection of the genes using the reference genes.
-            if family and not gene:
-                if allele:
-                    located_genes.update(
-                        [i for i in ref_genes
-                         if family in i and '*' + allele in i])
-                else:
-                    located_genes.update([i for i in ref_genes if family in i])
-            elif family and gene:
-                if allele:
-                    located_genes.update(
-                        [i for i in ref_genes
-                         if family + '-' + gene in i and '*' + allele in i])
-                else:
-                    located_genes.update(
-                        [i for i in ref_genes if family + '-' + gene in i])
-        return list(located_genes)
+                numpy.random.seed([seed, start // SEED_BLOCK_SIZE])
+                for _ in range(start % SEED_BLOCK_SIZE):
+                    seq_gen_model.gen_rnd_prod_CDR3()
+
+            # Generate the sequences into preallocated column arrays.
+            nt_seqs = numpy.empty(num_seqs, dtype=object)
+            aa_seqs = numpy.empty(num_seqs, dtype=object)
+            v_indices = numpy.empty(num_seqs, dtype=numpy.int64)
+            j_indices = numpy.empty(num_seqs, dtype=numpy.int64)
+            for i in range(num_seqs):
+                nt_seqs[i], aa_seqs[i], v_indices[i], j_indices[i] = seq_gen_model.gen_rnd_prod_CDR3()
+
+            # Build the dataframe once from the arrays.
+            generated_seqs.append(pandas.DataFrame({
+                self.col_names['NT_COL']: nt_seqs,
+                self.col_names['AA_COL']: aa_seqs,
+                self.col_names['V_GENE_CHOICE_COL']: v_gene_names[v_indices],
+                self.col_names['J_GENE_CHOICE_COL']: j_gene_names[j_indices],
+            }, columns=[self.col_names['NT_COL'], self.col_names['AA_COL'],
+                        self.col_names['V_GENE_CHOICE_COL'],
+                        self.col_names['J_GENE_CHOICE_COL']]))
+        return pandas.concat(generated_seqs, axis=0, ignore_index=True, copy=False)
+
+    def generate_chunks(self, num_seqs, chunk_size, num_threads=1, seed=None):
+        """Generate a given number of CDR3 sequences through OLGA in fixed-size chunks.
+
+        Each chunk is split across the worker processes and yielded as soon as it has been generated, so the memory usage
+        is bounded by the chunk size instead of the total number of sequences. The random number generator streams are
+        derived from the given seed and the position of the sequences in the output, so the output is identical for a given
+        seed regardless of the chunk size and number of threads. A chunk size that is a multiple of 'SEED_BLOCK_SIZE'
+        avoids generating discarded sequences at the chunk boundaries.
+
+        Parameters
+        ----------
+        num_seqs : int
+            An integer specifying the number of sequences to generate.
+        chunk_size : int
+            The maximum number of sequences in each of the yielded chunks.
+        num_threads : int, optional
+            The number of threads to use when generating the sequences (default: 1).
+        seed : int, optional
+            A master seed value between 0 and 2**32 - 1 for the random number generators (default: None, seeds the
+            generators from system entropy).
+
+        Yields
+        ------
+        pandas.DataFrame
+            Containing columns with nucleotide CDR3 sequence, amino acid CDR3 sequence, the name of the chosen V gene and
+            the name of the chosen J gene. The index continues over the chunks.
+
+        Raises
+        ------
+        TypeError
+            When the model type does not equal 'VDJ' or 'VJ'.
+        ValueError
+            When the given chunk size is smaller than 1.
+
+        """
+        # Check the model type and the chunk size, the generation objects are created by the workers.
+        if self.igor_model.get_type() not in ("VDJ", "VJ"):
+            raise TypeError("OLGA could not create a SequenceGeneration object since model is not of type 'VDJ' or 'VJ'")
+        if chunk_size < 1:
+            raise ValueError("The chunk size needs to be higher than zero", chunk_size)
+
+        for offset in range(0, num_seqs, chunk_size):
+
+            # Divide the sequences of the chunk at the seed block boundaries into ranges for the workers.
+            end = min(offset + chunk_size, num_seqs)
+            starts = [offset] + list(range((offset // SEED_BLOCK_SIZE + 1) * SEED_BLOCK_SIZE, end, SEED_BLOCK_SIZE))
+            ranges = [(start, stop - start) for start, stop in zip(starts, starts[1:] + [end])]
+
+            # Use multiprocessing to generate the sequences and yield the chunk.
+            result = multiprocess_array(
+                ary=ranges,
+                func=_generate_in_worker,
+                num_workers=num_threads,
+                initializer=_initialize_generate_worker,
+                initargs=(self.igor_model, self.col_names),
+                pool_key=(self.igor_model.get_fingerprint(), tuple(sorted(self.col_names.items()))),
+                seed=seed)
+            result = pandas.concat(result, axis=0, ignore_index=True, copy=False)
+            result.index += offset
+            yield result
+
+    def generate(self, num_seqs, num_threads=1, seed=None):
+        """Generate a given number of CDR3 sequences through OLGA.
+
+        The number of sequences is split across the worker processes. The random number generator streams are derived from
+        the given seed and the position of the sequences in the output, so the output is identical for a given seed
+        regardless of the number of threads, and equals the concatenated chunks of 'generate_chunks'.
+
+        Parameters
+        ----------
+        num_seqs : int
+            An integer specifying the number of sequences to generate.
+        num_threads : int, optional
+            The number of threads to use when generating the sequences (default: 1).
+        seed : int, optional
+            A master seed value between 0 and 2**32 - 1 for the random number generators (default: None, seeds the
+            generators from system entropy).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Containing columns with the nucleotide CDR3 sequence, amino acid CDR3 sequence, the name of the chosen V gene
+            and the name of the chosen J gene, with a range index.
+
+        Raises
+        ------
+        TypeError
+            When the model type does not equal 'VDJ' or 'VJ'.
+
+        """
+        # Generate all of the sequences as a single chunk and return.
+        result = list(self.generate_chunks(num_seqs=num_seqs, chunk_size=max(num_seqs, 1),
+                                           num_threads=num_threads, seed=seed))
+        if not result:
+            return pandas.DataFrame(columns=[self.col_names['NT_COL'], self.col_names['AA_COL'],
+                                             self.col_names['V_GENE_CHOICE_COL'],
+                                             self.col_names['J_GENE_CHOICE_COL']])
+        return result[0]
 
     def _evaluate(self, args):
         """Private function for evaluating a given nucleotide CDR3 sequence by using OLGA.
@@ -180,85 +297,63 @@ class OlgaContainer(object):
         ----------
         args : list
             The arguments from the 'multiprocess_array' function. Consists of an pandas.DataFrame and additional kwargs like
-            a GenerationProbability object, the column name containing the nucleotide sequences and value to use as allele information.
+            a GenerationProbability object and whether to use the allele information of the gene choices.
 
         Returns
         -------
         pandas.DataFrame
-            Containing columns sequence index number, the generation probability of nucleotide sequence if given and the
-            generation probability of aminoacid sequence if given.
+            Containing columns sequence index number, the float64 generation probability of nucleotide sequence if given and
+            the float64 generation probability of aminoacid sequence if given (NaN otherwise).
 
         """
-        # Set the arguments and pandas.DataFrame.
+        # Set the arguments and collect the columns as arrays, missing columns are filled with None values.
         ary, kwargs = args
         model = kwargs["model"]
         use_allele = kwargs["use_allele"]
-        default_allele = kwargs["default_allele"]
-        ref_genes_v = [i[0] for i in self.igor_model.get_genomic_data().genV]
-        ref_genes_j = [i[0] for i in self.igor_model.get_genomic_data().genJ]
-        pgen_seqs = pandas.DataFrame(
-            index=ary.index.tolist(),
-            columns=[self.col_names['NT_P_COL'], self.col_names['AA_P_COL']])
+        v_gene_index = self.igor_model.get_gene_index('V')
+        j_gene_index = self.igor_model.get_gene_index('J')
+        nt_seqs, aa_seqs, v_choices, j_choices = [
+            ary[self.col_names[i]].astype(object).values if self.col_names[i] in ary.columns
+            else numpy.full(len(ary), None, dtype=object)
+            for i in ['NT_COL', 'AA_COL', 'V_GENE_CHOICE_COL', 'J_GENE_CHOICE_COL']]
 
-        for i, row in ary.iterrows():
+        # Evaluate each row and write the values into preallocated arrays.
+        nt_pgen = numpy.full(len(ary), numpy.nan, dtype=numpy.float64)
+        aa_pgen = numpy.full(len(ary), numpy.nan, dtype=numpy.float64)
+        for i in range(len(ary)):
 
-            # Evaluate the sequences with V/J gene columns.
-            if ((self.col_names['V_GENE_CHOICE_COL'] in ary.columns
-                 and isinstance(row[self.col_names['V_GENE_CHOICE_COL']], str))
-                    and (self.col_names['J_GENE_CHOICE_COL'] in ary.columns
-                         and isinstance(row[self.col_names['J_GENE_CHOICE_COL']], str))):
+            # Evaluate the sequences with V/J gene choices.
+            if isinstance(v_choices[i], str) and isinstance(j_choices[i], str):
 
                 # Create all V/J gene combinations for pgen calculation.
-                located_v = self._locate_genes(
-                    genes=row[self.col_names['V_GENE_CHOICE_COL']].split('|'),
-                    ref_genes=ref_genes_v, use_allele=use_allele,
-                    default_allele=default_allele)
-                located_j = self._locate_genes(
-                    genes=row[self.col_names['J_GENE_CHOICE_COL']].split('|'),
-                    ref_genes=ref_genes_j, use_allele=use_allele,
-                    default_allele=default_allele)
-                permutations = [(v, j) for v in located_v for j in located_j]
-
-                # For the nucleotide sequence if exists.
-                if (self.col_names['NT_COL'] in ary.columns
-                        and isinstance(row[self.col_names['NT_COL']], str)):
-                    sum_pgen = 0
-                    for v_gene, j_gene in permutations:
-                        sum_pgen += model.compute_nt_CDR3_pgen(
-                            row[self.col_names['NT_COL']], v_gene, j_gene)
-                    pgen_seqs.loc[i, :][self.col_names['NT_P_COL']] = sum_pgen
-
-                # For the amino acid sequence if exists.
-                if (self.col_names['AA_COL'] in ary.columns
-                        and isinstance(row[self.col_names['AA_COL']], str)):
-                    sum_pgen = 0
-                    for v_gene, j_gene in permutations:
-                        sum_pgen += model.compute_aa_CDR3_pgen(
-                            row[self.col_names['AA_COL']], v_gene, j_gene)
-                    pgen_seqs.loc[i, :][self.col_names['AA_P_COL']] = sum_pgen
-
-            # If no V/J gene choice column, use less complicated method.
+                permutations = [(v, j)
+                                for v in v_gene_index.locate(choice=v_choices[i], use_allele=use_allele)
+                                for j in j_gene_index.locate(choice=j_choices[i], use_allele=use_allele)]
+                if isinstance(nt_seqs[i], str):
+                    nt_pgen[i] = sum(model.compute_nt_CDR3_pgen(nt_seqs[i], v, j) for v, j in permutations)
+                if isinstance(aa_seqs[i], str):
+                    aa_pgen[i] = sum(model.compute_aa_CDR3_pgen(aa_seqs[i], v, j) for v, j in permutations)
+
+            # If no V/J gene choices, use less complicated method.
             else:
+                if isinstance(nt_seqs[i], str):
+                    nt_pgen[i] = model.compute_nt_CDR3_pgen(nt_seqs[i])
+                if isinstance(aa_seqs[i], str):
+                    aa_pgen[i] = model.compute_aa_CDR3_pgen(aa_seqs[i])
 
-                # For the nucleotide sequence if exists.
-                if (self.col_names['NT_COL'] in ary.columns
-                        and isinstance(row[self.col_names['NT_COL']], str)):
-                    pgen_seqs.loc[i, :][self.col_names['NT_P_COL']] = \
-                        model.compute_nt_CDR3_pgen(row[self.col_names['NT_COL']])
-
-                # For the amino acid sequence if exists.
-                if (self.col_names['AA_COL'] in ary.columns
-                        and isinstance(row[self.col_names['AA_COL']], str)):
-                    pgen_seqs.loc[i, :][self.col_names['AA_P_COL']] = \
-                        model.compute_aa_CDR3_pgen(row[self.col_names['AA_COL']])
-        return pgen_seqs
+        # Build the output dataframe from the arrays.
+        return pandas.DataFrame({
+            self.col_names['NT_P_COL']: nt_pgen,
+            self.col_names['AA_P_COL']: aa_pgen,
+        }, index=ary.index, columns=[self.col_names['NT_P_COL'], self.col_names['AA_P_COL']])
 
     def evaluate(self, seqs, num_threads, use_allele=True, default_allele=None):
         """Evaluate a given nucleotide CDR3 sequences using OLGA.
 
         This function also checks if the given input sequence file contains the gene index columns for the V and J gene.
         If so, then the V and J gene masks in these columns are used to increase calculation accuracy of the generation
-        probabality values.
+        probabality values. Rows with the same sequences and V/J gene masks are only evaluated once, and the results are
+        looked up in (and added to) the container's cache and persistent Pgen store if enabled.
 
         Parameters
         ----------
@@ -267,9 +362,10 @@ class OlgaContainer(object):
         num_threads : int
             The number of threads to use when processing the sequences.
         use_allele : bool, optional
-            If True, the allele information from the input genes is used instead of the 'default_allele' value (default: True).
+            If True, the allele information from the input genes is used to select the reference genes (default: True).
         default_allele : str, optional
-            A default allele value to use when spliting gene choices, and 'use_allele' option is False (default: None).
+            Not used, the genes of all alleles are located when the 'use_allele' option is False or the gene choice has no
+            allele. Kept for compatibility with the 'DEFAULT_ALLELE' option (default: None).
 
         Returns
         -------
@@ -283,17 +379,8 @@ class OlgaContainer(object):
             When the model type does not equal 'VDJ' or 'VJ'.
 
         """
-        # Set the evaluation objects.
-        pgen_model = None
-        if self.igor_model.get_type() == "VDJ":
-            pgen_model = olga_pgen.GenerationProbabilityVDJ(
-                self.igor_model.get_generative_model(),
-                self.igor_model.get_genomic_data())
-        elif self.igor_model.get_type() == "VJ":
-            pgen_model = olga_pgen.GenerationProbabilityVJ(
-                self.igor_model.get_generative_model(),
-                self.igor_model.get_genomic_data())
-        else:
+        # Check the model type, the evaluation objects are created in the worker processes.
+        if self.igor_model.get_type() not in ["VDJ", "VJ"]:
             raise TypeError("OLGA could not create a GenerationProbability object since model is not of type 'VDJ' or 'VJ'")
 
         # Insert amino acid sequence column if not existent.
@@ -304,13 +391,161 @@ class OlgaContainer(object):
             seqs[self.col_names['AA_COL']] = seqs[self.col_names['NT_COL']] \
                 .apply(nucleotides_to_aminoacids)
 
-        # Use multiprocessing to evaluate the sequences in chunks and return.
-        result = multiprocess_array(
-            ary=seqs,
-            func=self._evaluate,
-            num_workers=num_threads,
-            model=pgen_model,
-            use_allele=use_allele,
-            default_allele=default_allele)
-        result = pandas.concat(result, axis=0, copy=False)
+        # Deduplicate the rows by their sequences and V/J gene masks, the keys have a fixed NT/AA/V/J slot layout with
+        # None values for missing columns so keys from inputs with different columns do not collide.
+        all_cols = [self.col_names['NT_COL'], self.col_names['AA_COL'],
+                    self.col_names['V_GENE_CHOICE_COL'], self.col_names['J_GENE_CHOICE_COL']]
+        key_cols = [i for i in all_cols if i in seqs.columns]
+        key_values = [seqs[i].astype(object).where(seqs[i].notnull(), None).values if i in seqs.columns
+                      else numpy.full(len(seqs), None, dtype=object) for i in all_cols]
+        keys = list(zip(*key_values))
+        codes, unique_keys = pandas.factorize(pandas.Series(keys, dtype=object))
+        first_rows = numpy.unique(codes, return_index=True)[1]
+
+        # Collect the cached values and the unique rows that still need to be evaluated.
+        settings = (use_allele,)
+        nt_pgen = numpy.full(len(unique_keys), numpy.nan)
+        aa_pgen = numpy.full(len(unique_keys), numpy.nan)
+        missing = []
+        for i, key in enumerate(unique_keys):
+            cached = None
+            if self.cache is not None:
+                cached = self.cache.get(settings + key)
+            if cached is None:
+                missing.append(i)
+            else:
+                nt_pgen[i], aa_pgen[i] = cached
+
+        # Look up the remaining rows in the persistent store, keyed by the model's fingerprint.
+        if self.pgen_store is not None and missing:
+            fingerprint = self.igor_model.get_fingerprint()
+            stored = self.pgen_store.get_many(fingerprint, [settings + unique_keys[i] for i in missing])
+            remaining = []
+            for i in missing:
+                if settings + unique_keys[i] in stored:
+                    nt_pgen[i], aa_pgen[i] = stored[settings + unique_keys[i]]
+                    if self.cache is not None:
+                        self.cache.put(settings + unique_keys[i], (nt_pgen[i], aa_pgen[i]))
+                else:
+                    remaining.append(i)
+            missing = remaining
+
+        # Use multiprocessing to evaluate the missing unique rows in chunks.
+        if missing:
+            result = multiprocess_array(
+                ary=seqs.iloc[first_rows[missing]][key_cols].reset_index(drop=True),
+                func=_evaluate_in_worker,
+                num_workers=num_threads,
+                initializer=_initialize_evaluate_worker,
+                initargs=(self.igor_model, self.col_names),
+                pool_key=(self.igor_model.get_fingerprint(), tuple(sorted(self.col_names.items()))),
+                use_allele=use_allele)
+            result = pandas.concat(result, axis=0, copy=False).reindex(range(len(missing)))
+            nt_pgen[missing] = result[self.col_names['NT_P_COL']].values
+            aa_pgen[missing] = result[self.col_names['AA_P_COL']].values
+            if self.cache is not None:
+                for i in missing:
+                    self.cache.put(settings + unique_keys[i], (nt_pgen[i], aa_pgen[i]))
+            if self.pgen_store is not None:
+                self.pgen_store.put_many(fingerprint, [(settings + unique_keys[i], nt_pgen[i], aa_pgen[i])
+                                                       for i in missing])
+
+        # Scatter the unique values back to every row and return.
+        result = pandas.DataFrame({
+            self.col_names['NT_P_COL']: nt_pgen[codes],
+            self.col_names['AA_P_COL']: aa_pgen[codes],
+        }, index=seqs.index, columns=[self.col_names['NT_P_COL'], self.col_names['AA_P_COL']])
         return result
+
+
+def _initialize_evaluate_worker(igor_model, col_names):
+    """Initializes a worker process by creating its own OlgaContainer and OLGA generation probability object.
+
+    The objects are stored in the module's global '_WORKER_DATA' dictionary, so the tasks send to the worker only need to
+    contain the sequences to evaluate.
+
+    Parameters
+    ----------
+    igor_model : immuno_probs.model.igor_loader.IgorLoader
+        IgorLoader object containing the loaded IGoR VJ or VDJ model.
+    col_names : dict
+        Containing the column names of the parent OlgaContainer object.
+
+    """
+    container = OlgaContainer(
+        igor_model=igor_model,
+        nt_col=col_names['NT_COL'],
+        nt_p_col=col_names['NT_P_COL'],
+        aa_col=col_names['AA_COL'],
+        aa_p_col=col_names['AA_P_COL'],
+        v_gene_choice_col=col_names['V_GENE_CHOICE_COL'],
+        j_gene_choice_col=col_names['J_GENE_CHOICE_COL'])
+    _WORKER_DATA['container'] = container
+    _WORKER_DATA['model'] = container._load_evaluation_model()
+
+
+def _evaluate_in_worker(args):
+    """Evaluates a chunk of CDR3 sequences with the OlgaContainer and model of the worker process.
+
+    Parameters
+    ----------
+    args : list
+        The arguments from the 'multiprocess_array' function. Consists of an pandas.DataFrame and additional kwargs with
+        the value to use as allele information.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Containing the generation probability columns for the nucleotide and aminoacid sequences.
+
+    """
+    ary, kwargs = args
+    kwargs = dict(kwargs, model=_WORKER_DATA['model'])
+    return _WORKER_DATA['container']._evaluate((ary, kwargs))
+
+
+def _initialize_generate_worker(igor_model, col_names):
+    """Initializes a worker process by creating its own OlgaContainer and OLGA sequence generation object.
+
+    The objects are stored in the module's global '_WORKER_DATA' dictionary, so the tasks send to the worker only need to
+    contain the start positions, number of sequences and seed value.
+
+    Parameters
+    ----------
+    igor_model : immuno_probs.model.igor_loader.IgorLoader
+        IgorLoader object containing the loaded IGoR VJ or VDJ model.
+    col_names : dict
+        Containing the column names of the parent OlgaContainer object.
+
+    """
+    container = OlgaContainer(
+        igor_model=igor_model,
+        nt_col=col_names['NT_COL'],
+        nt_p_col=col_names['NT_P_COL'],
+        aa_col=col_names['AA_COL'],
+        aa_p_col=col_names['AA_P_COL'],
+        v_gene_choice_col=col_names['V_GENE_CHOICE_COL'],
+        j_gene_choice_col=col_names['J_GENE_CHOICE_COL'])
+    _WORKER_DATA['container'] = container
+    _WORKER_DATA['model'] = container._load_generation_model()
+
+
+def _generate_in_worker(args):
+    """Generates the CDR3 sequences of the given chunks with the OlgaContainer and model of the worker process.
+
+    Parameters
+    ----------
+    args : list
+        The arguments from the 'multiprocess_array' function. Consists of an array with start position and number of
+        sequences pairs and additional kwargs with the seed value.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Containing columns with nucleotide CDR3 sequence, amino acid CDR3 sequence, the name of the chosen V gene and
+        the name of the chosen J gene.
+
+    """
+    ary, kwargs = args
+    kwargs = dict(kwargs, model=_WORKER_DATA['model'])
+    return _WORKER_DATA['container']._generate((ary, kwargs))
@@ -30,8 +30,9 @@ from immuno_probs.cli.convert_adaptive_sequences import ConvertAdaptiveSequences
 from immuno_probs.cli.evaluate_sequences import EvaluateSequences
 from immuno_probs.cli.locate_cdr3_anchors import LocateCdr3Anchors
 from immuno_probs.util.cli import dynamic_cli_options
-from immuno_probs.util.constant import set_num_threads, set_separator, set_working_dir, set_out_name, set_config_data, get_config_data
+from immuno_probs.util.constant import set_num_threads, set_separator, set_output_format, set_working_dir, set_out_name, set_config_data, get_config_data
 from immuno_probs.util.io import create_directory_path
+from immuno_probs.util.processing import close_shared_pools
 
 
 def main():
@@ -53,6 +54,13 @@ def main():
                     '(default: {}).'.format(
                         {'\t': 'tab', ';': 'semi-colon', ',': 'comma'}[get_config_data('COMMON', 'SEPARATOR')])
         },
+        '-output-format': {
+            'type': 'str.lower',
+            'choices': ['separated', 'parquet', 'feather'],
+            'help': 'The file format for writing the output files of the convert, generate and evaluate tools, the columnar '
+                    'formats keep the column types (select one: %(choices)s) (default: {}).'.format(
+                        get_config_data('COMMON', 'OUTPUT_FORMAT'))
+        },
         '-threads': {
             'type': 'int',
             'nargs': '?',
@@ -104,6 +112,8 @@ def main():
             set_config_data(parsed_arguments.config_file)
         if parsed_arguments.separator is not None:
             set_separator(parsed_arguments.separator)
+        if parsed_arguments.output_format is not None:
+            set_output_format(parsed_arguments.output_format)
         if parsed_arguments.threads is not None:
             set_num_threads(parsed_arguments.threads)
         if parsed_arguments.set_wd is not None:
@@ -142,6 +152,9 @@ def main():
     else:
         logger.error('No tool selected, run help command to show all supported tools')
 
+    # Shut down the worker processes that have been used by the tool.
+    close_shared_pools()
+
     # Finally, delete the temporary directory if specified.
     if get_config_data('EXPERT', 'REMOVE_TEMP_DIR', 'bool'):
         logger.info('Cleaning up working directory')
@@ -24,9 +24,10 @@ from shutil import copy2
 
 from immuno_probs.model.default_models import get_default_model_file_paths
 from immuno_probs.model.igor_interface import IgorInterface
+from immuno_probs.util.cache import get_cache_dir
 from immuno_probs.util.cli import dynamic_cli_options
 from immuno_probs.util.constant import get_config_data
-from immuno_probs.util.io import preprocess_separated_file, preprocess_reference_file, is_fasta, is_separated, copy_to_dir
+from immuno_probs.util.io import preprocess_separated_file, preprocess_reference_file, detect_input_file, copy_to_dir
 
 
 class BuildIgorModel(object):
@@ -155,8 +156,9 @@ class BuildIgorModel(object):
             for i in args.ref:
                 filename = preprocess_reference_file(
                     os.path.join(working_dir, 'genomic_templates'),
-                    copy_to_dir(working_dir, i[1], 'fasta'),
-                    1
+                    i[1],
+                    1,
+                    cache_dir=get_cache_dir('reference_templates')
                 )
                 ref_list.append([i[0], filename])
             command_list.append(ref_list)
@@ -180,18 +182,24 @@ class BuildIgorModel(object):
         # Add the sequence command after pre-processing of the input file.
         self.logger.info('Pre-processing input sequence file (4/5)')
         try:
-            if is_fasta(args.seqs):
+            input_reader = detect_input_file(args.seqs, get_config_data('COMMON', 'SEPARATOR'))
+            if input_reader is None:
+                self.logger.error(
+                    'Given input sequence file could not be detected as '
+                    'FASTA file or separated data type')
+                return
+            if input_reader.is_fasta():
                 self.logger.info('FASTA input file extension detected')
                 command_list.append([
                     'read_seqs',
                     copy_to_dir(working_dir, str(args.seqs), 'fasta')
                 ])
-            elif is_separated(args.seqs, get_config_data('COMMON', 'SEPARATOR')):
+            elif input_reader.is_separated():
                 self.logger.info('Separated input file type detected')
                 try:
                     input_seqs = preprocess_separated_file(
                         os.path.join(working_dir, 'input'),
-                        copy_to_dir(working_dir, str(args.seqs), 'csv'),
+                        str(args.seqs),
                         get_config_data('COMMON', 'SEPARATOR'),
                         ';',
                         get_config_data('COMMON', 'I_COL'),
@@ -203,11 +211,6 @@ class BuildIgorModel(object):
                         "Given input sequence file does not have a '%s' column",
                         get_config_data('COMMON', 'NT_COL'))
                     return
-            else:
-                self.logger.error(
-                    'Given input sequence file could not be detected as '
-                    'FASTA file or separated data type')
-                return
         except (IOError, KeyError) as err:
             self.logger.error(str(err))
             return
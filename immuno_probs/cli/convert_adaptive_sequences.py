@@ -24,9 +24,11 @@ import os
 import pandas
 
 from immuno_probs.convert.adaptive_sequence_convertor import AdaptiveSequenceConvertor
+from immuno_probs.util.cache import get_cache_dir
 from immuno_probs.util.cli import dynamic_cli_options
 from immuno_probs.util.constant import get_config_data
-from immuno_probs.util.io import copy_to_dir, preprocess_reference_file, write_dataframe_to_separated, read_fasta_as_dataframe, read_separated_to_dataframe
+from immuno_probs.util.io import preprocess_reference_file, write_dataframe_to_file, read_fasta_as_dataframe, \
+    read_separated_to_dataframe, strip_compression_extension
 
 
 class ConvertAdaptiveSequences(object):
@@ -84,6 +86,13 @@ class ConvertAdaptiveSequences(object):
                 'help': "Number of random sequences (subset) to convert from the given file (default: {})."
                         .format(get_config_data('CONVERT', 'NUM_RANDOM', 'int'))
             },
+            '-seed': {
+                'type': 'int',
+                'nargs': '?',
+                'help': 'A seed value for the random subset of sequences and the order of the converted sequences, given the '
+                        'same seed the converted sequences are identical (default: {}).'
+                        .format(get_config_data('CONVERT', 'SEED'))
+            },
             '-use-allele': {
                 'action': 'store_true',
                 'help': "If specified (True), the allele information from the resolved gene fields are used to when "
@@ -140,7 +149,8 @@ class ConvertAdaptiveSequences(object):
             for gene in args.ref:
                 filename = preprocess_reference_file(
                     os.path.join(working_dir, 'genomic_templates'),
-                    copy_to_dir(working_dir, gene[1], 'fasta'),
+                    gene[1],
+                    cache_dir=get_cache_dir('reference_templates')
                 )
                 if gene[0] == 'V':
                     v_gene_df = self._process_gene_df(
@@ -156,9 +166,17 @@ class ConvertAdaptiveSequences(object):
             self.logger.error(str(err))
             return
 
-        # Read in the sequence data.
+        # Read in the sequence data, in chunks when taking a random subsample of sequences in the file.
         self.logger.info('Pre-processing input sequence file')
         try:
+            n_random = get_config_data('CONVERT', 'NUM_RANDOM', 'int')
+            if args.n_random:
+                n_random = args.n_random
+            seed = get_config_data('CONVERT', 'SEED')
+            if args.seed is not None:
+                seed = args.seed
+            if seed is not None:
+                seed = int(seed)
             seqs_df = read_separated_to_dataframe(
                 file=args.seqs,
                 separator=get_config_data('COMMON', 'SEPARATOR'),
@@ -167,18 +185,8 @@ class ConvertAdaptiveSequences(object):
                       get_config_data('COMMON', 'FRAME_TYPE_COL'),
                       get_config_data('COMMON', 'CDR3_LENGTH_COL'),
                       get_config_data('COMMON', 'V_RESOLVED_COL'),
-                      get_config_data('COMMON', 'J_RESOLVED_COL')])
-
-            # Take a random subsample of sequences in the file.
-            n_random = get_config_data('CONVERT', 'NUM_RANDOM', 'int')
-            if args.n_random:
-                n_random = args.n_random
-            if n_random != 0:
-                if len(seqs_df) < n_random:
-                    self.logger.warning(
-                        'Number of random sequences is higher then number of '
-                        'rows in file, all rows are used')
-                    return
+                      get_config_data('COMMON', 'J_RESOLVED_COL')],
+                chunksize=get_config_data('CONVERT', 'CHUNK_SIZE', 'int') if n_random > 0 else None)
         except (IOError, KeyError, ValueError) as err:
             self.logger.error(str(err))
             return
@@ -206,16 +214,18 @@ class ConvertAdaptiveSequences(object):
                 j_gene_choice_col=get_config_data('COMMON', 'J_GENE_CHOICE_COL'),
                 use_allele=use_allele,
                 default_allele=get_config_data('CONVERT', 'DEFAULT_ALLELE'),
-                n_random=n_random)
-            cdr3_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'),
-                           os.path.splitext(os.path.basename(args.seqs))[0])
-            full_prod_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'),
-                                os.path.splitext(os.path.basename(args.seqs))[0])
-            full_unprod_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'),
-                                  os.path.splitext(os.path.basename(args.seqs))[0])
-            full_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'),
-                           os.path.splitext(os.path.basename(args.seqs))[0])
-        except KeyError as err:
+                n_random=n_random,
+                seed=seed)
+            if len(full_prod_df) < n_random:
+                self.logger.warning('Number of random sequences is higher than the number of sequences that could be '
+                                    'converted, %s productive and unproductive sequences are used', len(full_prod_df))
+            self.logger.info('Reassembly template cache: %s hits, %s misses', asc.template_hits, asc.template_misses)
+            file_name_id = os.path.splitext(os.path.basename(strip_compression_extension(args.seqs)))[0]
+            cdr3_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'), file_name_id)
+            full_prod_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'), file_name_id)
+            full_unprod_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'), file_name_id)
+            full_df.insert(0, get_config_data('COMMON', 'FILE_NAME_ID_COL'), file_name_id)
+        except (IOError, KeyError, ValueError) as err:
             self.logger.error(str(err))
             return
 
@@ -225,35 +235,43 @@ class ConvertAdaptiveSequences(object):
             output_prefix = get_config_data('COMMON', 'OUT_NAME')
             if not output_prefix:
                 output_prefix = 'converted'
-            _, filename_1 = write_dataframe_to_separated(
+            _, filename_1 = write_dataframe_to_file(
                 dataframe=cdr3_df,
                 filename='{}_CDR3'.format(output_prefix),
                 directory=output_dir,
+                file_format=get_config_data('COMMON', 'OUTPUT_FORMAT'),
                 separator=get_config_data('COMMON', 'SEPARATOR'),
-                index_name=get_config_data('COMMON', 'I_COL'))
+                index_name=get_config_data('COMMON', 'I_COL'),
+                compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
             self.logger.info("Written '%s'", filename_1)
-            _, filename_2 = write_dataframe_to_separated(
+            _, filename_2 = write_dataframe_to_file(
                 dataframe=full_prod_df,
                 filename='{}_full_length_productive'.format(output_prefix),
                 directory=output_dir,
+                file_format=get_config_data('COMMON', 'OUTPUT_FORMAT'),
                 separator=get_config_data('COMMON', 'SEPARATOR'),
-                index_name=get_config_data('COMMON', 'I_COL'))
+                index_name=get_config_data('COMMON', 'I_COL'),
+                compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
             self.logger.info("Written '%s'", filename_2)
-            _, filename_3 = write_dataframe_to_separated(
+            _, filename_3 = write_dataframe_to_file(
                 dataframe=full_unprod_df,
                 filename='{}_full_length_unproductive'.format(output_prefix),
                 directory=output_dir,
+                file_format=get_config_data('COMMON', 'OUTPUT_FORMAT'),
                 separator=get_config_data('COMMON', 'SEPARATOR'),
-                index_name=get_config_data('COMMON', 'I_COL'))
+                index_name=get_config_data('COMMON', 'I_COL'),
+                compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
             self.logger.info("Written '%s'", filename_3)
-            _, filename_4 = write_dataframe_to_separated(
+            _, filename_4 = write_dataframe_to_file(
                 dataframe=full_df,
                 filename='{}_full_length'.format(output_prefix),
                 directory=output_dir,
+                file_format=get_config_data('COMMON', 'OUTPUT_FORMAT'),
                 separator=get_config_data('COMMON', 'SEPARATOR'),
-                index_name=get_config_data('COMMON', 'I_COL'))
+                index_name=get_config_data('COMMON', 'I_COL'),
+                compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
             self.logger.info("Written '%s'", filename_4)
-        except IOError as err:
+        except (IOError, ImportError, ValueError) as err:
             self.logger.error(str(err))
             return
 
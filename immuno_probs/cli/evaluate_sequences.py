@@ -20,6 +20,7 @@
 
 import logging
 import os
+import sqlite3
 import sys
 
 import numpy
@@ -28,10 +29,11 @@ from immuno_probs.cdr3.olga_container import OlgaContainer
 from immuno_probs.model.default_models import get_default_model_file_paths
 from immuno_probs.model.igor_interface import IgorInterface
 from immuno_probs.model.igor_loader import IgorLoader
+from immuno_probs.util.cache import get_cache_dir, PgenStore
 from immuno_probs.util.cli import dynamic_cli_options
 from immuno_probs.util.conversion import nucleotides_to_aminoacids
 from immuno_probs.util.constant import get_config_data
-from immuno_probs.util.io import read_separated_to_dataframe, read_fasta_as_dataframe, write_dataframe_to_separated, preprocess_separated_file, preprocess_reference_file, is_fasta, is_separated, copy_to_dir
+from immuno_probs.util.io import read_separated_to_dataframe, write_dataframe_to_separated, write_dataframe_to_file, ColumnarFileWriter, append_dataframe_to_separated, preprocess_separated_file, preprocess_reference_file, detect_input_file, copy_to_dir
 
 
 class EvaluateSequences(object):
@@ -122,6 +124,13 @@ class EvaluateSequences(object):
                         "choice fields is used to calculate the generation probability (default: {})."
                         .format(get_config_data('EVALUATE', 'USE_ALLELE', 'bool'))
             },
+            '-pgen-store': {
+                'metavar': '<sqlite>',
+                'type': 'str',
+                'help': "An SQLite file for storing the evaluated CDR3 sequences, used with '-cdr3' for reusing the "
+                        "generation probabilities of earlier runs with the same model (default: {})."
+                        .format(get_config_data('EVALUATE', 'PGEN_STORE'))
+            },
         }
 
         # Add the options to the parser and return the updated parser.
@@ -179,8 +188,9 @@ class EvaluateSequences(object):
                     for i in args.ref:
                         filename = preprocess_reference_file(
                             os.path.join(working_dir, 'genomic_templates'),
-                            copy_to_dir(working_dir, i[1], 'fasta'),
-                            1
+                            i[1],
+                            1,
+                            cache_dir=get_cache_dir('reference_templates')
                         )
                         ref_list.append([i[0], filename])
                     command_list.append(ref_list)
@@ -191,28 +201,29 @@ class EvaluateSequences(object):
             # Add the sequence command after pre-processing of the input file.
             self.logger.info('Pre-processing input sequence file (3/4)')
             try:
-                if is_fasta(args.seqs):
+                input_reader = detect_input_file(args.seqs, get_config_data('COMMON', 'SEPARATOR'))
+                if input_reader is None:
+                    self.logger.error(
+                        'Given input sequence file could not be detected as '
+                        'FASTA file or separated data type')
+                    return
+                if input_reader.is_fasta():
                     self.logger.info('FASTA input file extension detected')
                     command_list.append([
                         'read_seqs',
                         copy_to_dir(working_dir, str(args.seqs), 'fasta')
                     ])
-                elif is_separated(args.seqs, get_config_data('COMMON', 'SEPARATOR')):
+                elif input_reader.is_separated():
                     self.logger.info('Separated input file type detected')
                     input_seqs = preprocess_separated_file(
                         os.path.join(working_dir, 'input'),
-                        copy_to_dir(working_dir, str(args.seqs), 'csv'),
+                        str(args.seqs),
                         get_config_data('COMMON', 'SEPARATOR'),
                         ';',
                         get_config_data('COMMON', 'I_COL'),
                         [get_config_data('COMMON', 'NT_COL')]
                     )
                     command_list.append(['read_seqs', input_seqs])
-                else:
-                    self.logger.error(
-                        'Given input sequence file could not be detected as '
-                        'FASTA file or separated data type')
-                    return
             except (IOError, KeyError, ValueError) as err:
                 self.logger.error(str(err))
                 return
@@ -240,15 +251,9 @@ class EvaluateSequences(object):
             # Read in all data frame files, based on input file type.
             self.logger.info('Processing generation probabilities')
             try:
-                if is_fasta(args.seqs):
-                    seqs_df = read_fasta_as_dataframe(
-                        file=args.seqs,
-                        col=get_config_data('COMMON', 'NT_COL'))
-                elif is_separated(args.seqs, get_config_data('COMMON', 'SEPARATOR')):
-                    seqs_df = read_separated_to_dataframe(
-                        file=args.seqs,
-                        separator=get_config_data('COMMON', 'SEPARATOR'),
-                        index_col=get_config_data('COMMON', 'I_COL'))
+                seqs_df = input_reader.read(
+                    col=get_config_data('COMMON', 'NT_COL'),
+                    index_col=get_config_data('COMMON', 'I_COL'))
                 full_pgen_df = read_separated_to_dataframe(
                     file=os.path.join(working_dir, 'output', 'Pgen_counts.csv'),
                     separator=';',
@@ -281,14 +286,16 @@ class EvaluateSequences(object):
                 output_filename = get_config_data('COMMON', 'OUT_NAME')
                 if not output_filename:
                     output_filename = 'pgen_estimate_{}'.format(model_type)
-                _, filename = write_dataframe_to_separated(
+                _, filename = write_dataframe_to_file(
                     dataframe=full_pgen_df,
                     filename=output_filename,
                     directory=output_dir,
+                    file_format=get_config_data('COMMON', 'OUTPUT_FORMAT'),
                     separator=get_config_data('COMMON', 'SEPARATOR'),
-                    index_name=get_config_data('COMMON', 'I_COL'))
+                    index_name=get_config_data('COMMON', 'I_COL'),
+                    compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
                 self.logger.info("Written '%s'", filename)
-            except IOError as err:
+            except (IOError, ImportError, ValueError) as err:
                 self.logger.error(str(err))
                 return
 
@@ -308,7 +315,8 @@ class EvaluateSequences(object):
                     model_type = files['type']
                     model = IgorLoader(model_type=model_type,
                                        model_params=files['parameters'],
-                                       model_marginals=files['marginals'])
+                                       model_marginals=files['marginals'],
+                                       cache_dir=get_cache_dir('models'))
                     args.anchor = [['V', files['v_anchors']],
                                    ['J', files['j_anchors']]]
                     separator = '\t'
@@ -316,7 +324,8 @@ class EvaluateSequences(object):
                     model_type = args.type
                     model = IgorLoader(model_type=model_type,
                                        model_params=args.custom_model[0],
-                                       model_marginals=args.custom_model[1])
+                                       model_marginals=args.custom_model[1],
+                                       cache_dir=get_cache_dir('models'))
                     separator = get_config_data('COMMON', 'SEPARATOR')
                 for gene in args.anchor:
                     anchor_file = preprocess_separated_file(
@@ -331,33 +340,44 @@ class EvaluateSequences(object):
                 self.logger.error(str(err))
                 return
 
-            # Based on input file type, load in input file.
+            # Based on input file type, open the input file in chunks.
             self.logger.info('Pre-processing input sequence file')
+            chunk_size = get_config_data('EVALUATE', 'CHUNK_SIZE', 'int')
             try:
-                if is_fasta(args.seqs):
-                    self.logger.info('FASTA input file extension detected')
-                    seqs_df = read_fasta_as_dataframe(
-                        file=args.seqs,
-                        col=get_config_data('COMMON', 'NT_COL'))
-                elif is_separated(args.seqs, get_config_data('COMMON', 'SEPARATOR')):
-                    self.logger.info('Separated input file type detected')
-                    seqs_df = read_separated_to_dataframe(
-                        file=args.seqs,
-                        separator=get_config_data('COMMON', 'SEPARATOR'),
-                        index_col=get_config_data('COMMON', 'I_COL'))
-                else:
+                input_reader = detect_input_file(args.seqs, get_config_data('COMMON', 'SEPARATOR'))
+                if input_reader is None:
                     self.logger.error('Given input sequence file could not be detected as FASTA file or separated data type')
                     return
+                if input_reader.is_fasta():
+                    self.logger.info('FASTA input file extension detected')
+                else:
+                    self.logger.info('Separated input file type detected')
+                seqs_chunks = input_reader.read(
+                    col=get_config_data('COMMON', 'NT_COL'),
+                    index_col=get_config_data('COMMON', 'I_COL'),
+                    chunksize=chunk_size)
+                if not chunk_size:
+                    seqs_chunks = [seqs_chunks]
             except (IOError, KeyError, ValueError) as err:
                 self.logger.error(str(err))
                 return
 
-            # Evaluate the sequences.
+            # Evaluate the sequences chunk by chunk and write them to the output file in input order.
             self.logger.info('Evaluating sequences')
+            pgen_store = None
+            filename = None
+            num_evaluated = 0
             try:
                 use_allele = get_config_data('EVALUATE', 'USE_ALLELE', 'bool')
                 if args.use_allele:
                     use_allele = args.use_allele
+                pgen_store_file = get_config_data('EVALUATE', 'PGEN_STORE')
+                if pgen_store_file:
+                    pgen_store_file = os.path.join(output_dir, pgen_store_file)
+                if args.pgen_store:
+                    pgen_store_file = args.pgen_store
+                if pgen_store_file:
+                    pgen_store = PgenStore(file=pgen_store_file)
                 seq_evaluator = OlgaContainer(
                     igor_model=model,
                     nt_col=get_config_data('COMMON', 'NT_COL'),
@@ -365,35 +385,62 @@ class EvaluateSequences(object):
                     aa_col=get_config_data('COMMON', 'AA_COL'),
                     aa_p_col=get_config_data('COMMON', 'AA_P_COL'),
                     v_gene_choice_col=get_config_data('COMMON', 'V_GENE_CHOICE_COL'),
-                    j_gene_choice_col=get_config_data('COMMON', 'J_GENE_CHOICE_COL'))
-                cdr3_pgen_df = seq_evaluator.evaluate(
-                    seqs=seqs_df,
-                    num_threads=get_config_data('COMMON', 'NUM_THREADS', 'int'),
-                    use_allele=use_allele,
-                    default_allele=get_config_data('EVALUATE', 'DEFAULT_ALLELE'))
-
-                # Merge IGoR generated sequence output dataframes.
-                cdr3_pgen_df = seqs_df.merge(cdr3_pgen_df, left_index=True, right_index=True)
-            except (TypeError, IOError) as err:
-                self.logger.error(str(err))
-                return
-
-            # Write the pandas dataframe to a separated file.
-            try:
-                self.logger.info('Writing evaluated data to file system')
+                    j_gene_choice_col=get_config_data('COMMON', 'J_GENE_CHOICE_COL'),
+                    cache_size=get_config_data('EVALUATE', 'CACHE_SIZE', 'int'),
+                    pgen_store=pgen_store)
                 output_filename = get_config_data('COMMON', 'OUT_NAME')
                 if not output_filename:
                     output_filename = 'pgen_estimate_{}_CDR3'.format(model_type)
-                _, filename = write_dataframe_to_separated(
-                    dataframe=cdr3_pgen_df,
-                    filename=output_filename,
-                    directory=output_dir,
-                    separator=get_config_data('COMMON', 'SEPARATOR'),
-                    index_name=get_config_data('COMMON', 'I_COL'))
-                self.logger.info("Written '%s'", filename)
-            except IOError as err:
+                file_format = get_config_data('COMMON', 'OUTPUT_FORMAT')
+                columnar_writer = None
+                if file_format != 'separated':
+                    columnar_writer = ColumnarFileWriter(
+                        filename=output_filename,
+                        directory=output_dir,
+                        file_format=file_format,
+                        index_name=get_config_data('COMMON', 'I_COL'))
+                for seqs_df in seqs_chunks:
+                    cdr3_pgen_df = seq_evaluator.evaluate(
+                        seqs=seqs_df,
+                        num_threads=get_config_data('COMMON', 'NUM_THREADS', 'int'),
+                        use_allele=use_allele,
+                        default_allele=get_config_data('EVALUATE', 'DEFAULT_ALLELE'))
+
+                    # Merge IGoR generated sequence output dataframes and write them to the output file.
+                    cdr3_pgen_df = seqs_df.merge(cdr3_pgen_df, left_index=True, right_index=True)
+                    if columnar_writer is not None:
+                        columnar_writer.write(cdr3_pgen_df)
+                    elif filename is None:
+                        _, filename = write_dataframe_to_separated(
+                            dataframe=cdr3_pgen_df,
+                            filename=output_filename,
+                            directory=output_dir,
+                            separator=get_config_data('COMMON', 'SEPARATOR'),
+                            index_name=get_config_data('COMMON', 'I_COL'),
+                            compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
+                    else:
+                        append_dataframe_to_separated(
+                            dataframe=cdr3_pgen_df,
+                            filename=filename,
+                            directory=output_dir,
+                            separator=get_config_data('COMMON', 'SEPARATOR'),
+                            index_name=get_config_data('COMMON', 'I_COL'))
+                    num_evaluated += len(cdr3_pgen_df)
+                    self.logger.info('Written %s evaluated sequences to file system', num_evaluated)
+                if columnar_writer is not None:
+                    columnar_writer.close()
+                    if num_evaluated:
+                        filename = columnar_writer.filename
+            except (TypeError, ImportError, IOError, KeyError, ValueError, sqlite3.Error) as err:
                 self.logger.error(str(err))
                 return
+            finally:
+                if pgen_store is not None:
+                    pgen_store.close()
+            if filename is None:
+                self.logger.error('Given input sequence file does not contain any sequences')
+                return
+            self.logger.info("Written '%s'", filename)
 
 
 def main():
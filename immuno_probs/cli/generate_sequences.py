@@ -21,6 +21,7 @@
 import logging
 import os
 import sys
+import time
 
 import pandas
 
@@ -28,10 +29,11 @@ from immuno_probs.cdr3.olga_container import OlgaContainer
 from immuno_probs.model.default_models import get_default_model_file_paths
 from immuno_probs.model.igor_interface import IgorInterface
 from immuno_probs.model.igor_loader import IgorLoader
+from immuno_probs.util.cache import get_cache_dir
 from immuno_probs.util.cli import dynamic_cli_options
 from immuno_probs.util.conversion import nucleotides_to_aminoacids
 from immuno_probs.util.constant import get_config_data
-from immuno_probs.util.io import read_separated_to_dataframe, write_dataframe_to_separated, preprocess_separated_file, copy_to_dir
+from immuno_probs.util.io import read_separated_to_dataframe, write_dataframe_to_separated, write_dataframe_to_file, ColumnarFileWriter, append_dataframe_to_separated, preprocess_separated_file, copy_to_dir
 
 
 class GenerateSequences(object):
@@ -107,6 +109,13 @@ class GenerateSequences(object):
                 'help': 'If specified (True), CDR3 sequences are generated, otherwise V(D)J sequences (default: {}).'
                         .format(get_config_data('GENERATE', 'EVAL_CDR3', 'bool'))
             },
+            '-seed': {
+                'type': 'int',
+                'nargs': '?',
+                'help': 'A master seed value for the random number generators used with -cdr3, given the same seed the '
+                        'generated sequences are identical regardless of the number of threads and chunk size (default: {}).'
+                        .format(get_config_data('GENERATE', 'SEED'))
+            },
         }
 
         # Add the options to the parser and return the updated parser.
@@ -255,12 +264,14 @@ class GenerateSequences(object):
                     model_type = files['type']
                     model = IgorLoader(model_type=model_type,
                                        model_params=files['parameters'],
-                                       model_marginals=files['marginals'])
+                                       model_marginals=files['marginals'],
+                                       cache_dir=get_cache_dir('models'))
                 elif args.custom_model:
                     model_type = args.type
                     model = IgorLoader(model_type=model_type,
                                        model_params=args.custom_model[0],
-                                       model_marginals=args.custom_model[1])
+                                       model_marginals=args.custom_model[1],
+                                       cache_dir=get_cache_dir('models'))
                 real_df = self._process_realizations(
                     data=real_df,
                     model=model,
@@ -278,14 +289,16 @@ class GenerateSequences(object):
                 output_filename = get_config_data('COMMON', 'OUT_NAME')
                 if not output_filename:
                     output_filename = 'generated_seqs_{}'.format(model_type)
-                _, filename = write_dataframe_to_separated(
+                _, filename = write_dataframe_to_file(
                     dataframe=full_seqs_df,
                     filename=output_filename,
                     directory=output_dir,
+                    file_format=get_config_data('COMMON', 'OUTPUT_FORMAT'),
                     separator=get_config_data('COMMON', 'SEPARATOR'),
-                    index_name=get_config_data('COMMON', 'I_COL'))
+                    index_name=get_config_data('COMMON', 'I_COL'),
+                    compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
                 self.logger.info("Written '%s'", filename)
-            except IOError as err:
+            except (IOError, ImportError, ValueError) as err:
                 self.logger.error(str(err))
                 return
 
@@ -303,7 +316,8 @@ class GenerateSequences(object):
                     model_type = files['type']
                     model = IgorLoader(model_type=model_type,
                                        model_params=files['parameters'],
-                                       model_marginals=files['marginals'])
+                                       model_marginals=files['marginals'],
+                                       cache_dir=get_cache_dir('models'))
                     args.anchor = [['V', files['v_anchors']],
                                    ['J', files['j_anchors']]]
                     separator = '\t'
@@ -311,7 +325,8 @@ class GenerateSequences(object):
                     model_type = args.type
                     model = IgorLoader(model_type=model_type,
                                        model_params=args.custom_model[0],
-                                       model_marginals=args.custom_model[1])
+                                       model_marginals=args.custom_model[1],
+                                       cache_dir=get_cache_dir('models'))
                     separator = get_config_data('COMMON', 'SEPARATOR')
                 for gene in args.anchor:
                     anchor_file = preprocess_separated_file(
@@ -326,7 +341,7 @@ class GenerateSequences(object):
                 self.logger.error(str(err))
                 return
 
-            # Setup the sequence generator and generate sequences.
+            # Setup the sequence generator and stream the generated sequences to a separated file.
             self.logger.info('Generating sequences')
             try:
                 seq_generator = OlgaContainer(
@@ -340,30 +355,61 @@ class GenerateSequences(object):
                 n_generate = get_config_data('GENERATE', 'NUM_GENERATE', 'int')
                 if args.n_gen:
                     n_generate = args.n_gen
-                if n_generate > 0:
-                    cdr3_seqs_df = seq_generator.generate(num_seqs=n_generate)
-                else:
+                seed = get_config_data('GENERATE', 'SEED')
+                if args.seed is not None:
+                    seed = args.seed
+                if seed is not None:
+                    seed = int(seed)
+                if n_generate <= 0:
                     self.logger.error(
                         'Number of sequences to generate should be higher 0')
                     return
-            except (TypeError, IOError) as err:
-                self.logger.error(str(err))
-                return
-
-            # Write the pandas dataframe to a separated file with.
-            try:
-                self.logger.info('Writing generated sequences to file system')
                 output_filename = get_config_data('COMMON', 'OUT_NAME')
                 if not output_filename:
                     output_filename = 'generated_seqs_{}_CDR3'.format(model_type)
-                _, filename = write_dataframe_to_separated(
-                    dataframe=cdr3_seqs_df,
-                    filename=output_filename,
-                    directory=output_dir,
-                    separator=get_config_data('COMMON', 'SEPARATOR'),
-                    index_name=get_config_data('COMMON', 'I_COL'))
+                filename = None
+                n_written = 0
+                file_format = get_config_data('COMMON', 'OUTPUT_FORMAT')
+                columnar_writer = None
+                if file_format != 'separated':
+                    columnar_writer = ColumnarFileWriter(
+                        filename=output_filename,
+                        directory=output_dir,
+                        file_format=file_format,
+                        index_name=get_config_data('COMMON', 'I_COL'))
+                start_time = time.time()
+                for cdr3_seqs_df in seq_generator.generate_chunks(
+                        num_seqs=n_generate,
+                        chunk_size=get_config_data('GENERATE', 'CHUNK_SIZE', 'int'),
+                        num_threads=get_config_data('COMMON', 'NUM_THREADS', 'int'),
+                        seed=seed):
+                    # Write the chunk as row group of the columnar file, or write or append it to the separated file.
+                    if columnar_writer is not None:
+                        columnar_writer.write(cdr3_seqs_df)
+                    elif filename is None:
+                        _, filename = write_dataframe_to_separated(
+                            dataframe=cdr3_seqs_df,
+                            filename=output_filename,
+                            directory=output_dir,
+                            separator=get_config_data('COMMON', 'SEPARATOR'),
+                            index_name=get_config_data('COMMON', 'I_COL'),
+                            compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
+                    else:
+                        append_dataframe_to_separated(
+                            dataframe=cdr3_seqs_df,
+                            filename=filename,
+                            directory=output_dir,
+                            separator=get_config_data('COMMON', 'SEPARATOR'),
+                            index_name=get_config_data('COMMON', 'I_COL'))
+                    n_written += len(cdr3_seqs_df)
+                    elapsed_time = max(time.time() - start_time, 1e-9)
+                    self.logger.info('Written %s/%s sequences to file system (%.1f sequences/s)',
+                                     n_written, n_generate, n_written / elapsed_time)
+                if columnar_writer is not None:
+                    columnar_writer.close()
+                    filename = columnar_writer.filename
                 self.logger.info("Written '%s'", filename)
-            except IOError as err:
+            except (TypeError, ImportError, ValueError, IOError) as err:
                 self.logger.error(str(err))
                 return
 
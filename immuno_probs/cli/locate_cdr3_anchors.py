@@ -25,9 +25,10 @@ import numpy
 
 from immuno_probs.alignment.muscle_aligner import MuscleAligner
 from immuno_probs.cdr3.anchor_locator import AnchorLocator
+from immuno_probs.util.cache import get_cache_dir
 from immuno_probs.util.cli import dynamic_cli_options
 from immuno_probs.util.constant import get_config_data
-from immuno_probs.util.io import copy_to_dir, preprocess_reference_file, write_dataframe_to_separated
+from immuno_probs.util.io import preprocess_reference_file, write_dataframe_to_separated
 
 
 class LocateCdr3Anchors(object):
@@ -104,7 +105,8 @@ class LocateCdr3Anchors(object):
             try:
                 filename = preprocess_reference_file(
                     os.path.join(working_dir, 'genomic_templates'),
-                    copy_to_dir(working_dir, gene[1], 'fasta'),
+                    gene[1],
+                    cache_dir=get_cache_dir('reference_templates')
                 )
                 aligner = MuscleAligner(infile=filename)
                 locator = AnchorLocator(alignment=aligner.get_muscle_alignment(),
@@ -156,9 +158,10 @@ class LocateCdr3Anchors(object):
                     dataframe=anchors_df,
                     filename='{}_{}'.format(gene[0], output_prefix),
                     directory=output_dir,
-                    separator=get_config_data('COMMON', 'SEPARATOR'))
+                    separator=get_config_data('COMMON', 'SEPARATOR'),
+                    compression=get_config_data('COMMON', 'OUTPUT_COMPRESSION'))
                 self.logger.info("Written '%s' for %s gene", filename, gene[0])
-            except IOError as err:
+            except (IOError, ValueError) as err:
                 self.logger.error(str(err))
                 return
 
@@ -19,30 +19,50 @@
 
 
 import re
-import math
 
 import pandas
 import numpy
 
+from immuno_probs.convert.suffix_automaton import SuffixAutomaton
+from immuno_probs.util.cache import LRUCache
 from immuno_probs.util.processing import multiprocess_array
+from immuno_probs.util.sampling import reservoir_sample
 
 
 class AdaptiveSequenceConvertor(object):
     """Converts the full length (VDJ for productive, unproductive and the total) and CDR3 sequences from a given adaptive
     sequence input file.
 
+    Attributes
+    ----------
+    template_hits : int
+        The number of V and J reassembly templates that were reused from the template cache by the last conversion.
+    template_misses : int
+        The number of V and J reassembly templates that had to be created by the last conversion.
+
     Methods
     -------
     build_resolved_pattern(value, use_allele, default_allele)
         Splits the resolved gene value in an IMGT formated regex pattern.
+    classify_frame_types(frame_types)
+        Classifies the frame types of the sequences as productive or unproductive.
+    build_resolved_lookup(values, ref_genes, resolved_col, nt_col, use_allele, default_allele)
+        Resolves the given resolved gene values into the IMGT reference gene choices and sequence.
     find_longest_substring(full, partial)
         Finds the longest overlap between a full length sequences and a partial length sequence.
-    convert(num_threads, seqs, use_allele=True, default_allele=None)
+    get_template(gene, ref_seq, segment)
+        Returns the part of the reference gene sequence that is joined with the CDR3 sequence.
+    convert(num_threads, seqs, use_allele=True, default_allele=None, n_random=0, seed=None)
         Convert sequence data to an ImmunoProbs compatible format.
 
     """
+    _suffix_automatons = LRUCache(max_size=4096)
+    _templates = LRUCache(max_size=65536)
+
     def __init__(self):
         super(AdaptiveSequenceConvertor, self).__init__()
+        self.template_hits = 0
+        self.template_misses = 0
 
     @staticmethod
     def build_resolved_pattern(value, use_allele, default_allele):
@@ -111,7 +131,86 @@ class AdaptiveSequenceConvertor(object):
         return resolved_list
 
     @staticmethod
-    def find_longest_substring(full, partial):
+    def classify_frame_types(frame_types):
+        """Classifies the frame types of the sequences as productive or unproductive.
+
+        Parameters
+        ----------
+        frame_types : pandas.Series
+            Containing the frame type values ('In', 'Out' or 'Stop') of the sequences.
+
+        Returns
+        -------
+        pandas.Series
+            Containing 'prod' for the 'In' frame type, 'unprod' for the 'Out' and 'Stop' frame types and null for other
+            values (case insensitive).
+
+        """
+        frame_types = frame_types.astype(object).str.lower()
+        classes = pandas.Series(numpy.nan, index=frame_types.index, dtype=object)
+        classes[(frame_types == 'in').values] = 'prod'
+        classes[frame_types.isin(['out', 'stop']).values] = 'unprod'
+        return classes
+
+    @classmethod
+    def build_resolved_lookup(cls, values, ref_genes, resolved_col, nt_col, use_allele, default_allele):
+        """Resolves the given resolved gene values into the IMGT reference gene choices and sequence.
+
+        Parameters
+        ----------
+        values : list
+            Containing the resolved gene values (e.g. 'TCRBV07-09*01') to look up in the reference genes.
+        ref_genes : pandas.DataFrame
+            A dataframe containing the reference gene sequences from IMGT as well as the gene names.
+        resolved_col : str
+            The name of the column containing the reference gene names.
+        nt_col : str
+            The name of the column containing the reference gene sequences.
+        use_allele : bool
+            If True, the allele information from the input genes is used instead of the 'default_allele' value.
+        default_allele : str
+            A default allele value to use when spliting gene choices, and 'use_allele' option is False.
+
+        Returns
+        -------
+        dict
+            Containing the resolved gene values with a tuple of the '|' joined gene choices (numpy.nan if none are found) and
+            the reference sequence to reassemble the full length sequence with (None if not found). Values that are not a
+            string are not included.
+
+        Notes
+        -----
+        Each value is resolved through the patterns of the 'build_resolved_pattern' function. The first matching reference
+        gene of each pattern is added to the gene choices, the reference sequence is the one of the first matching reference
+        gene for the last pattern.
+
+        """
+        ref_names = ref_genes[resolved_col].tolist()
+        ref_seqs = ref_genes[nt_col].tolist()
+        lookup = {}
+        for value in values:
+            if not isinstance(value, str) or value in lookup:
+                continue
+
+            # Locate the first matching reference gene for each pattern of the value.
+            gene_choices = []
+            ref_seq = None
+            for resolved in cls.build_resolved_pattern(value=value, use_allele=use_allele, default_allele=default_allele):
+                pattern = re.compile(resolved)
+                ref_seq = None
+                for name, seq in zip(ref_names, ref_seqs):
+                    if pattern.search(name):
+                        gene_choices.append(name)
+                        ref_seq = seq
+                        break
+            if gene_choices:
+                lookup[value] = ('|'.join(gene_choices), ref_seq)
+            else:
+                lookup[value] = (numpy.nan, ref_seq)
+        return lookup
+
+    @classmethod
+    def find_longest_substring(cls, full, partial):
         """Finds the longest overlap between a full length sequences and a partial length sequence.
 
         Parameters
@@ -124,21 +223,67 @@ class AdaptiveSequenceConvertor(object):
         Returns
         -------
         str
-            The longest substring from the compared input strings.
+            The longest substring from the compared input strings, when multiple are found the one that ends first in the full
+            length sequence is returned.
+
+        Notes
+        -----
+        A suffix automaton is build for each full length sequence and reused for the next comparisons with the same (reference
+        gene) sequence.
+
+        """
+        automaton = cls._suffix_automatons.get(full)
+        if automaton is None:
+            automaton = SuffixAutomaton(full)
+            cls._suffix_automatons.put(full, automaton)
+        return automaton.find_longest_substring(partial)
+
+    @classmethod
+    def get_template(cls, gene, ref_seq, segment):
+        """Collects the part of the reference gene sequence that is joined with the CDR3 sequence to reassemble the full
+        length VDJ sequence.
+
+        Parameters
+        ----------
+        gene : str
+            A gene identifier, either 'V' or 'J', specifying the reference gene's type.
+        ref_seq : str
+            The reference gene sequence.
+        segment : str
+            The overlap between the reference gene sequence and CDR3 sequence (from 'find_longest_substring').
+
+        Returns
+        -------
+        str
+            The V gene sequence before its last overlap, or the J gene sequence after its first overlap. None if the
+            overlap does not leave the larger part of the reference gene sequence.
+
+        Raises
+        ------
+        ValueError
+            When the given gene character does not equal 'V' or 'J'.
+
+        Notes
+        -----
+        The templates are kept in a cache for the given reference gene sequence and overlap, shared by all instances.
 
         """
-        var_1 = [[0] * (1 + len(partial)) for i in range(1 + len(full))]
-        index_1, index_2 = 0, 0
-        for x in range(1, 1 + len(full)):
-            for y in range(1, 1 + len(partial)):
-                if full[x - 1] == partial[y - 1]:
-                    var_1[x][y] = var_1[x - 1][y - 1] + 1
-                    if var_1[x][y] > index_1:
-                        index_1 = var_1[x][y]
-                        index_2 = x
-                else:
-                    var_1[x][y] = 0
-        return full[index_2 - index_1: index_2]
+        key = (gene, ref_seq, segment)
+        template = cls._templates.get(key)
+        if template is not None:
+            return template or None
+
+        # Split the reference gene at the overlap and keep the remaining part.
+        if gene == 'V':
+            split_v = ref_seq.rsplit(segment, 1)
+            template = split_v[0] if len(split_v[1]) < len(split_v[0]) else ''
+        elif gene == 'J':
+            split_j = ref_seq.split(segment, 1)
+            template = split_j[1] if len(split_j[0]) < len(split_j[1]) else ''
+        else:
+            raise ValueError("Gene identifier should be either 'V' or 'J'", gene)
+        cls._templates.put(key, template)
+        return template or None
 
     def _convert(self, args):
         """Private function for converting the adaptive dataframe data by striping the CDR3's as well as creating full length
@@ -147,137 +292,130 @@ class AdaptiveSequenceConvertor(object):
         Parameters
         ----------
         args : list
-            A collection of arguments containing the dataframe to process for the thread, reference V and J gene dataframes,
-            column names, default allele value and number of random sequences to use.
+            A collection of arguments containing the dataframe to process for the thread, resolved V and J gene lookup tables,
+            column names, if the dataframe should be shuffled and the seed value for shuffling it.
 
         Returns
         -------
         list
-            Three pandas dataframes containing the reassembled data, full length productive VDJ sequences and full length
-            unproductive VDJ sequences.
+            Three pandas dataframes containing the reassembled data of the full length VDJ sequences, full length productive
+            VDJ sequences and full length unproductive VDJ sequences. Followed by a tuple with the number of template cache
+            hits and misses.
 
         """
-        # Setup the initial dataframe.
+        # Setup the initial dataframe and shuffle it.
         ary, kwargs = args
-        ref_v_genes = kwargs['ref_v_genes']
-        ref_j_genes = kwargs['ref_j_genes']
+        v_lookup = kwargs['v_lookup']
+        j_lookup = kwargs['j_lookup']
         col_names = kwargs['col_names']
-        use_allele = kwargs['use_allele']
-        default_allele = kwargs['default_allele']
-        n_random = kwargs['n_random']
-        reassembled_df = pandas.DataFrame(columns=[
+        if kwargs['shuffle']:
+            ary = ary.sample(frac=1, random_state=kwargs['seed'])
+
+        # Classify the frame types and create the trimmed NT sequences (removing primers) per CDR3 length.
+        frames = self.classify_frame_types(ary[col_names['FRAME_TYPE_COL']]).tolist()
+        trimmed_nt_seqs = pandas.Series(numpy.nan, index=ary.index, dtype=object)
+        nt_seqs = ary[col_names['NT_COL']].astype(object)
+        lengths = pandas.to_numeric(ary[col_names['CDR3_LENGTH_COL']].astype(object), errors='coerce').values
+        for length in numpy.unique(lengths[~numpy.isnan(lengths)]):
+            index = numpy.flatnonzero(lengths == length)
+            trimmed_nt_seqs.iloc[index] = nt_seqs.iloc[index].str.slice(81 - int(length), 81).values
+
+        # Look up the resolved V and J gene choices and reference sequences.
+        default = (numpy.nan, None)
+        v_genes = [v_lookup.get(i, default) for i in ary[col_names['V_RESOLVED_COL']].tolist()]
+        j_genes = [j_lookup.get(i, default) for i in ary[col_names['J_RESOLVED_COL']].tolist()]
+
+        # Create the VDJ full length sequences for the productive and unproductive sequences.
+        template_hits, template_misses = self._templates.hits, self._templates.misses
+        rows = {'prod': [], 'unprod': []}
+        full_length = {'prod': [], 'unprod': []}
+        for row, trimmed_nt_seq in enumerate(trimmed_nt_seqs.tolist()):
+            frame = frames[row]
+            if frame not in rows:
+                continue
+            v_ref_seq = v_genes[row][1]
+            j_ref_seq = j_genes[row][1]
+            if v_ref_seq is None or j_ref_seq is None or not isinstance(trimmed_nt_seq, str):
+                continue
+            v_template = self.get_template('V', v_ref_seq, self.find_longest_substring(v_ref_seq, trimmed_nt_seq))
+            if v_template is None:
+                continue
+            j_template = self.get_template('J', j_ref_seq, self.find_longest_substring(j_ref_seq, trimmed_nt_seq))
+            if j_template is None:
+                continue
+            rows[frame].append(row)
+            full_length[frame].append(v_template + trimmed_nt_seq + j_template)
+        template_hits = self._templates.hits - template_hits
+        template_misses = self._templates.misses - template_misses
+
+        # Build the output dataframes for the reassembled rows, productive and unproductive sequences.
+        row_ids = ary.index.values
+        full_length_prod_df = pandas.DataFrame({
+            col_names['ROW_ID_COL']: row_ids[rows['prod']],
+            col_names['NT_COL']: full_length['prod'],
+        }, columns=[col_names['ROW_ID_COL'], col_names['NT_COL']])
+        full_length_unprod_df = pandas.DataFrame({
+            col_names['ROW_ID_COL']: row_ids[rows['unprod']],
+            col_names['NT_COL']: full_length['unprod'],
+        }, columns=[col_names['ROW_ID_COL'], col_names['NT_COL']])
+        reassembled = sorted(rows['prod'] + rows['unprod'])
+        reassembled_df = pandas.DataFrame({
+            col_names['ROW_ID_COL']: row_ids[reassembled],
+            col_names['NT_COL']: trimmed_nt_seqs.values[reassembled],
+            col_names['AA_COL']: ary[col_names['AA_COL']].astype(object).values[reassembled],
+            col_names['V_GENE_CHOICE_COL']: [v_genes[i][0] for i in reassembled],
+            col_names['J_GENE_CHOICE_COL']: [j_genes[i][0] for i in reassembled],
+        }, columns=[
             col_names['ROW_ID_COL'], col_names['NT_COL'], col_names['AA_COL'],
             col_names['V_GENE_CHOICE_COL'], col_names['J_GENE_CHOICE_COL']
         ])
-        full_length_prod_df = pandas.DataFrame(columns=[col_names['ROW_ID_COL'], col_names['NT_COL']])
-        full_length_unprod_df = pandas.DataFrame(columns=[col_names['ROW_ID_COL'], col_names['NT_COL']])
-
-        # Shuffle the dataframe and iterate over the rows with index value.
-        ary = ary.sample(frac=1)
-        for i, row in ary.iterrows():
-
-            # Exit loop if prod and reached max number of sequences, do not add
-            # sequences when max is reached for a dataframe.
-            if n_random > 0:
-                if (len(full_length_prod_df) >= n_random and len(full_length_unprod_df) >= n_random):
-                    break
-                if (row[col_names['FRAME_TYPE_COL']].lower() == 'in' and len(full_length_prod_df) >= n_random):
-                    continue
-                elif ((row[col_names['FRAME_TYPE_COL']].lower() == 'out' or row[col_names['FRAME_TYPE_COL']].lower() == 'stop')
-                      and len(full_length_unprod_df) >= n_random):
-                    continue
-
-            # Pre-process the resolved V genes.
-            v_gene_choices = []
-            imgt_v_gene = pandas.DataFrame()
-            if isinstance(row[col_names['V_RESOLVED_COL']], str):
-                v_resolved = self.build_resolved_pattern(
-                    value=row[col_names['V_RESOLVED_COL']],
-                    use_allele=use_allele,
-                    default_allele=default_allele
-                )
-                for resolved in v_resolved:
-                    imgt_v_gene = ref_v_genes.loc[ref_v_genes[col_names['V_RESOLVED_COL']].str.contains(resolved), :]
-
-                    # Assemble the output dataframe gene choices for the V genes.
-                    if not imgt_v_gene.empty:
-                        v_gene_choices.append(imgt_v_gene[col_names['V_RESOLVED_COL']].values[0])
-            if v_gene_choices:
-                v_gene_choices = '|'.join(v_gene_choices)
-            else:
-                v_gene_choices = numpy.nan
-
-            # Pre-process the resolved J genes.
-            j_gene_choices = []
-            imgt_j_gene = pandas.DataFrame()
-            if isinstance(row[col_names['J_RESOLVED_COL']], str):
-                j_resolved = self.build_resolved_pattern(
-                    value=row[col_names['J_RESOLVED_COL']],
-                    use_allele=use_allele,
-                    default_allele=default_allele
-                )
-                for resolved in j_resolved:
-                    imgt_j_gene = ref_j_genes.loc[ref_j_genes[col_names['J_RESOLVED_COL']].str.contains(resolved), :]
-
-                    # Assemble the output dataframe gene choices for the J genes.
-                    if not imgt_j_gene.empty:
-                        j_gene_choices.append(imgt_j_gene[col_names['J_RESOLVED_COL']].values[0])
-            if j_gene_choices:
-                j_gene_choices = '|'.join(j_gene_choices)
-            else:
-                j_gene_choices = numpy.nan
-
-            # Create the trimmed NT sequence (removing primers).
-            trimmed_nt_seq = row[col_names['NT_COL']][(81 - int(row[col_names['CDR3_LENGTH_COL']])): 81]
-
-            # Add data row of reassembled data to the dataframe.
-            reassembled_df = reassembled_df.append({
-                col_names['ROW_ID_COL']: i,
-                col_names['NT_COL']: trimmed_nt_seq,
-                col_names['AA_COL']: row[col_names['AA_COL']],
-                col_names['V_GENE_CHOICE_COL']: v_gene_choices,
-                col_names['J_GENE_CHOICE_COL']: j_gene_choices,
-            }, ignore_index=True)
-
-            # Create the VDJ full length sequence
-            if (not imgt_v_gene.empty and not imgt_j_gene.empty):
-                vd_segment = self.find_longest_substring(imgt_v_gene[col_names['NT_COL']].values[0], trimmed_nt_seq)
-                dj_segment = self.find_longest_substring(imgt_j_gene[col_names['NT_COL']].values[0], trimmed_nt_seq)
-                split_v = imgt_v_gene[col_names['NT_COL']].values[0].rsplit(vd_segment, 1)
-                split_j = imgt_j_gene[col_names['NT_COL']].values[0].split(dj_segment, 1)
-                if (len(split_v[1]) >= len(split_v[0])) or (len(split_j[0]) >= len(split_j[1])):
-                    continue
-                vdj_sequence = split_v[0] + trimmed_nt_seq + split_j[1]
-            else:
-                continue
+        return reassembled_df, full_length_prod_df, full_length_unprod_df, (template_hits, template_misses)
+
+    @staticmethod
+    def _select_sampled(dataframe, row_id_col, sample_order):
+        """Private function for selecting the rows of the sampled sequences, in the order of the sample.
 
-            # Add data row of full length data to the dataframe for productive and
-            # unproductive sequences.
-            if row[col_names['FRAME_TYPE_COL']].lower() == 'in':
-                full_length_prod_df = full_length_prod_df.append({
-                    col_names['ROW_ID_COL']: i,
-                    col_names['NT_COL']: vdj_sequence
-                }, ignore_index=True)
-            elif (row[col_names['FRAME_TYPE_COL']].lower() == 'out' or row[col_names['FRAME_TYPE_COL']].lower() == 'stop'):
-                full_length_unprod_df = full_length_unprod_df.append({
-                    col_names['ROW_ID_COL']: i,
-                    col_names['NT_COL']: vdj_sequence
-                }, ignore_index=True)
-        return reassembled_df, full_length_prod_df, full_length_unprod_df
+        Parameters
+        ----------
+        dataframe : pandas.DataFrame
+            The reassembled data containing the row identifiers of the sequences.
+        row_id_col : str
+            The name of the column containing the row identiefiers.
+        sample_order : dict
+            Containing the row identifiers of the sampled sequences with their position in the sample.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The rows of the dataframe that are in the sample, ordered by their position in the sample.
+
+        """
+        positions = dataframe[row_id_col].map(sample_order)
+        positions = positions[positions.notnull()].sort_values(kind='mergesort')
+        return dataframe.loc[positions.index].reset_index(drop=True)
 
     def convert(self, num_threads, seqs, ref_v_genes, ref_j_genes, row_id_col, nt_col, aa_col, frame_type_col,
                 cdr3_length_col, v_resolved_col, v_gene_choice_col, j_resolved_col, j_gene_choice_col, default_allele,
-                use_allele=True, n_random=0):
+                use_allele=True, n_random=0, seed=None):
         """Convert the full length VDJ and CDR3 sequences from the given adaptive dataframe to ImmunoProbs format.
 
         The function needs to reassemble the full length VDJ sequences with the given reference V and J gene sequences first.
+        The number of reused and created reassembly templates are stored in the 'template_hits' and 'template_misses'
+        attributes.
+
+        When subsampling, the given chunks are sampled in a single pass ('reservoir_sample') with the same number of
+        productive and unproductive sequences. Only sequences with the data needed for reassembly (resolved reference V and J
+        genes and a CDR3 length) are sampled. The sequences are tried in the random order of the sample until enough of them
+        could be reassembled, so sequences of which the CDR3 does not overlap with the reference genes properly are skipped
+        and only the tried sequences are reassembled.
 
         Parameters
         ----------
         num_threads : int
             The number of threads to use when processing the data.
-        seqs : pandas.DataFrame
-            Dataframe containing the sequences that need to be converted.
+        seqs : pandas.DataFrame or iterable
+            Dataframe containing the sequences that need to be converted, or an iterable with chunks of the dataframe (e.g.
+            from 'read_separated_to_dataframe' with a chunk size).
         ref_v_genes : pandas.DataFrame
             A dataframe containing the reference V gene sequences from IMGT as well as V family and V gene names.
         ref_j_genes : pandas.DataFrame
@@ -311,6 +449,9 @@ class AdaptiveSequenceConvertor(object):
             number of sequences. The reassembled data will contain all sequences used for the full length VDJ datasets. If the
             given number is too larger than the size of a dataframe, the value is adjusted to the smallest value.
             (default: 0, all sequences are included).
+        seed : int, optional
+            A seed value for the random subsample and the order of the output sequences, given the same seed and input the
+            output is identical (default: seeded by the system).
 
         Returns
         -------
@@ -319,7 +460,7 @@ class AdaptiveSequenceConvertor(object):
             unproductive VDJ sequences and one with the total full length VDJ sequences.
 
         """
-        # Setup the column names and outputr dataframes.
+        # Setup the column names and random number generator.
         col_names = {
             'ROW_ID_COL': row_id_col,
             'NT_COL': nt_col,
@@ -331,47 +472,86 @@ class AdaptiveSequenceConvertor(object):
             'J_RESOLVED_COL': j_resolved_col,
             'J_GENE_CHOICE_COL': j_gene_choice_col,
         }
-        n_random_thread = 0
+        random_state = numpy.random.RandomState(seed)
+        if isinstance(seqs, pandas.DataFrame):
+            seqs = [seqs]
+
+        # Resolve the distinct V and J gene values once into lookup tables, these are extended for each chunk.
+        lookups = {'V': {}, 'J': {}}
+        ref_genes = {'V': (ref_v_genes, v_resolved_col), 'J': (ref_j_genes, j_resolved_col)}
+
+        def update_lookups(chunk):
+            """Adds the new resolved V and J gene values of the chunk to the lookup tables."""
+            for gene in lookups:
+                lookups[gene].update(self.build_resolved_lookup(
+                    values=[i for i in chunk[ref_genes[gene][1]].dropna().unique() if i not in lookups[gene]],
+                    ref_genes=ref_genes[gene][0],
+                    resolved_col=ref_genes[gene][1],
+                    nt_col=nt_col,
+                    use_allele=use_allele,
+                    default_allele=default_allele
+                ))
+
+        def get_strata(chunk):
+            """Returns the frame classes of the rows in the chunk that have the data needed for reassembly."""
+            update_lookups(chunk)
+            usable = (chunk[nt_col].notnull() & chunk[cdr3_length_col].notnull()).values
+            for gene in lookups:
+                usable &= numpy.array([lookups[gene].get(i, (None, None))[1] is not None
+                                       for i in chunk[ref_genes[gene][1]].tolist()], dtype=bool)
+            return self.classify_frame_types(chunk[frame_type_col]).where(usable)
+
+        # Set the multiprocessing task arguments.
+        kwargs = {
+            'v_lookup': lookups['V'],
+            'j_lookup': lookups['J'],
+            'col_names': col_names,
+            'shuffle': n_random <= 0,
+            'seed': None if seed is None or n_random > 0 else random_state.randint(2 ** 31 - 1),
+        }
+
+        # Take a random sample of the productive and unproductive sequences that can be reassembled (in random order), only
+        # the sequences that are tried for the sample are reassembled.
+        results = []
         if n_random > 0:
-            n_random_thread = math.ceil(float(n_random) / num_threads)
-        tmp = pandas.DataFrame()
-        full_prod = pandas.DataFrame()
-        full_unprod = pandas.DataFrame()
-
-        # Set and perform the multiprocessing task.
-        results = multiprocess_array(
-            ary=seqs,
-            func=self._convert,
-            num_workers=num_threads,
-            ref_v_genes=ref_v_genes,
-            ref_j_genes=ref_j_genes,
-            col_names=col_names,
-            use_allele=use_allele,
-            default_allele=default_allele,
-            n_random=n_random_thread
-        )
-
-        # Process the resulted dataframes.
-        for processed in results:
-            tmp = tmp.append(processed[0], ignore_index=True)
-            full_prod = full_prod.append(processed[1], ignore_index=True)
-            full_unprod = full_unprod.append(processed[2], ignore_index=True)
+            def reassemble(rows):
+                """Reassembles the rows and returns which of them could be reassembled."""
+                rows_results = multiprocess_array(ary=rows, func=self._convert, num_workers=num_threads, **kwargs)
+                results.extend(rows_results)
+                return rows.index.isin(numpy.concatenate([i[0][row_id_col].values for i in rows_results]))
+
+            seqs = reservoir_sample(chunks=seqs, size=n_random, strata=get_strata, random_state=random_state,
+                                    accept=reassemble)
+        else:
+            seqs = pandas.concat(list(seqs))
+            update_lookups(seqs)
+            if not seqs.empty:
+                results = multiprocess_array(ary=seqs, func=self._convert, num_workers=num_threads, **kwargs)
+        if not results:
+            results = [self._convert((seqs, kwargs))]
+
+        # Process the resulted dataframes, the sampled sequences are kept in the order of the sample.
+        tmp = pandas.concat([i[0] for i in results], ignore_index=True)
+        full_prod = pandas.concat([i[1] for i in results], ignore_index=True)
+        full_unprod = pandas.concat([i[2] for i in results], ignore_index=True)
+        self.template_hits = sum([i[3][0] for i in results])
+        self.template_misses = sum([i[3][1] for i in results])
         if n_random > 0:
-            if len(full_prod) < n_random:
-                n_random = len(full_prod)
-            if len(full_unprod) < n_random:
-                n_random = len(full_unprod)
+            sample_order = dict(zip(seqs.index, range(len(seqs))))
+            tmp = self._select_sampled(tmp, row_id_col, sample_order)
+            full_prod = self._select_sampled(full_prod, row_id_col, sample_order)
+            full_unprod = self._select_sampled(full_unprod, row_id_col, sample_order)
+            n_random = min(n_random, len(full_prod), len(full_unprod))
             full_prod = full_prod.head(n_random)
             full_unprod = full_unprod.head(n_random)
-        reassembled = tmp[tmp[col_names['ROW_ID_COL']].isin(full_prod[col_names['ROW_ID_COL']])]
-        reassembled = reassembled.append(
-            tmp[tmp[col_names['ROW_ID_COL']].isin(full_unprod[col_names['ROW_ID_COL']])],
-            ignore_index=True
-        )
+        reassembled = pandas.concat([
+            tmp[tmp[col_names['ROW_ID_COL']].isin(full_prod[col_names['ROW_ID_COL']])],
+            tmp[tmp[col_names['ROW_ID_COL']].isin(full_unprod[col_names['ROW_ID_COL']])]
+        ], ignore_index=True)
 
         # Build the dataframe with the total full length sequences.
         full = pandas.concat([full_prod, full_unprod])
-        full = full.sample(frac=1).reset_index(drop=True)
+        full = full.sample(frac=1, random_state=random_state).reset_index(drop=True)
         if n_random > 0:
             full = full.head(len(full_prod))
         return [reassembled, full_prod, full_unprod, full]
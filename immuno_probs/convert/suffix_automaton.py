@@ -0,0 +1,137 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Contains SuffixAutomaton class for locating common substrings in a sequence."""
+
+
+class SuffixAutomaton(object):
+    """A suffix automaton of a sequence, for locating the longest substring it has in common with other sequences.
+
+    The automaton is build once in linear time, after which each lookup takes linear time in the length of the other
+    sequence only.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence string to build the automaton for.
+
+    Attributes
+    ----------
+    sequence : str
+        The sequence string of the automaton.
+
+    Methods
+    -------
+    find_longest_substring(partial)
+        Finds the longest substring of the sequence that is also a substring of the partial sequence.
+
+    """
+    def __init__(self, sequence):
+        super(SuffixAutomaton, self).__init__()
+        self.sequence = sequence
+        self._length = [0]
+        self._link = [-1]
+        self._first_end = [-1]
+        self._next = [{}]
+        self._build()
+
+    def _add_state(self, length, link, first_end, transitions):
+        """Private function for adding a state to the automaton.
+
+        Parameters
+        ----------
+        length : int
+            The length of the longest string in the state.
+        link : int
+            The index of the suffix link state.
+        first_end : int
+            The end index of the first occurrence of the state's strings in the sequence.
+        transitions : dict
+            Containing the characters with the index of the state they transition to.
+
+        Returns
+        -------
+        int
+            The index of the added state.
+
+        """
+        self._length.append(length)
+        self._link.append(link)
+        self._first_end.append(first_end)
+        self._next.append(transitions)
+        return len(self._length) - 1
+
+    def _build(self):
+        """Private function for extending the automaton with each character of the sequence."""
+        last = 0
+        for index, char in enumerate(self.sequence):
+            cur = self._add_state(self._length[last] + 1, 0, index, {})
+
+            # Add the transitions to the new state, until a state already has one for the character.
+            state = last
+            while state != -1 and char not in self._next[state]:
+                self._next[state][char] = cur
+                state = self._link[state]
+            if state != -1:
+                other = self._next[state][char]
+                if self._length[state] + 1 == self._length[other]:
+                    self._link[cur] = other
+                else:
+
+                    # Split the other state by cloning it with the shorter length.
+                    clone = self._add_state(self._length[state] + 1, self._link[other], self._first_end[other],
+                                            dict(self._next[other]))
+                    while state != -1 and self._next[state].get(char) == other:
+                        self._next[state][char] = clone
+                        state = self._link[state]
+                    self._link[other] = clone
+                    self._link[cur] = clone
+            last = cur
+
+    def find_longest_substring(self, partial):
+        """Finds the longest substring of the sequence that is also a substring of the partial sequence.
+
+        Parameters
+        ----------
+        partial : str
+            A partial length sequence string to compare against the sequence.
+
+        Returns
+        -------
+        str
+            The longest common substring, when multiple are found the one that ends first in the sequence is returned.
+
+        """
+        state, length = 0, 0
+        best_length, best_end = 0, 0
+        for char in partial:
+
+            # Shorten the current match until it can be extended with the character.
+            while state and char not in self._next[state]:
+                state = self._link[state]
+                length = self._length[state]
+            if char in self._next[state]:
+                state = self._next[state][char]
+                length += 1
+            else:
+                continue
+
+            # Keep the longest match, or the one that occurs first in the sequence for equal lengths.
+            end = self._first_end[state] + 1
+            if length > best_length or (length == best_length and end < best_end):
+                best_length, best_end = length, end
+        return self.sequence[best_end - best_length: best_end]
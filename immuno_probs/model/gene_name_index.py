@@ -0,0 +1,122 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Contains GeneNameIndex class for locating gene choices in a list of reference gene names."""
+
+
+class GeneNameIndex(object):
+    """Maps gene families, family-genes and alleles to the reference gene names that contain them.
+
+    The index is built once for a list of reference gene names, after which '|' separated gene choice strings (e.g.
+    'TRBV7-2*01|TRBV7-3') are resolved through dictionary lookups. The resolved gene choices are memoized as tuples, so
+    the memoized values can't be modified by the callers.
+
+    Parameters
+    ----------
+    ref_genes : list
+        Containing the reference gene name string values.
+
+    Methods
+    -------
+    locate(choice, use_allele)
+        Returns the reference gene names matching the given gene choice string.
+
+    """
+    def __init__(self, ref_genes):
+        super(GeneNameIndex, self).__init__()
+        self.ref_genes = list(ref_genes)
+        self._names = {}
+        self._alleles = {}
+        self._choices = {}
+
+        # Index the families, family-genes and alleles found in the reference gene names.
+        for ref_gene in self.ref_genes:
+            name = ref_gene.split('*')
+            parts = name[0].split('-')
+            self._lookup(self._names, parts[0])
+            if len(parts) > 1:
+                self._lookup(self._names, parts[0] + '-' + parts[1])
+            if len(name) > 1:
+                self._lookup(self._alleles, '*' + name[1])
+
+    def _lookup(self, table, value):
+        """Private function that returns the reference gene names containing the value, indexing it if not yet known.
+
+        Parameters
+        ----------
+        table : dict
+            The index to look up the value in.
+        value : str
+            The substring to search for in the reference gene names.
+
+        Returns
+        -------
+        frozenset
+            Containing the reference gene names that contain the given value.
+
+        """
+        try:
+            return table[value]
+        except KeyError:
+            table[value] = frozenset(i for i in self.ref_genes if value in i)
+            return table[value]
+
+    def locate(self, choice, use_allele):
+        """Locates all the genes from the given gene choice string in the reference gene names.
+
+        If a gene family value is specified instead of the whole gene (family + gene identifier), all possible genes within
+        that family are located.
+
+        Parameters
+        ----------
+        choice : str
+            Containing one or more gene names separated by a '|' character.
+        use_allele : bool
+            If True, the allele information from the gene choice is used to select the reference genes.
+
+        Returns
+        -------
+        tuple
+            A sorted tuple with the genes that where located in the reference gene names. If no genes where found, an empty
+            tuple is returned.
+
+        """
+        key = (choice, use_allele)
+        if key in self._choices:
+            return self._choices[key]
+
+        # For each given gene, split up the name into family, gene and allele.
+        located_genes = set()
+        for name in choice.split('|'):
+            name = name.split('*')
+            name[0] = name[0].split('-')
+            family, gene, allele = [None] * 3
+            if len(name[0]) == 2:
+                family, gene = name[0][0], name[0][1]
+            else:
+                family = name[0][0]
+            if len(name) == 2 and use_allele:
+                allele = name[1]
+
+            # Collect the subsection of the genes using the index.
+            if not family:
+                continue
+            genes = self._lookup(self._names, family + '-' + gene if gene else family)
+            if allele:
+                genes = genes & self._lookup(self._alleles, '*' + allele)
+            located_genes.update(genes)
+        self._choices[key] = tuple(sorted(located_genes))
+        return self._choices[key]
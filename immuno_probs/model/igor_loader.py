@@ -18,7 +18,25 @@
 """Contains IgorLoader class for loading in a IGoR model files."""
 
 
+import os
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 import olga.load_model as olga_load_model
+from pkg_resources import get_distribution, DistributionNotFound
+
+from immuno_probs.model.gene_name_index import GeneNameIndex
+from immuno_probs.model.igor_marginals import IgorMarginals
+from immuno_probs.util.cache import hash_files, touch_cache_file
+
+
+try:
+    OLGA_VERSION = get_distribution('olga').version
+except DistributionNotFound:
+    OLGA_VERSION = 'unknown'
+MODEL_CACHE_VERSION = 3
 
 
 class IgorLoader(object):
@@ -32,6 +50,10 @@ class IgorLoader(object):
         A file path location for the IGoR parameters model file.
     model_marginals : str
         A file path location for the IGoR marginals model file.
+    cache_dir : str, optional
+        A persistent directory path for caching the loaded and initialized model objects, these are reused when the model
+        and anchor files have the same content. Since the cached objects are unpickled, the directory should only be writable
+        by the current user, see 'get_cache_dir' (default: the model is not cached).
 
     Methods
     -------
@@ -41,20 +63,116 @@ class IgorLoader(object):
         Initializes the model including the anchor files.
     get_type()
         Returns the type of the model ('VDJ' or 'VJ').
+    get_marginals()
+        Return the IgorMarginals object with the parsed model marginals.
     get_genomic_data()
         Return the OLGA's GenomicData object.
     get_generative_model()
         Return the OLGA's GenerativeModel object.
+    get_gene_index(gene)
+        Return the GeneNameIndex object for the V or J reference genes.
+    get_fingerprint()
+        Returns a hash value of the model and anchor files.
 
     """
-    def __init__(self, model_type, model_params, model_marginals):
+    def __init__(self, model_type, model_params, model_marginals, cache_dir=None):
         super(IgorLoader, self).__init__()
-        self.type = self._check_type(model_type, model_marginals)
-        self.data = self._load_params(model_params)
-        self.model = self._load_model(model_marginals)
         self.params = model_params
+        self.marginals = model_marginals
+        self.cache_dir = cache_dir
         self.v_anchors = None
         self.j_anchors = None
+        self.gene_index = {}
+        self.fingerprint = None
+        self.marginal_data = None
+
+        # Load the model from the cache or parse the model files.
+        cache_key = None
+        if self.cache_dir:
+            cache_key = hash_files(files=[model_params, model_marginals],
+                                   salt='{}:{}:{}'.format(MODEL_CACHE_VERSION, OLGA_VERSION, model_type))
+        cached = self._read_cache(cache_key)
+        if cached is not None:
+            self.type, self.data, self.model = cached
+        else:
+            self.type = self._check_type(model_type, model_marginals)
+            self.data = self._load_params(model_params)
+            self.model = self._load_model(model_marginals)
+            self._write_cache(cache_key, (self.type, self.data, self.model))
+
+    def _read_cache(self, key):
+        """Private function for loading model objects from the cache directory.
+
+        Parameters
+        ----------
+        key : str
+            The hash value identifying the cached objects.
+
+        Returns
+        -------
+        tuple
+            Containing the cached objects, or None if the objects are not cached or could not be loaded.
+
+        """
+        if not self.cache_dir or key is None:
+            return None
+        cached_file = os.path.join(self.cache_dir, key + '.pkl')
+        try:
+            with open(cached_file, 'rb') as infile:
+                objects = pickle.load(infile)
+        except (IOError, EOFError, ValueError, TypeError, AttributeError, ImportError, IndexError, pickle.UnpicklingError):
+            return None
+        touch_cache_file(cached_file)
+        return objects
+
+    def _write_cache(self, key, objects):
+        """Private function for storing model objects in the cache directory.
+
+        The objects are written to a temporary file first, so other processes never load a partially written file.
+
+        Parameters
+        ----------
+        key : str
+            The hash value identifying the cached objects.
+        objects : tuple
+            Containing the objects to store.
+
+        """
+        if not self.cache_dir or key is None:
+            return
+        temp_file = os.path.join(self.cache_dir, '{}.{}.tmp'.format(key, os.getpid()))
+        try:
+            with open(temp_file, 'wb') as outfile:
+                pickle.dump(objects, outfile, pickle.HIGHEST_PROTOCOL)
+            os.rename(temp_file, os.path.join(self.cache_dir, key + '.pkl'))
+        except (IOError, OSError, pickle.PicklingError):
+            if os.path.isfile(temp_file):
+                os.remove(temp_file)
+
+    @staticmethod
+    def _parse_marginals(model_marginals):
+        """Private function for parsing the IGoR model marginals file.
+
+        Parameters
+        ----------
+        model_marginals : str
+            A file path location for the IGoR marginals model file.
+
+        Returns
+        -------
+        IgorMarginals object
+            The parsed events and marginal probabilities of the model.
+
+        Raises
+        ------
+        OSError
+            When the model marginals file cannot be parsed.
+
+        """
+        try:
+            return IgorMarginals(model_marginals)
+        except (IOError, ValueError, IndexError) as err:
+            raise OSError(err)
 
     @staticmethod
     def _check_type(model_type, model_marginals):
@@ -79,21 +197,20 @@ class IgorLoader(object):
             When the model marginals are not compliant to the given model type.
 
         """
-        # Parse the marginals file and search for VDJ classifiers.
-        v_choice = False
-        d_gene = False
-        j_choice = False
+        # Scan the marginals file for the VDJ classifiers, until all of them have been found.
+        classifiers = {'@v_choice': False, '@d_gene': False, '@j_choice': False}
         with open(model_marginals, 'r') as infile:
             for line in infile:
-                if line == '@v_choice\n':
-                    v_choice = True
-                elif line == '@d_gene\n':
-                    d_gene = True
-                elif line == '@j_choice\n':
-                    j_choice = True
-        if (v_choice and d_gene and j_choice) and (model_type in ['beta', 'heavy']):
+                line = line.rstrip('\n')
+                if line in classifiers:
+                    classifiers[line] = True
+                    if all(classifiers.values()):
+                        break
+        if (classifiers['@v_choice'] and classifiers['@d_gene'] and classifiers['@j_choice']) \
+                and (model_type in ['beta', 'heavy']):
             return 'VDJ'
-        if (v_choice and j_choice and not d_gene) and (model_type in ['alpha', 'light']):
+        if (classifiers['@v_choice'] and classifiers['@j_choice'] and not classifiers['@d_gene']) \
+                and (model_type in ['alpha', 'light']):
             return 'VJ'
         raise TypeError("Model is not compliant to the given type: '{}''".format(model_type))
 
@@ -157,6 +274,11 @@ class IgorLoader(object):
         OSError
             When OLGA produces and system error with the input data.
 
+        Notes
+        -----
+        The processed model object is stored in the model cache, so OLGA only parses the marginals file once for every model
+        when a cache directory is given.
+
         """
         # Try to create the GenerativeModel object for VDJ or VJ.
         try:
@@ -197,6 +319,8 @@ class IgorLoader(object):
 
         """
         gene = gene.upper()
+        self.fingerprint = None
+        self.marginal_data = None
         if gene == "V":
             self.v_anchors = file
         elif gene == "J":
@@ -217,9 +341,20 @@ class IgorLoader(object):
         Notes
         -----
         This function uses the model marginals and parameters data that has already been loaded through trhe class constructor
-        and updates this model object with the CDR3 anchor files.
+        and updates this model object with the CDR3 anchor files. If a cache directory is given, the initialized data model is
+        loaded from the cache if available.
 
         """
+        # Compute the fingerprint of the model files once, and load the initialized data model from the cache if available.
+        self.fingerprint = self.get_fingerprint()
+        cache_key = None
+        if self.cache_dir:
+            cache_key = hash_files(files=[self.params, self.marginals, self.v_anchors, self.j_anchors],
+                                   salt='{}:{}:{}:initialized'.format(MODEL_CACHE_VERSION, OLGA_VERSION, self.type))
+        cached = self._read_cache(cache_key)
+        if cached is not None:
+            self.data, self.gene_index = cached
+            return
 
         # Try to load the anchor files into the data model for VDJ.
         try:
@@ -236,8 +371,15 @@ class IgorLoader(object):
             self.data.generate_cutV_genomic_CDR3_segs()
             self.data.generate_cutJ_genomic_CDR3_segs()
 
+            # Index the V and J reference gene names for locating gene choices.
+            self.gene_index = {
+                'V': GeneNameIndex([i[0] for i in self.data.genV]),
+                'J': GeneNameIndex([i[0] for i in self.data.genJ]),
+            }
+
         except Exception as err:
             raise OSError(err)
+        self._write_cache(cache_key, (self.data, self.gene_index))
 
     def get_type(self):
         """Collects and returns the type of the model.
@@ -250,6 +392,25 @@ class IgorLoader(object):
         """
         return self.type
 
+    def get_marginals(self):
+        """Collects and returns the parsed IGoR model marginals.
+
+        Returns
+        -------
+        IgorMarginals object
+            The events and their arrays of marginal probabilities of the model. The marginals file is parsed on the first
+            call.
+
+        Raises
+        ------
+        OSError
+            When the model marginals file cannot be parsed.
+
+        """
+        if self.marginal_data is None:
+            self.marginal_data = self._parse_marginals(self.marginals)
+        return self.marginal_data
+
     def get_genomic_data(self):
         """Collects and returns the GenomicData OLGA object.
 
@@ -271,3 +432,45 @@ class IgorLoader(object):
 
         """
         return self.model
+
+    def get_gene_index(self, gene):
+        """Collects and returns the reference gene name index for the given gene.
+
+        Parameters
+        ----------
+        gene : str
+            A gene identifier, either 'V' or 'J'.
+
+        Returns
+        -------
+        GeneNameIndex object
+            The index of the V or J reference gene names, available after the model has been initialized.
+
+        Raises
+        ------
+        ValueError
+            When the given gene character does not equal 'V' or 'J', or the model has not been initialized.
+
+        """
+        gene = gene.upper()
+        if gene not in self.gene_index:
+            raise ValueError("No gene index found for gene identifier, should be either 'V' or 'J'", gene)
+        return self.gene_index[gene]
+
+    def get_fingerprint(self):
+        """Collects and returns a hash value identifying the content of the model and CDR3 anchor files.
+
+        Returns
+        -------
+        str
+            A SHA-1 hexadecimal digest of the model type, parameters, marginals and CDR3 anchor files.
+
+        Notes
+        -----
+        The hash value is computed when initializing the model and stored, so the files are not hashed on every call.
+
+        """
+        if self.fingerprint is None:
+            self.fingerprint = hash_files(files=[self.params, self.marginals, self.v_anchors, self.j_anchors],
+                                          salt=self.type)
+        return self.fingerprint
@@ -0,0 +1,135 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Contains IgorMarginals class for parsing IGoR model marginals files."""
+
+
+import re
+
+import numpy
+
+
+class IgorMarginals(object):
+    """Parses an IGoR model marginals file into arrays in a single pass over the file.
+
+    Parameters
+    ----------
+    file : str
+        A file path location for the IGoR marginals model file.
+
+    Attributes
+    ----------
+    arrays : dict
+        Containing the event names (e.g. 'v_choice') with the numpy.ndarray of their marginal probabilities.
+    dimensions : dict
+        Containing the event names with the list of event names for the dimensions of their array, the event itself is
+        the last dimension.
+
+    Methods
+    -------
+    get_model_type()
+        Returns the type of the model ('VDJ' or 'VJ') based on the events in the file.
+    get_array(event)
+        Returns the array of marginal probabilities for the given event.
+
+    """
+    _INDEX_PATTERN = re.compile(r'\[([^,\]]+),(\d+)\]')
+
+    def __init__(self, file):
+        super(IgorMarginals, self).__init__()
+        self.arrays = {}
+        self.dimensions = {}
+        self._parse(file)
+
+    def _parse(self, file):
+        """Private function that reads the events, their dimensions and marginal probabilities from the file.
+
+        Parameters
+        ----------
+        file : str
+            A file path location for the IGoR marginals model file.
+
+        Raises
+        ------
+        ValueError
+            When the file contains values outside of an event or values that don't match the event's dimensions.
+
+        """
+        event = None
+        array = None
+        index = ()
+        with open(file, 'r') as infile:
+            for line in infile:
+                line = line.rstrip('\n')
+                if not line:
+                    continue
+
+                # Start a new event and create its array from the dimensions line.
+                if line[0] == '@':
+                    event = line[1:]
+                elif line[0] == '$':
+                    array = numpy.zeros([int(i) for i in line[5:-1].split(',')])
+                    self.arrays[event] = array
+
+                # Collect the index of the next values, the first index line defines the dimension names.
+                elif line[0] == '#':
+                    if event not in self.dimensions:
+                        self.dimensions[event] = [i for i, _ in self._INDEX_PATTERN.findall(line)] + [event]
+                    index = tuple(int(i) for _, i in self._INDEX_PATTERN.findall(line))
+                elif line[0] == '%':
+                    if array is None:
+                        raise ValueError("Marginal values found outside of an event in file '{}'".format(file))
+                    values = numpy.array(line[1:].split(','), dtype=numpy.float64)
+                    if len(values) != array.shape[-1]:
+                        raise ValueError("Marginal values for event '{}' do not match its dimensions".format(event))
+                    array[index] = values
+
+    def get_model_type(self):
+        """Collects the type of the model based on the gene choice events in the file.
+
+        Returns
+        -------
+        str
+            Specifying the model type, either 'VJ' or 'VDJ'. None if the V and J gene choice events are not found.
+
+        """
+        if 'v_choice' not in self.arrays or 'j_choice' not in self.arrays:
+            return None
+        if 'd_gene' in self.arrays:
+            return 'VDJ'
+        return 'VJ'
+
+    def get_array(self, event):
+        """Collects the array of marginal probabilities for the given event.
+
+        Parameters
+        ----------
+        event : str
+            The name of the event (e.g. 'v_choice' or 'vj_ins').
+
+        Returns
+        -------
+        numpy.ndarray
+            The marginal probabilities of the event, with a dimension per event name in 'dimensions'.
+
+        Raises
+        ------
+        KeyError
+            When the event is not found in the marginals file.
+
+        """
+        return self.arrays[event]
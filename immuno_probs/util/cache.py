@@ -0,0 +1,370 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Contains a collection of caching classes and functions."""
+
+
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import stat
+import time
+
+from immuno_probs.util.constant import get_config_data
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def hash_files(files, salt=''):
+    """Collects a hash value identifying the content of the given files.
+
+    Parameters
+    ----------
+    files : list
+        Containing the file paths to hash, None values are hashed as an empty file.
+    salt : str, optional
+        A value that is hashed before the files, e.g. for versioning the hash (default: no value).
+
+    Returns
+    -------
+    str
+        A SHA-1 hexadecimal digest of the salt and the content of the files.
+
+    """
+    digest = hashlib.sha1(salt.encode('utf-8'))
+    for file in files:
+        digest.update(b'\0')
+        if file is None:
+            continue
+        with open(file, 'rb') as infile:
+            block = infile.read(65536)
+            while block:
+                digest.update(block)
+                block = infile.read(65536)
+    return digest.hexdigest()
+
+
+def is_private_dir(directory):
+    """Checks if the given directory is owned by the current user and can't be written by other users.
+
+    Parameters
+    ----------
+    directory : str
+        The path of the directory to check.
+
+    Returns
+    -------
+    bool
+        True if the directory is owned by the current user and not writable by the group or others, otherwise False. On
+        systems without user ids only checks if the directory exists.
+
+    """
+    try:
+        status = os.stat(directory)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(status.st_mode):
+        return False
+    if not hasattr(os, 'getuid'):
+        return True
+    return status.st_uid == os.getuid() and not status.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def clean_cache_dir(directory, max_age):
+    """Removes the files from the cache directory that have not been used for the given number of days.
+
+    The cached files are touched when they are reused, so the modification time of a file is the last time it was used.
+
+    Parameters
+    ----------
+    directory : str
+        The path of the cache directory to clean.
+    max_age : float
+        The maximum number of days since a file was last used, zero or lower keeps all of the files.
+
+    Returns
+    -------
+    int
+        The number of removed files.
+
+    """
+    if max_age <= 0:
+        return 0
+    oldest = time.time() - max_age * 86400
+    num_removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < oldest:
+                os.remove(path)
+                num_removed += 1
+        except OSError:
+            continue
+    return num_removed
+
+
+def touch_cache_file(file):
+    """Updates the modification time of a reused cache file, so it is kept by 'clean_cache_dir'.
+
+    Parameters
+    ----------
+    file : str
+        The path of the cached file.
+
+    """
+    try:
+        os.utime(file, None)
+    except OSError:
+        pass
+
+
+def get_cache_dir(name):
+    """Collects and creates the persistent directory for caching files between runs.
+
+    The directory is located in the EXPERT CACHE_DIR directory, or in the user's cache directory if not specified
+    ('$XDG_CACHE_HOME/immuno_probs' or '~/.cache/immuno_probs'). The directories are created with permissions for the
+    current user only. Since the cached files are loaded as pickled objects, the cache is not used if the directories are
+    owned by another user or can be written by other users. Files that have not been used for EXPERT CACHE_MAX_AGE days
+    are removed from the directory.
+
+    Parameters
+    ----------
+    name : str
+        The name of the sub directory for the type of cached files.
+
+    Returns
+    -------
+    str
+        The cache directory path, or None if caching is disabled (EXPERT USE_CACHE), the directory can't be created or is
+        not private to the current user.
+
+    """
+    if not get_config_data('EXPERT', 'USE_CACHE', 'bool'):
+        return None
+    base_dir = get_config_data('EXPERT', 'CACHE_DIR')
+    if not base_dir:
+        base_dir = os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'immuno_probs')
+    cache_dir = os.path.join(base_dir, name)
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+    except OSError:
+        if not os.path.isdir(cache_dir):
+            return None
+
+    # Only use the directories if no other user can place files in them.
+    for directory in [base_dir, cache_dir]:
+        if not is_private_dir(directory):
+            _LOGGER.warning("Not using cache directory '%s', since it is not owned by the current user or is writable "
+                            "by other users", directory)
+            return None
+    clean_cache_dir(cache_dir, get_config_data('EXPERT', 'CACHE_MAX_AGE', 'float'))
+    return cache_dir
+
+
+class LRUCache(object):
+    """A key/value cache that is bounded by discarding the least recently used (LRU) items.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of items to keep in the cache.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups that found the key in the cache.
+    misses : int
+        The number of lookups that did not find the key in the cache.
+
+    Methods
+    -------
+    get(key, default=None)
+        Returns the cached value for the key and marks it as most recently used.
+    put(key, value)
+        Adds the value for the key to the cache, discarding the least recently used item if full.
+    clear()
+        Removes all of the items from the cache and resets the counters.
+
+    """
+    def __init__(self, max_size):
+        super(LRUCache, self).__init__()
+        if max_size < 1:
+            raise ValueError("The cache size needs to be higher than zero", max_size)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """Collects the cached value for the given key.
+
+        Parameters
+        ----------
+        key : object
+            A hashable key to look up in the cache.
+        default : object, optional
+            The value to return if the key is not found in the cache (default: None).
+
+        Returns
+        -------
+        object
+            The cached value, or the default value if the key is not found.
+
+        """
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Adds the value for the given key to the cache.
+
+        Parameters
+        ----------
+        key : object
+            A hashable key to store the value under.
+        value : object
+            The value to store in the cache.
+
+        """
+        self._items.pop(key, None)
+        self._items[key] = value
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        """Removes all of the items from the cache and resets the hit and miss counters."""
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class PgenStore(object):
+    """A persistent SQLite key/value store for generation probabilities that is shared between runs.
+
+    The values are stored per model fingerprint, so the same sequence keys can be stored for different models.
+
+    Parameters
+    ----------
+    file : str
+        The file path location of the SQLite database file, it is created if it does not exist.
+
+    Methods
+    -------
+    get_many(model, keys)
+        Returns the stored nucleotide and aminoacid Pgen values for the given keys.
+    put_many(model, items)
+        Adds or replaces the nucleotide and aminoacid Pgen values for the given keys.
+    close()
+        Closes the connection to the database file.
+
+    """
+    BATCH_SIZE = 500
+
+    def __init__(self, file):
+        super(PgenStore, self).__init__()
+        self.file = file
+        self.connection = sqlite3.connect(file)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS pgen (model TEXT NOT NULL, key TEXT NOT NULL, nt_pgen REAL, aa_pgen REAL, '
+            'PRIMARY KEY (model, key))')
+        self.connection.commit()
+
+    @staticmethod
+    def _serialize(key):
+        """Private function for converting a key tuple into a string to store in the database.
+
+        Parameters
+        ----------
+        key : tuple
+            Containing the (JSON serializable) values that make up the key.
+
+        Returns
+        -------
+        str
+            The serialized key value.
+
+        """
+        return json.dumps(list(key), separators=(',', ':'))
+
+    def get_many(self, model, keys):
+        """Collects the stored Pgen values for the given keys.
+
+        Parameters
+        ----------
+        model : str
+            The fingerprint of the model that was used to calculate the values.
+        keys : list
+            Containing the key tuples to look up in the store.
+
+        Returns
+        -------
+        dict
+            Containing the found keys with a tuple of the nucleotide and aminoacid Pgen values, missing values are NaN.
+
+        """
+        serialized = dict((self._serialize(i), i) for i in keys)
+        lookup = list(serialized)
+        found = {}
+        for i in range(0, len(lookup), self.BATCH_SIZE):
+            batch = lookup[i:i + self.BATCH_SIZE]
+            rows = self.connection.execute(
+                'SELECT key, nt_pgen, aa_pgen FROM pgen WHERE model = ? AND key IN ({})'
+                .format(','.join('?' * len(batch))), [model] + batch)
+            for key, nt_pgen, aa_pgen in rows:
+                found[serialized[key]] = (float('nan') if nt_pgen is None else nt_pgen,
+                                          float('nan') if aa_pgen is None else aa_pgen)
+        return found
+
+    def put_many(self, model, items):
+        """Adds or replaces the Pgen values for the given keys in the store.
+
+        Parameters
+        ----------
+        model : str
+            The fingerprint of the model that was used to calculate the values.
+        items : list
+            Containing tuples of the key tuple, nucleotide Pgen value and aminoacid Pgen value.
+
+        """
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO pgen (model, key, nt_pgen, aa_pgen) VALUES (?, ?, ?, ?)',
+            [(model, self._serialize(key),
+              None if math.isnan(nt_pgen) else float(nt_pgen),
+              None if math.isnan(aa_pgen) else float(aa_pgen)) for key, nt_pgen, aa_pgen in items])
+        self.connection.commit()
+
+    def close(self):
+        """Closes the connection to the database file."""
+        self.connection.close()
@@ -136,6 +136,31 @@ def set_separator(value='tab'):
         CONFIG_DATA.set('COMMON', 'SEPARATOR', separators[value])
 
 
+def set_output_format(value='separated'):
+    """Sets and updates the global OUTPUT_FORMAT variable.
+
+    Parameters
+    ----------
+    value : str, optional
+        The file format to be used when writing output files, either 'separated', 'parquet' or 'feather' (default:
+        separated).
+
+    Raises
+    ------
+    TypeError
+        When the OUTPUT_FORMAT global variable is not of type string.
+    ValueError
+        When the OUTPUT_FORMAT global variable is not a supported file format.
+
+    """
+    if not isinstance(value, str):
+        raise TypeError("The OUTPUT_FORMAT variable needs to be of type string", value)
+    if value not in ['separated', 'parquet', 'feather']:
+        raise ValueError("The OUTPUT_FORMAT variable needs to be 'separated', 'parquet' or 'feather'", value)
+    else:
+        CONFIG_DATA.set('COMMON', 'OUTPUT_FORMAT', value)
+
+
 def set_working_dir(value=os.getcwd()):
     """Sets and updates the global WORKING_DIR variable.
 
@@ -18,13 +18,43 @@
 """Contains a collection of I/O related processing functions."""
 
 
+from __future__ import absolute_import
+
+import bz2
+import gzip
+import io
+from itertools import islice
+import logging
 import os
-from shutil import copy2
+from shutil import copy2, copyfileobj
 
 from Bio import SeqIO
 from Bio.Seq import Seq
 from Bio.SeqIO.FastaIO import SimpleFastaParser
 import pandas
+from pandas.errors import ParserError
+
+from immuno_probs.util.cache import hash_files, touch_cache_file
+from immuno_probs.util.constant import get_config_data
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+COLUMNAR_EXTENSIONS = {'parquet': '.parquet', 'feather': '.feather'}
+_BLOCK_SIZE = 65536
+_LOGGER = logging.getLogger(__name__)
+_REFERENCE_CACHE_VERSION = 1
 
 
 def create_directory_path(directory):
@@ -57,6 +87,203 @@ def create_directory_path(directory):
     return updated_directory
 
 
+def get_compression(file):
+    """Detects the compression of a file by its extension.
+
+    Parameters
+    ----------
+    file : str
+        Location of the file.
+
+    Returns
+    -------
+    str
+        The name of the compression ('gzip', 'bz2', 'xz' or 'zstd'), or None if the file is not compressed.
+
+    """
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(str(file))[1].lower())
+
+
+def strip_compression_extension(file):
+    """Removes the compression extension from a file name.
+
+    Parameters
+    ----------
+    file : str
+        Location or name of the file.
+
+    Returns
+    -------
+    str
+        The file location or name without the compression extension, unchanged if the file is not compressed.
+
+    """
+    if get_compression(file) is None:
+        return str(file)
+    return os.path.splitext(str(file))[0]
+
+
+def open_file(file, mode='r'):
+    """Opens a plain or compressed file, the compression is detected by the file extension.
+
+    Files ending with '.gz', '.bz2', '.xz' or '.zst' are (de)compressed while being read or written. Bzip2 files consisting
+    of multiple streams (e.g. written by pbzip2 or appended to) are read completely.
+
+    Parameters
+    ----------
+    file : str
+        Location of the file to open.
+    mode : str, optional
+        Either 'r' for reading, 'w' for (over)writing or 'a' for appending to the file (default: 'r').
+
+    Returns
+    -------
+    file
+        The opened file object.
+
+    Raises
+    ------
+    ImportError
+        When the module for the compression is not installed ('backports.lzma' for xz, 'zstandard' 0.11 or newer for zstd).
+        These are installed with the 'compression' extra of ImmunoProbs.
+    ValueError
+        When the given mode is not supported.
+
+    """
+    if mode not in ('r', 'w', 'a'):
+        raise ValueError("File mode should be 'r', 'w' or 'a'", mode)
+    compression = get_compression(file)
+    if compression is None:
+        return open(file, mode)
+    if compression == 'gzip':
+        return gzip.open(file, mode + 'b')
+    if compression == 'bz2':
+        if mode == 'r':
+            return io.BufferedReader(_BZ2StreamReader(file), buffer_size=_BLOCK_SIZE)
+        if mode == 'a':
+            return io.BufferedWriter(_BZ2StreamWriter(file), buffer_size=_BLOCK_SIZE)
+        return bz2.BZ2File(file, mode)
+    if compression == 'xz':
+        if lzma is None:
+            raise ImportError("Reading or writing xz compressed files requires the 'backports.lzma' package")
+        return lzma.LZMAFile(file, mode)
+    if zstandard is None:
+        raise ImportError("Reading or writing zstd compressed files requires the 'zstandard' package")
+    if mode == 'r':
+        # Reading across the frames of the file (e.g. written by pzstd or appended to) requires zstandard 0.11 or newer.
+        compressed_file = open(file, 'rb')
+        try:
+            reader = zstandard.ZstdDecompressor().stream_reader(compressed_file, read_across_frames=True)
+        except TypeError:
+            compressed_file.close()
+            raise ImportError("Reading zstd compressed files requires the 'zstandard' package version 0.11 or newer")
+        return io.BufferedReader(reader, buffer_size=_BLOCK_SIZE)
+    return io.BufferedWriter(_ZstdStreamWriter(file, mode), buffer_size=_BLOCK_SIZE)
+
+
+class _BZ2StreamReader(io.RawIOBase):
+    """Private raw file object that decompresses all of the streams in a bzip2 file.
+
+    Parameters
+    ----------
+    file : str
+        Location of the bzip2 compressed file.
+
+    """
+    def __init__(self, file):
+        super(_BZ2StreamReader, self).__init__()
+        self._file = open(file, 'rb')
+        self._decompressor = bz2.BZ2Decompressor()
+        self._unused_data = b''
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        # Decompress the next block, starting a new decompressor when a stream ends.
+        while not self._buffer:
+            data = self._unused_data or self._file.read(_BLOCK_SIZE)
+            self._unused_data = b''
+            if not data:
+                return 0
+            try:
+                self._buffer = self._decompressor.decompress(data)
+            except EOFError:
+                self._decompressor = bz2.BZ2Decompressor()
+                self._buffer = self._decompressor.decompress(data)
+            if self._decompressor.unused_data:
+                self._unused_data = self._decompressor.unused_data
+                self._decompressor = bz2.BZ2Decompressor()
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super(_BZ2StreamReader, self).close()
+
+
+class _BZ2StreamWriter(io.RawIOBase):
+    """Private raw file object that appends the written data as a new stream to a bzip2 file.
+
+    Parameters
+    ----------
+    file : str
+        Location of the bzip2 compressed file.
+
+    """
+    def __init__(self, file):
+        super(_BZ2StreamWriter, self).__init__()
+        self._file = open(file, 'ab')
+        self._compressor = bz2.BZ2Compressor()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._file.write(self._compressor.compress(memoryview(b).tobytes()))
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            self._file.write(self._compressor.flush())
+            self._file.close()
+        super(_BZ2StreamWriter, self).close()
+
+
+class _ZstdStreamWriter(io.RawIOBase):
+    """Private raw file object that writes the written data as a new frame to a zstd file.
+
+    Parameters
+    ----------
+    file : str
+        Location of the zstd compressed file.
+    mode : str
+        Either 'w' for (over)writing or 'a' for appending a frame to the file.
+
+    """
+    def __init__(self, file, mode):
+        super(_ZstdStreamWriter, self).__init__()
+        self._file = open(file, mode + 'b')
+        self._compressor = zstandard.ZstdCompressor().compressobj()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._file.write(self._compressor.compress(memoryview(b).tobytes()))
+        return len(b)
+
+    def close(self):
+        if not self.closed:
+            self._file.write(self._compressor.flush())
+            self._file.close()
+        super(_ZstdStreamWriter, self).close()
+
+
 def is_fasta(file):
     """Checks if the input file is valid FASTA.
 
@@ -66,7 +293,7 @@ def is_fasta(file):
         Location of the FASTA file to be tested.
 
     """
-    with open(file, "r") as fasta_file:
+    with open_file(file) as fasta_file:
         return any(SeqIO.parse(fasta_file, "fasta"))
 
 
@@ -81,11 +308,145 @@ def is_separated(file, separator):
         A separator character used for separating the fields in the file.
 
     """
-    dataframe = pandas.read_csv(file, sep=separator, comment='#', header=0, nrows=100, engine='python')
+    engine = 'python'
+    if _is_c_engine_separator(separator):
+        engine = 'c'
+    with open_file(file) as separated_file:
+        dataframe = pandas.read_csv(separated_file, sep=separator, comment='#', header=0, nrows=100, engine=engine)
     return not dataframe.empty
 
 
-def read_fasta_as_dataframe(file, col, header=None):
+_DETECTED_FILES = {}
+
+
+class InputFileReader(object):
+    """Reads a FASTA or separated data input file of which the format has been detected by 'detect_input_file'.
+
+    Parameters
+    ----------
+    file : str
+        Location of the input file.
+    file_type : str
+        The detected format of the input file, either 'fasta' or 'separated'.
+    separator : str
+        A separator character used for separating the fields in a separated data file.
+
+    Methods
+    -------
+    is_fasta()
+        Returns True if the input file is a FASTA file.
+    is_separated()
+        Returns True if the input file is a separated data file.
+    read(col, index_col=None, cols=None, chunksize=None)
+        Returns the input file as pandas.DataFrame or an iterator yielding it in chunks.
+
+    """
+    def __init__(self, file, file_type, separator):
+        super(InputFileReader, self).__init__()
+        self.file = file
+        self.file_type = file_type
+        self.separator = separator
+
+    def is_fasta(self):
+        """Checks if the input file is a FASTA file.
+
+        Returns
+        -------
+        bool
+            True if the input file has been detected as FASTA.
+
+        """
+        return self.file_type == 'fasta'
+
+    def is_separated(self):
+        """Checks if the input file is a separated data file.
+
+        Returns
+        -------
+        bool
+            True if the input file has been detected as separated data.
+
+        """
+        return self.file_type == 'separated'
+
+    def read(self, col, index_col=None, cols=None, chunksize=None):
+        """Reads in the input file as pandas.DataFrame object.
+
+        Parameters
+        ----------
+        col : str
+            The name of the sequence column for FASTA files.
+        index_col : str, optional
+            The name of the index column to use for separated data files (default: no index column).
+        cols : list, optional
+            Containing column names to keep from separated data files (default: includes all columns).
+        chunksize : int, optional
+            If given, an iterator is returned that yields dataframes with at most this number of rows (default: the whole
+            file is returned as one dataframe).
+
+        Returns
+        -------
+        pandas.DataFrame or iterator
+            The dataframe with the file's data, or an iterator yielding it in chunks if 'chunksize' is given.
+
+        """
+        if self.is_fasta():
+            return read_fasta_as_dataframe(file=self.file, col=col, chunksize=chunksize)
+        return read_separated_to_dataframe(file=self.file, separator=self.separator, index_col=index_col, cols=cols,
+                                           chunksize=chunksize)
+
+
+def detect_input_file(file, separator, sample_size=65536):
+    """Detects if the input file is a FASTA or separated data file by inspecting the first bytes of the file.
+
+    A file is FASTA when its first line (skipping empty and '#' comment lines) starts with a '>' character, and separated
+    data when it contains a header line followed by at least one data line. The result is cached per file path and
+    separator as long as the file is not modified.
+
+    Parameters
+    ----------
+    file : str
+        Location of the input file to be tested.
+    separator : str
+        A separator character used for separating the fields in the file.
+    sample_size : int, optional
+        The number of bytes to inspect from the start of the file (default: 65536).
+
+    Returns
+    -------
+    InputFileReader
+        A reader object for the detected file format, or None if the format could not be detected.
+
+    Raises
+    ------
+    IOError
+        When the input file could not be read.
+
+    """
+    stat = os.stat(file)
+    key = (os.path.abspath(file), separator, stat.st_mtime, stat.st_size)
+    if key in _DETECTED_FILES:
+        return _DETECTED_FILES[key]
+
+    # Read in the first (decompressed) bytes and collect the first (complete) lines.
+    with open_file(file) as infile:
+        sample = infile.read(sample_size)
+    lines = sample.splitlines()
+    if len(sample) == sample_size and not sample.endswith('\n'):
+        lines = lines[:-1]
+    lines = [i for i in lines if i.strip() and not i.startswith('#')]
+
+    # Detect the file format and create the reader.
+    reader = None
+    if lines and lines[0].startswith('>'):
+        reader = InputFileReader(file=file, file_type='fasta', separator=separator)
+    elif len(lines) > 1:
+        reader = InputFileReader(file=file, file_type='separated', separator=separator)
+    _DETECTED_FILES[key] = reader
+    return reader
+
+
+def read_fasta_as_dataframe(file, col, header=None, chunksize=None):
     """Creates a pandas.DataFrame from the FASTA file.
 
     The dataframe contains header name and sequence columns containing the corresponding FASTA data.
@@ -98,33 +459,112 @@ def read_fasta_as_dataframe(file, col, header=None):
         The name of the FASTA sequence column.
     header : str, optional
         The name of the FASTA header column. If not given, the header is not included in the dataframe.
+    chunksize : int, optional
+        If given, an iterator is returned that yields dataframes with at most this number of records. The index values
+        continue between the chunks (default: the whole file is returned as one dataframe).
+
+    Returns
+    -------
+    pandas.DataFrame or iterator
+        The dataframe with the FASTA data, or an iterator yielding it in chunks if 'chunksize' is given.
+
+    """
+    if chunksize:
+        return _iterate_fasta_chunks(file=file, col=col, header=header, chunksize=chunksize)
+
+    # Collect the records and build the dataframe at once.
+    with open_file(file) as fasta_file:
+        return _fasta_records_to_dataframe(records=list(SimpleFastaParser(fasta_file)), col=col, header=header)
+
+
+def _fasta_records_to_dataframe(records, col, header, offset=0):
+    """Private function that builds a pandas.DataFrame from FASTA records.
+
+    Parameters
+    ----------
+    records : list
+        Containing tuples with the header and sequence of each FASTA record.
+    col : str
+        The name of the FASTA sequence column.
+    header : str
+        The name of the FASTA header column. If None, the header is not included in the dataframe.
+    offset : int, optional
+        The index value of the first record (default: 0).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Containing the (uppercase) sequences and optionally the headers of the records.
 
     """
-    # Setup the column names.
     columns = [col]
+    data = {col: [sequence.upper() for _, sequence in records]}
     if header:
         columns.insert(0, header)
+        data[header] = [title for title, _ in records]
+    return pandas.DataFrame(data, columns=columns, index=pandas.RangeIndex(offset, offset + len(records)))
+
+
+def _iterate_fasta_chunks(file, col, header, chunksize):
+    """Private generator function that reads the FASTA file as pandas.DataFrame chunks.
+
+    Parameters
+    ----------
+    file : str
+        Location of the FASTA file to be read in.
+    col : str
+        The name of the FASTA sequence column.
+    header : str
+        The name of the FASTA header column. If None, the header is not included in the dataframe.
+    chunksize : int
+        The maximum number of records in each of the dataframes.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The FASTA header and sequence data of the next records in the file.
+
+    """
+    offset = 0
+    with open_file(file) as fasta_file:
+        records = SimpleFastaParser(fasta_file)
+        while True:
+            chunk = list(islice(records, chunksize))
+            if not chunk:
+                return
+            yield _fasta_records_to_dataframe(records=chunk, col=col, header=header, offset=offset)
+            offset += len(chunk)
+
+
+def get_separated_dtypes():
+    """Collects the data types of the known ImmunoProbs columns for reading separated files.
 
-    # Create a dataframe and read in the fasta file.
-    fasta_df = pandas.DataFrame(columns=columns)
-    with open(file, 'r') as fasta_file:
-        for title, sequence in SimpleFastaParser(fasta_file):
-            if header:
-                fasta_df = fasta_df.append({
-                    header: title,
-                    col: sequence.upper()
-                }, ignore_index=True)
-            else:
-                fasta_df = fasta_df.append({
-                    col: sequence.upper()
-                }, ignore_index=True)
-    return fasta_df
-
-
-def read_separated_to_dataframe(file, separator, index_col=None, cols=None):
+    The sequence columns are read as strings, the gene columns as categoricals and the CDR3 length column as integer (the
+    nullable 'Int64' type if it contains NA values).
+
+    Returns
+    -------
+    dict
+        Containing the configured column names with their pandas data type.
+
+    """
+    dtypes = {}
+    for col in ['NT_COL', 'AA_COL', 'FRAME_TYPE_COL']:
+        dtypes[get_config_data('COMMON', col)] = object
+    for col in ['V_RESOLVED_COL', 'J_RESOLVED_COL', 'V_GENE_CHOICE_COL', 'D_GENE_CHOICE_COL', 'J_GENE_CHOICE_COL']:
+        dtypes[get_config_data('COMMON', col)] = 'category'
+    dtypes[get_config_data('COMMON', 'CDR3_LENGTH_COL')] = 'Int64'
+    return dtypes
+
+
+def read_separated_to_dataframe(file, separator, index_col=None, cols=None, chunksize=None, dtypes=None):
     """Read in a separated file as pandas.DataFrame object.
 
-    Comments ('#') in the file are skipped. If the given index column contains NA values, the column is ignored.
+    Comments ('#') in the file are skipped. If the given index column contains NA values, the column is ignored. Compressed
+    files are decompressed while reading, based on their extension (see 'open_file'). The file is
+    parsed with pandas' C engine and declared data types for the known columns. If the separator requires the python engine
+    (multi-character or regex separators) or the C engine fails to parse the file, the python engine is used instead and
+    the declared data types are applied after parsing. Columns that can't be converted keep their parsed type.
 
     Parameters
     ----------
@@ -138,6 +578,17 @@ def read_separated_to_dataframe(file, separator, index_col=None, cols=None):
     cols : list, optional
         Containing column names to keep in the output file. The order will change the output file column formatting
         (default: includes all columns in the output file).
+    chunksize : int, optional
+        If given, an iterator is returned that yields dataframes with at most this number of rows. The index column is
+        checked for NA values per chunk (default: the whole file is returned as one dataframe).
+    dtypes : dict, optional
+        Containing column names with the data type to use, columns not in the file are ignored (default: the data types
+        from 'get_separated_dtypes').
+
+    Returns
+    -------
+    pandas.DataFrame or iterator
+        The dataframe with the file's data, or an iterator yielding it in chunks if 'chunksize' is given.
 
     Raises
     -------
@@ -146,21 +597,207 @@ def read_separated_to_dataframe(file, separator, index_col=None, cols=None):
 
     """
     # Read in columns of the given file.
+    kwargs = {
+        'sep': separator,
+        'comment': '#',
+        'header': 0,
+        'na_values': ['na', 'unknown', 'unresolved', 'no data'],
+        'chunksize': chunksize or None,
+    }
     if cols:
-        if index_col:
-            cols.insert(0, index_col)
-        separated_df = pandas.read_csv(file, sep=separator, comment='#', header=0,
-                                       usecols=lambda value: value in cols,
-                                       na_values=['na', 'unknown', 'unresolved', 'no data'],
-                                       engine='python')
-        if separated_df.empty:
+        cols = ([index_col] if index_col else []) + list(cols)
+        kwargs['usecols'] = lambda value: value in cols
+    # The nullable integer columns are converted after parsing, since this is slow in the parser.
+    if dtypes is None:
+        dtypes = get_separated_dtypes()
+    parse_dtypes = dict((i, dtypes[i]) for i in dtypes if dtypes[i] != 'Int64')
+    engines = ['c', 'python'] if _is_c_engine_separator(separator) else ['python']
+    if chunksize:
+        return _iterate_separated_chunks(file, engines, parse_dtypes, kwargs, index_col, cols, dtypes)
+    for engine in engines:
+        try:
+            separated_df = _read_csv(file=file, engine=engine, dtypes=parse_dtypes, kwargs=kwargs)
+            break
+        except (ParserError, ValueError, TypeError):
+            if engine == engines[-1]:
+                raise
+    return _format_separated_dataframe(separated_df, index_col, cols, dtypes)
+
+
+def _read_csv(file, engine, dtypes, kwargs):
+    """Private function that parses the (compressed) separated file with pandas.
+
+    Parameters
+    ----------
+    file : str
+        File path to be read in as dataframe.
+    engine : str
+        The pandas parser engine to use, either 'c' or 'python'. The data types are only declared for the C engine.
+    dtypes : dict
+        Containing column names with the data type to use for the C engine.
+    kwargs : dict
+        Containing the other keyword arguments for 'pandas.read_csv'.
+
+    Returns
+    -------
+    pandas.DataFrame or generator
+        The parsed dataframe, or a generator yielding the parsed chunks if a chunk size is given in the keyword arguments.
+        The file is closed when the generator is finished or closed.
+
+    """
+    kwargs = dict(kwargs, engine=engine, dtype=dtypes if engine == 'c' else None)
+    if kwargs['chunksize']:
+        return _iterate_csv_chunks(file, kwargs)
+    if get_compression(file) is None:
+        return pandas.read_csv(file, **kwargs)
+    with open_file(file) as separated_file:
+        return pandas.read_csv(separated_file, **kwargs)
+
+
+def _iterate_csv_chunks(file, kwargs):
+    """Private generator function that parses the (compressed) separated file with pandas in chunks.
+
+    Parameters
+    ----------
+    file : str
+        File path to be read in as dataframe.
+    kwargs : dict
+        Containing the keyword arguments for 'pandas.read_csv', including the chunk size.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The next parsed chunk of the separated file.
+
+    """
+    separated_file = None if get_compression(file) is None else open_file(file)
+    try:
+        reader = pandas.read_csv(file if separated_file is None else separated_file, **kwargs)
+        try:
+            for chunk in reader:
+                yield chunk
+        finally:
+            reader.close()
+    finally:
+        if separated_file is not None:
+            separated_file.close()
+
+
+def _iterate_separated_chunks(file, engines, parse_dtypes, kwargs, index_col, cols, dtypes):
+    """Private generator function that reads and formats the dataframe chunks of a separated file.
+
+    If an engine fails to parse a chunk, the file is read again with the next engine and the chunks that have already been
+    yielded are skipped.
+
+    Parameters
+    ----------
+    file : str
+        File path to be read in as dataframe.
+    engines : list
+        Containing the pandas parser engines to try in order.
+    parse_dtypes : dict
+        Containing column names with the data type to use for the C engine.
+    kwargs : dict
+        Containing the other keyword arguments for 'pandas.read_csv', including the chunk size.
+    index_col : str
+        The name of the index column to use, only used if it does not contain NA values.
+    cols : list
+        Containing column names that were selected from the file.
+    dtypes : dict
+        Containing column names with the data type to convert the chunks to after parsing.
+
+    Yields
+    ------
+    pandas.DataFrame
+        The next formatted chunk of the separated file.
+
+    """
+    num_yielded = 0
+    for engine in engines:
+        reader = _read_csv(file=file, engine=engine, dtypes=parse_dtypes, kwargs=kwargs)
+        try:
+            num_read = 0
+            while True:
+                try:
+                    chunk = next(reader)
+                except StopIteration:
+                    return
+                except (ParserError, ValueError, TypeError):
+                    if engine == engines[-1]:
+                        raise
+                    break
+                num_read += 1
+                if num_read > num_yielded:
+                    num_yielded += 1
+                    yield _format_separated_dataframe(chunk, index_col, cols, dtypes)
+        finally:
+            reader.close()
+
+
+def _is_c_engine_separator(separator):
+    """Private function that checks if pandas' C engine is able to parse files with the given separator.
+
+    Parameters
+    ----------
+    separator : str
+        A separator character used for separating the fields in the file.
+
+    Returns
+    -------
+    bool
+        True if the separator is a single character or the whitespace regex.
+
+    """
+    return len(separator) == 1 or separator == r'\s+'
+
+
+def _format_separated_dataframe(separated_df, index_col, cols, dtypes=None):
+    """Private function for checking the data types and setting the index column of a dataframe read from a separated file.
+
+    Parameters
+    ----------
+    separated_df : pandas.DataFrame
+        The dataframe read from the separated file.
+    index_col : str
+        The name of the index column to use, only used if it does not contain NA values.
+    cols : list
+        Containing column names that were selected from the file.
+    dtypes : dict, optional
+        Containing column names with the data type to convert the columns to if they were parsed as another type (e.g. by
+        the python engine). The 'Int64' columns are only converted if they were not parsed as integers. Columns that can't
+        be converted keep their type (default: no columns are converted).
+
+    Returns
+    -------
+    pandas.DataFrame
+        The dataframe with the index column set.
+
+    Raises
+    -------
+    KeyError
+        If DataFrame is empty or the specified columns were not found in the input file.
+    ValueError
+        If DataFrame is empty and no columns were specified.
+
+    """
+    if separated_df.empty:
+        if cols:
             raise KeyError("DataFrame is empty, columns '{}' where not found".format(cols))
-    else:
-        separated_df = pandas.read_csv(file, sep=separator, comment='#', header=0,
-                                       na_values=['na', 'unknown', 'unresolved', 'no data'],
-                                       engine='python')
-        if separated_df.empty:
-            raise ValueError('The input DataFrame is empty')
+        raise ValueError('The input DataFrame is empty')
+
+    # Convert the columns that were not parsed as the declared types, and the integer columns that contain NA values.
+    for col, dtype in (dtypes or {}).items():
+        if col not in separated_df.columns:
+            continue
+        if dtype == 'Int64':
+            if pandas.api.types.is_integer_dtype(separated_df[col]):
+                continue
+        elif pandas.api.types.is_dtype_equal(separated_df[col].dtype, dtype):
+            continue
+        try:
+            separated_df[col] = separated_df[col].astype(dtype)
+        except (TypeError, ValueError):
+            pass
 
     # Set the index column, only use if no NA values.
     if index_col and index_col in separated_df.columns:
@@ -170,7 +807,7 @@ def read_separated_to_dataframe(file, separator, index_col=None, cols=None):
     return separated_df
 
 
-def write_dataframe_to_separated(dataframe, filename, directory, separator, index_name=None):
+def write_dataframe_to_separated(dataframe, filename, directory, separator, index_name=None, compression=None):
     """Writes a pandas.DataFrame to a separated formatted data file.
 
     If the file already exists, a number will be appended to the filename. The given output directory is created recursively
@@ -188,45 +825,397 @@ def write_dataframe_to_separated(dataframe, filename, directory, separator, inde
         A separator character used for separating the fields in the file.
     index_name : str, optional
         The output column name for the dataframe index (default: will not write the index to the file).
+    compression : str, optional
+        The extension of the compression to write the file with, either 'gz', 'bz2', 'xz' or 'zst' (default: the file is
+        not compressed).
 
     Returns
     -------
     tuple
         Containing the output directory and the name of the file that has been written to disk.
 
+    Raises
+    ------
+    ValueError
+        When the given compression is not supported.
+
     """
     # Check if the filename is unique, modify name if necessary.
-    file_count = 1
-    updated_filename = filename
-
     extension = '.csv'
     if separator == '\t':
         extension = '.tsv'
+    if compression:
+        if '.' + compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError("Compression should be 'gz', 'bz2', 'xz' or 'zst'", compression)
+        extension += '.' + compression
+    updated_filename = _get_unique_filename(filename=filename, directory=directory, extension=extension)
+
+    # Write dataframe contents to separated file and return info.
+    enable_index = False
+    if index_name:
+        enable_index = True
+    with open_file(os.path.join(directory, updated_filename + extension), 'w') as outfile:
+        dataframe.to_csv(
+            path_or_buf=outfile,
+            sep=separator,
+            index=enable_index,
+            index_label=index_name,
+            na_rep='NA'
+        )
+    return (directory, updated_filename + extension)
+
+
+def _get_unique_filename(filename, directory, extension):
+    """Private function that appends a number to the filename if the file already exists in the directory.
+
+    Parameters
+    ----------
+    filename : str
+        Base filename for writting the file, excluding the extension.
+    directory : str
+        The directory path location of the file.
+    extension : str
+        The extension of the file, including the leading '.' character.
+
+    Returns
+    -------
+    str
+        The updated filename, excluding the extension.
+
+    """
+    file_count = 1
+    updated_filename = filename
 
     # Keep modifying the filename until it doesn't exist.
     while os.path.isfile(os.path.join(directory, updated_filename + extension)):
         updated_filename = str(filename) + '_' + str(file_count)
         file_count += 1
+    return updated_filename
 
-    # Write dataframe contents to separated file and return info.
+
+def write_dataframe_to_columnar(dataframe, filename, directory, file_format, index_name=None):
+    """Writes a pandas.DataFrame to a columnar Parquet or Feather (Arrow IPC) file.
+
+    If the file already exists, a number will be appended to the filename. The gene columns are written as categoricals and
+    the Pgen columns as float64 values, so they are loaded with their data types and without parsing. Requires the
+    'pyarrow' package.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+        The dataframe to be written to the columnar file.
+    filename : str
+        Base filename for writting the file, excluding the extension.
+    directory : str
+        A directory path location to write the file to.
+    file_format : str
+        The columnar file format, either 'parquet' or 'feather'.
+    index_name : str, optional
+        The output column name for the dataframe index (default: will not write the index to the file).
+
+    Returns
+    -------
+    tuple
+        Containing the output directory and the name of the file that has been written to disk.
+
+    Raises
+    ------
+    ImportError
+        When the 'pyarrow' package is not installed.
+    ValueError
+        When the given file format is not supported.
+
+    """
+    # Check if the filename is unique, modify name if necessary.
+    if file_format not in COLUMNAR_EXTENSIONS:
+        raise ValueError("Columnar file format should be 'parquet' or 'feather'", file_format)
+    extension = COLUMNAR_EXTENSIONS[file_format]
+    updated_filename = _get_unique_filename(filename=filename, directory=directory, extension=extension)
+
+    # Store the index as column and set the data types of the known columns.
+    columnar_df = _format_columnar_dataframe(dataframe=dataframe, index_name=index_name)
+
+    # Write dataframe contents to the columnar file and return info.
+    if file_format == 'parquet':
+        columnar_df.to_parquet(os.path.join(directory, updated_filename + extension), engine='pyarrow', index=False)
+    else:
+        columnar_df.to_feather(os.path.join(directory, updated_filename + extension))
+    return (directory, updated_filename + extension)
+
+
+def _format_columnar_dataframe(dataframe, index_name):
+    """Private function that stores the index as column and sets the data types of the known columns for a columnar file.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+        The dataframe to be written to the columnar file.
+    index_name : str
+        The output column name for the dataframe index, None to not write the index to the file.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The formatted copy of the dataframe.
+
+    """
+    if index_name:
+        columnar_df = dataframe.reset_index()
+        columnar_df.rename(columns={columnar_df.columns[0]: index_name}, inplace=True)
+    else:
+        columnar_df = dataframe.reset_index(drop=True)
+    dtypes = dict((i, j) for i, j in get_separated_dtypes().items() if j == 'category')
+    dtypes[get_config_data('COMMON', 'NT_P_COL')] = 'float64'
+    dtypes[get_config_data('COMMON', 'AA_P_COL')] = 'float64'
+    for col in columnar_df.columns:
+        if dtypes.get(col) == 'category':
+            # Use None for NA values, so the categories of columns without values are strings as well.
+            values = columnar_df[col].astype(object)
+            columnar_df[col] = values.where(values.notna(), None).astype('category')
+        elif col in dtypes:
+            columnar_df[col] = columnar_df[col].astype(dtypes[col])
+        elif str(columnar_df[col].dtype) == 'Int64':
+            columnar_df[col] = columnar_df[col].astype('float64' if columnar_df[col].isna().any() else 'int64')
+
+    return columnar_df
+
+
+def _get_columnar_schema(columnar_df):
+    """Private function that creates the pyarrow.Schema for writing the formatted dataframe chunks to a columnar file.
+
+    The types of the known ImmunoProbs columns are fixed (strings, string categoricals, integers and float64 values) and the
+    types of the other columns are taken from the given dataframe, with strings for the columns without values (read in as
+    float NaN values).
+
+    Parameters
+    ----------
+    columnar_df : pandas.DataFrame
+        The formatted (first) dataframe chunk to be written to the columnar file.
+
+    Returns
+    -------
+    pyarrow.Schema
+        The schema with the same index type for all of the categorical columns.
+
+    """
+    import pyarrow
+
+    known_types = {}
+    for col, dtype in get_separated_dtypes().items():
+        if dtype == 'category':
+            known_types[col] = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        elif dtype == 'Int64':
+            known_types[col] = pyarrow.int64()
+        else:
+            known_types[col] = pyarrow.string()
+    known_types[get_config_data('COMMON', 'NT_P_COL')] = pyarrow.float64()
+    known_types[get_config_data('COMMON', 'AA_P_COL')] = pyarrow.float64()
+
+    schema = pyarrow.Table.from_pandas(columnar_df, preserve_index=False).schema
+    fields = []
+    for field in schema:
+        if field.name in known_types:
+            field_type = known_types[field.name]
+        elif pyarrow.types.is_null(field.type) or columnar_df[field.name].isna().all():
+            field_type = pyarrow.string()
+        elif pyarrow.types.is_dictionary(field.type):
+            field_type = pyarrow.dictionary(pyarrow.int32(), field.type.value_type)
+        else:
+            field_type = field.type
+        fields.append(pyarrow.field(field.name, field_type))
+    return pyarrow.schema(fields, metadata=schema.metadata)
+
+
+class ColumnarFileWriter(object):
+    """Writes pandas.DataFrame chunks to a columnar Parquet or Feather file, without keeping the chunks in memory.
+
+    If the file already exists, a number will be appended to the filename. The column types are set like in
+    'write_dataframe_to_columnar', the known ImmunoProbs columns have fixed types in the schema of the file and the types of
+    the other columns are taken from the first chunk, so all of the chunks are converted to the same schema. The Parquet
+    chunks are written as row groups. Feather files (version 1, as written by the 'pyarrow' versions for Python 2) store each
+    column as one array, so the chunks are written as row groups to a temporary Parquet file first and the Feather file is
+    written from it when closing the writer, loading the data into memory once. Requires the 'pyarrow' package.
+
+    Parameters
+    ----------
+    filename : str
+        Base filename for writting the file, excluding the extension.
+    directory : str
+        A directory path location to write the file to.
+    file_format : str
+        The columnar file format, either 'parquet' or 'feather'.
+    index_name : str, optional
+        The output column name for the dataframe index (default: will not write the index to the file).
+
+    Attributes
+    ----------
+    filename : str
+        The name of the file that is written to, including the extension.
+
+    Methods
+    -------
+    write(dataframe)
+        Writes the dataframe as the next chunk of rows to the file.
+    close()
+        Finishes writing the file.
+
+    Raises
+    ------
+    ImportError
+        When the 'pyarrow' package is not installed.
+    ValueError
+        When the given file format is not supported.
+
+    """
+    def __init__(self, filename, directory, file_format, index_name=None):
+        super(ColumnarFileWriter, self).__init__()
+        if file_format not in COLUMNAR_EXTENSIONS:
+            raise ValueError("Columnar file format should be 'parquet' or 'feather'", file_format)
+        import pyarrow.parquet
+        self.directory = directory
+        self.file_format = file_format
+        self.index_name = index_name
+        extension = COLUMNAR_EXTENSIONS[file_format]
+        self.filename = _get_unique_filename(filename=filename, directory=directory, extension=extension) + extension
+        self._file = os.path.join(directory, self.filename)
+        if file_format == 'feather':
+            self._parquet_file = self._file + '.parquet.tmp'
+        else:
+            self._parquet_file = self._file
+        self._schema = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, dataframe):
+        """Writes the dataframe as the next chunk of rows to the file.
+
+        Parameters
+        ----------
+        dataframe : pandas.DataFrame
+            The dataframe to be written to the columnar file.
+
+        """
+        import pyarrow
+        import pyarrow.parquet
+
+        # Create the schema of the file from the first chunk.
+        columnar_df = _format_columnar_dataframe(dataframe=dataframe, index_name=self.index_name)
+        if self._schema is None:
+            self._schema = _get_columnar_schema(columnar_df=columnar_df)
+            self._writer = pyarrow.parquet.ParquetWriter(self._parquet_file, self._schema)
+
+        # Convert the (numeric) values of the string columns, keeping the NA values.
+        for field in self._schema:
+            values = columnar_df[field.name]
+            if pyarrow.types.is_string(field.type) and values.dtype != object:
+                columnar_df[field.name] = values.astype(str).where(values.notna(), None)
+        self._writer.write_table(pyarrow.Table.from_pandas(columnar_df, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        """Finishes writing the file, copying the temporary Parquet file to the Feather file."""
+        import pyarrow.feather
+        import pyarrow.parquet
+
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        if self.file_format != 'feather':
+            return
+
+        # Read the row groups as one dataframe, merging the categories, and write it to the Feather file.
+        try:
+            columnar_df = pyarrow.parquet.read_table(self._parquet_file).to_pandas()
+            pyarrow.feather.write_feather(columnar_df, self._file)
+        finally:
+            os.remove(self._parquet_file)
+
+
+def write_dataframe_to_file(dataframe, filename, directory, file_format, separator, index_name=None, compression=None):
+    """Writes a pandas.DataFrame to a separated, Parquet or Feather file.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+        The dataframe to be written to the file.
+    filename : str
+        Base filename for writting the file, excluding the extension.
+    directory : str
+        A directory path location to write the file to.
+    file_format : str
+        The output file format, either 'separated', 'parquet' or 'feather'.
+    separator : str
+        A separator character used for separating the fields in a separated file.
+    index_name : str, optional
+        The output column name for the dataframe index (default: will not write the index to the file).
+    compression : str, optional
+        The extension of the compression to write a separated file with (default: the file is not compressed).
+
+    Returns
+    -------
+    tuple
+        Containing the output directory and the name of the file that has been written to disk.
+
+    """
+    if file_format == 'separated':
+        return write_dataframe_to_separated(dataframe=dataframe, filename=filename, directory=directory,
+                                            separator=separator, index_name=index_name, compression=compression)
+    return write_dataframe_to_columnar(dataframe=dataframe, filename=filename, directory=directory,
+                                       file_format=file_format, index_name=index_name)
+
+
+def append_dataframe_to_separated(dataframe, filename, directory, separator, index_name=None):
+    """Appends a pandas.DataFrame to an existing separated formatted data file.
+
+    The rows are appended without the column names, so the dataframe needs to have the same column layout as the file. Use
+    this function for writing the remaining chunks after the first one has been written with 'write_dataframe_to_separated'.
+    Compressed files are appended to based on their extension.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+        The dataframe to be appended to the separated data file.
+    filename : str
+        The name of the file to append to, including the extension.
+    directory : str
+        The directory path location of the file.
+    separator : str
+        A separator character used for separating the fields in the file.
+    index_name : str, optional
+        The output column name for the dataframe index (default: will not write the index to the file).
+
+    Returns
+    -------
+    tuple
+        Containing the output directory and the name of the file that has been appended to.
+
+    """
+    # Append dataframe contents to the separated file and return info.
     enable_index = False
     if index_name:
         enable_index = True
-    dataframe.to_csv(
-        path_or_buf=os.path.join(directory, updated_filename + extension),
-        sep=separator,
-        index=enable_index,
-        index_label=index_name,
-        na_rep='NA'
-    )
-    return (directory, updated_filename + extension)
+    with open_file(os.path.join(directory, filename), 'a') as outfile:
+        dataframe.to_csv(
+            path_or_buf=outfile,
+            sep=separator,
+            index=enable_index,
+            header=False,
+            na_rep='NA'
+        )
+    return (directory, filename)
 
 
 def preprocess_separated_file(directory, file, in_sep, out_sep, index_col=None, cols=None):
     """Formats the input sequence file for IGoR.
 
     Returns the input file path if no changes will be applied to the file. This means, the input seperator and output
-    seperator are equal to each other and the 'cols' attribute has not been specified.
+    seperator are equal to each other, the 'cols' attribute has not been specified and the input file is not compressed.
+    Compressed input files are decompressed while being processed.
 
     Parameters
     ----------
@@ -252,7 +1241,7 @@ def preprocess_separated_file(directory, file, in_sep, out_sep, index_col=None,
 
     """
     # If the seperators are the same and no columns are given, return the input.
-    if out_sep == in_sep and cols is None:
+    if out_sep == in_sep and cols is None and get_compression(file) is None:
         return file
 
     # Create the output directory.
@@ -265,7 +1254,7 @@ def preprocess_separated_file(directory, file, in_sep, out_sep, index_col=None,
     # Write the new pandas dataframe to a separated file.
     directory, filename = write_dataframe_to_separated(
         dataframe=sequence_df,
-        filename=os.path.basename(str(file)),
+        filename=os.path.basename(strip_compression_extension(file)),
         directory=directory,
         separator=out_sep,
         index_name=index_col
@@ -273,11 +1262,13 @@ def preprocess_separated_file(directory, file, in_sep, out_sep, index_col=None,
     return os.path.join(directory, filename)
 
 
-def preprocess_reference_file(directory, file, index=None):
+def preprocess_reference_file(directory, file, index=None, cache_dir=None):
     """Formats the IMGT reference genome files for IGoR.
 
     The sequence is always formatted to uppercase and '.' characters are removed from the sequence string. Make sure to use
-    IMGT in and out-frame reference files.
+    IMGT in and out-frame reference files. Compressed files are decompressed, based on their extension. If a cache
+    directory is given, the formatted file is stored under the hash of the input file's content and reused by later calls
+    with the same file content and index.
 
     Parameters
     ----------
@@ -287,19 +1278,31 @@ def preprocess_reference_file(directory, file, index=None):
         A FASTA file path for a reference genomic template file.
     index : int, optional
         Index of the header line to keep after splitting on '|' (default: none).
+    cache_dir : str, optional
+        A persistent directory path for caching the formatted file (default: the file is not cached).
 
     Returns
     -------
     str
-        A string file path to the new reference FASTA file.
+        A string file path to the new (or cached) reference FASTA file, with the '.fasta' extension.
 
     """
+    # Return the cached file if the file content has been formatted before.
+    filename = os.path.splitext(os.path.basename(strip_compression_extension(file)))[0]
+    if cache_dir:
+        cached_path = os.path.join(cache_dir, '{}_{}.fasta'.format(
+            filename, hash_files(files=[file], salt='{}:{}'.format(_REFERENCE_CACHE_VERSION, index))))
+        if os.path.isfile(cached_path):
+            touch_cache_file(cached_path)
+            return cached_path
+
     # Create the output directory.
     if not os.path.isdir(directory):
         os.makedirs(directory)
 
     # Open the fasta file and update the fasta header.
-    records = list(SeqIO.parse(file, "fasta"))
+    with open_file(file) as fasta_file:
+        records = list(SeqIO.parse(fasta_file, "fasta"))
     for rec in records:
         if index:
             rec.id = rec.description.split('|')[index]
@@ -308,14 +1311,27 @@ def preprocess_reference_file(directory, file, index=None):
         rec.description = ""
         rec.seq = Seq(''.join(str(rec.seq).upper().split('.')))
 
-    # Write out the modified file.
-    updated_path = os.path.join(directory, os.path.basename(file))
+    # Write out the modified file, moving it into the cache at once so other runs never read a partial file.
+    if cache_dir:
+        temp_path = '{}.{}.tmp'.format(cached_path, os.getpid())
+        try:
+            SeqIO.write(records, temp_path, "fasta")
+            os.rename(temp_path, cached_path)
+            return cached_path
+        except (IOError, OSError):
+            pass
+    updated_path = os.path.join(directory, filename + '.fasta')
     SeqIO.write(records, updated_path, "fasta")
     return updated_path
 
 
 def copy_to_dir(directory, file, extension):
-    """Copies a file to directory and modifies the extension name.
+    """Stages a file in the directory with a modified extension name, without copying its content if possible.
+
+    The file is symlinked into the directory, or hard linked if symlinks are not supported. The content is only copied
+    if the file can't be linked. Compressed files are always decompressed into the directory, since the external tools
+    (e.g. IGoR) can only read uncompressed files. The compression extension is not part of the new file name. The number
+    of bytes written to the directory is logged.
 
     Parameters
     ----------
@@ -333,11 +1349,30 @@ def copy_to_dir(directory, file, extension):
 
     """
     # Check if file name extension if different, or return.
-    filename, file_extension = os.path.splitext(os.path.basename(file))
-    if file_extension == str('.' + extension):
+    filename, file_extension = os.path.splitext(os.path.basename(strip_compression_extension(file)))
+    if file_extension == str('.' + extension) and get_compression(file) is None:
         return file
 
-    # Copy file to given directory if necessary.
+    # Decompress the file to the given directory if necessary.
     output_file = os.path.join(directory, filename + '.' + extension)
+    if os.path.lexists(output_file):
+        os.remove(output_file)
+    if get_compression(file) is not None:
+        with open_file(file) as infile, open(output_file, 'wb') as outfile:
+            copyfileobj(infile, outfile, _BLOCK_SIZE)
+        _LOGGER.info("Decompressed '%s' to '%s' (%s bytes written)", file, output_file, os.path.getsize(output_file))
+        return output_file
+
+    # Otherwise link the file, or copy it as a last resort.
+    for link in [getattr(os, 'symlink', None), getattr(os, 'link', None)]:
+        if link is None:
+            continue
+        try:
+            link(os.path.abspath(file), output_file)
+            _LOGGER.info("Linked '%s' to '%s' (0 bytes copied)", file, output_file)
+            return output_file
+        except OSError:
+            pass
     copy2(file, output_file)
+    _LOGGER.info("Copied '%s' to '%s' (%s bytes copied)", file, output_file, os.path.getsize(output_file))
     return output_file
@@ -15,16 +15,173 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-"""Contains a multi-processing function."""
+"""Contains a multi-processing function and a reusable pool of worker processes."""
 
 
+import atexit
+from collections import OrderedDict
+import math
+
 import numpy
-import pathos.pools as pp
+import pathos.helpers as ph
+
+from immuno_probs.util.constant import get_config_data
+
+
+MAX_SHARED_POOLS = 4
+_SHARED_POOLS = OrderedDict()
+
+
+class WorkerPool(object):
+    """A pool of worker processes that can be reused for multiple 'multiprocess_array' calls.
+
+    The pool can be used as a context manager, which shuts down the worker processes when leaving the context.
+
+    Parameters
+    ----------
+    num_workers : int
+        The number of worker processes to start.
+    initializer : Object, optional
+        A function object each worker process calls once when it starts (default: None).
+    initargs : tuple, optional
+        The arguments to be given to the initializer function. With the 'fork' start method these are inherited by the
+        worker processes instead of serialized (default: empty tuple).
+
+    Methods
+    -------
+    map(func, tasks)
+        Applies the function on each of the tasks using the worker processes.
+    imap(func, tasks)
+        Lazily applies the function on each of the tasks, handing out a task whenever a worker process is free.
+    close()
+        Shuts down the worker processes after the running tasks have been finished.
+
+    """
+    def __init__(self, num_workers, initializer=None, initargs=()):
+        super(WorkerPool, self).__init__()
+        self.num_workers = int(num_workers)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.pool = ph.ProcessPool(processes=self.num_workers, initializer=initializer, initargs=initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def map(self, func, tasks):
+        """Applies the function on each of the tasks using the worker processes.
+
+        Parameters
+        ----------
+        func : Object
+            A function object that the workers should apply on each of the tasks.
+        tasks : list
+            Containing the input values for the function.
+
+        Returns
+        -------
+        list
+            Containing the results for each of the tasks, in the same order.
+
+        """
+        return self.pool.map(func, tasks)
+
+    def imap(self, func, tasks):
+        """Lazily applies the function on each of the tasks, handing out a task whenever a worker process is free.
+
+        Parameters
+        ----------
+        func : Object
+            A function object that the workers should apply on each of the tasks.
+        tasks : list
+            Containing the input values for the function.
 
+        Returns
+        -------
+        iterator
+            Yielding the results for each of the tasks, in the same order.
 
-def multiprocess_array(ary, func, num_workers, **kwargs):
+        """
+        return self.pool.imap(func, tasks, chunksize=1)
+
+    def close(self):
+        """Shuts down the worker processes after the running tasks have been finished."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+def get_shared_pool(num_workers, initializer=None, initargs=(), key=None):
+    """Collects a module level WorkerPool for the given arguments, creating it if it does not exist yet.
+
+    The pools are identified by the number of workers, the initializer and the given key. Since the worker processes keep
+    the initializer arguments as they were when the pool was created, the key needs to identify their content (e.g. by a
+    model fingerprint). At most 'MAX_SHARED_POOLS' pools are kept, the least recently used pools are shut down before a
+    new pool is created.
+
+    Parameters
+    ----------
+    num_workers : int
+        The number of worker processes in the pool.
+    initializer : Object, optional
+        A function object each worker process calls once when it starts (default: None).
+    initargs : tuple, optional
+        The arguments to be given to the initializer function (default: empty tuple).
+    key : object, optional
+        A hashable value identifying the content of the initializer arguments, required if initializer arguments are given
+        (default: None).
+
+    Returns
+    -------
+    WorkerPool
+        The shared pool of worker processes.
+
+    Raises
+    ------
+    ValueError
+        When initializer arguments are given without a key.
+
+    """
+    if initargs and key is None:
+        raise ValueError("A key identifying the initializer arguments is required for sharing the pool")
+    key = (int(num_workers), initializer, key)
+    pool = _SHARED_POOLS.pop(key, None)
+    if pool is None:
+        while _SHARED_POOLS and len(_SHARED_POOLS) >= MAX_SHARED_POOLS:
+            _SHARED_POOLS.popitem(last=False)[1].close()
+        pool = WorkerPool(num_workers=num_workers, initializer=initializer, initargs=initargs)
+    _SHARED_POOLS[key] = pool
+    return pool
+
+
+def close_shared_pools():
+    """Shuts down all of the module level WorkerPool objects."""
+    while _SHARED_POOLS:
+        _SHARED_POOLS.popitem()[1].close()
+
+
+atexit.register(close_shared_pools)
+
+
+def multiprocess_array(ary, func, num_workers, initializer=None, initargs=(), pool=None, pool_key=None, chunk_size=None,
+                       **kwargs):
     """Applies multi-processing on a segemented array using the given function.
 
+    The array is divided into segments of at most 'chunk_size' items (but at least one segment per worker, and no more
+    segments than items), which are handed out to the workers whenever they are free. This balances the load when the processing time varies between items. If
+    the chunk size is zero, the array is divided into one equal segment per worker instead.
+
+    The segments are processed by the given pool of worker processes, or by a shared pool that is reused between calls
+    with the same number of workers, initializer and pool key. The pool always has the requested number of workers, so
+    it is reused for arrays of any size. If an initializer is given, the worker processes call it
+    with the given arguments once when they start. This allows large objects (like models) to be set up once per worker
+    process instead of being serialized with every task, in which case the given function should be importable (module
+    level). Since the workers don't see later changes to the initializer arguments, a shared pool is only used for them
+    if a pool key identifying their content is given, otherwise a new pool is used for the call.
+
     Parameters
     ----------
     ary : list
@@ -34,24 +191,44 @@ def multiprocess_array(ary, func, num_workers, **kwargs):
     num_workers : int
         The number of threads the program is allowed to use. This number is used to split up the input array into various
         segments.
+    initializer : Object, optional
+        A function object each worker process calls once when it starts (default: None).
+    initargs : tuple, optional
+        The arguments to be given to the initializer function. With the 'fork' start method these are inherited by the
+        worker processes instead of serialized (default: empty tuple).
+    pool : WorkerPool, optional
+        The pool of worker processes to use, the 'initializer' and 'initargs' values are ignored if given (default: a
+        shared pool for the number of workers and initializer).
+    pool_key : object, optional
+        A hashable value identifying the content of the initializer arguments (e.g. a model fingerprint) for sharing the
+        pool between calls (default: None, the pool is only shared if there are no initializer arguments).
+    chunk_size : int, optional
+        The maximum number of items in a segment, zero divides the array into one segment per worker (default: EXPERT
+        CHUNK_SIZE configuration value).
     **kwargs
         The remaining arguments to be given to the input function.
 
     Returns
     -------
     list
-        Containing the results from each of the workers.
+        Containing the results for each of the segments, in the same order as the input array. Empty if the array is empty.
 
     """
-    # Check out available worker count and adjust accordingly.
-    num_workers = int(num_workers)
-    if len(ary) < num_workers:
-        num_workers = len(ary)
-
-    # Divide the array into chucks for the workers.
-    pool = pp.ProcessPool(nodes=num_workers)
-    result = pool.amap(
-        func,
-        [(d, kwargs)for d in numpy.array_split(ary, num_workers)]
-    )
-    return result.get()
+    # Divide the array into chucks for the workers, no more chunks than items in the array.
+    if len(ary) == 0:
+        return []
+    num_workers = max(1, int(num_workers))
+    if chunk_size is None:
+        chunk_size = get_config_data('EXPERT', 'CHUNK_SIZE', 'int')
+    num_chunks = min(num_workers, len(ary))
+    if chunk_size > 0:
+        num_chunks = max(num_chunks, int(math.ceil(float(len(ary)) / chunk_size)))
+    tasks = [(d, kwargs) for d in numpy.array_split(ary, num_chunks)]
+
+    # Process the chunks with the given, shared or a new pool.
+    if pool is None and initargs and pool_key is None:
+        with WorkerPool(num_workers=num_workers, initializer=initializer, initargs=initargs) as new_pool:
+            return list(new_pool.imap(func, tasks))
+    if pool is None:
+        pool = get_shared_pool(num_workers=num_workers, initializer=initializer, initargs=initargs, key=pool_key)
+    return list(pool.imap(func, tasks))
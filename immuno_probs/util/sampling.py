@@ -0,0 +1,136 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Contains a collection of random sampling functions."""
+
+
+import numpy
+import pandas
+
+
+def reservoir_sample(chunks, size, strata, random_state=None, accept=None):
+    """Takes a uniform random sample of rows for each stratum from the given dataframe chunks, in a single pass.
+
+    Each row is assigned a random key and for each stratum the rows with the smallest keys are kept (a bottom-k reservoir),
+    so only the sampled rows are kept in memory. Since the keys are drawn row by row, the sample does not depend on the
+    size of the chunks. If an accept function is given, the sample contains the accepted rows with the smallest keys, as if
+    the rows were tried in key order until enough of them were accepted.
+
+    Parameters
+    ----------
+    chunks : iterable
+        Containing the pandas.DataFrame chunks to sample from, e.g. from reading a file in chunks.
+    size : int
+        The number of rows to sample for each stratum. All rows are kept for strata with fewer rows.
+    strata : function
+        A function that is given a chunk and returns a pandas.Series with the stratum of each row, rows with a null value
+        are not sampled.
+    random_state : int or numpy.random.RandomState, optional
+        A seed value or random number generator for drawing the keys (default: seeded by the system).
+    accept : function, optional
+        A function that is given a dataframe of rows from a single stratum and returns a boolean array with the rows that
+        may be sampled. It is only given rows with a key small enough to enter the reservoir, in key order and at most
+        'size' rows at a time (default: all rows may be sampled).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Containing the sampled rows (with their original index values) of all strata in random order. Empty if no chunks
+        were given.
+
+    Raises
+    ------
+    ValueError
+        When the given sample size is not higher than zero.
+
+    """
+    if size < 1:
+        raise ValueError("The sample size needs to be higher than zero", size)
+    if not isinstance(random_state, numpy.random.RandomState):
+        random_state = numpy.random.RandomState(random_state)
+
+    # Keep the rows with the smallest keys for each stratum in the reservoir.
+    reservoir = {}
+    empty = pandas.DataFrame()
+    for chunk in chunks:
+        empty = chunk.iloc[:0]
+        keys = random_state.random_sample(len(chunk))
+        labels = strata(chunk)
+        for label in labels.dropna().unique():
+            mask = (labels == label).values
+            sample_keys, sample = reservoir.get(label, (numpy.empty(0), empty))
+
+            # Only rows with a smaller key than the largest in a full reservoir can enter it.
+            if len(sample_keys) >= size:
+                mask &= keys < sample_keys.max()
+                if not mask.any():
+                    continue
+            if accept is None:
+                reservoir[label] = _keep_smallest(sample_keys, sample, keys[mask], chunk[mask], size)
+                continue
+
+            # Try the rows in key order until none of the remaining rows can enter the full reservoir.
+            order = numpy.argsort(keys[mask], kind='mergesort')
+            candidate_keys, candidates = keys[mask][order], chunk[mask].iloc[order]
+            while len(candidate_keys) > 0:
+                if len(sample_keys) >= size:
+                    end = numpy.searchsorted(candidate_keys, sample_keys.max())
+                    candidate_keys, candidates = candidate_keys[:end], candidates.iloc[:end]
+                    if end == 0:
+                        break
+                accepted = numpy.asarray(accept(candidates.iloc[:size]), dtype=bool)
+                sample_keys, sample = _keep_smallest(sample_keys, sample, candidate_keys[:size][accepted],
+                                                     candidates.iloc[:size][accepted], size)
+                candidate_keys, candidates = candidate_keys[size:], candidates.iloc[size:]
+            reservoir[label] = (sample_keys, sample)
+
+    # Combine the strata and order the rows by their key.
+    if not reservoir:
+        return empty
+    sample_keys = numpy.concatenate([reservoir[i][0] for i in reservoir])
+    sample = pandas.concat([reservoir[i][1] for i in reservoir])
+    return sample.iloc[numpy.argsort(sample_keys, kind='mergesort')]
+
+
+def _keep_smallest(sample_keys, sample, keys, rows, size):
+    """Private function that adds rows to a reservoir and keeps the rows with the smallest keys.
+
+    Parameters
+    ----------
+    sample_keys : numpy.ndarray
+        The keys of the rows in the reservoir.
+    sample : pandas.DataFrame
+        The rows in the reservoir.
+    keys : numpy.ndarray
+        The keys of the rows to add.
+    rows : pandas.DataFrame
+        The rows to add.
+    size : int
+        The maximum number of rows in the reservoir.
+
+    Returns
+    -------
+    tuple
+        Containing the keys and the rows of the updated reservoir.
+
+    """
+    sample_keys = numpy.concatenate([sample_keys, keys])
+    sample = pandas.concat([sample, rows])
+    if len(sample_keys) > size:
+        keep = numpy.argpartition(sample_keys, size - 1)[:size]
+        sample_keys, sample = sample_keys[keep], sample.iloc[keep]
+    return sample_keys, sample
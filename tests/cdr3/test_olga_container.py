@@ -18,12 +18,17 @@
 """Test file for testing immuno_probs.cdr3.olga_container file."""
 
 
+import os
+
 import pandas
 import pytest
 import numpy
+import olga.generation_probability as olga_pgen
 
 from immuno_probs.cdr3.olga_container import OlgaContainer
 from immuno_probs.model.igor_loader import IgorLoader
+from immuno_probs.util.cache import PgenStore
+from immuno_probs.util.io import read_separated_to_dataframe
 
 
 @pytest.mark.parametrize(
@@ -107,3 +112,424 @@ def test_olga_container(option, expected):
         result = olga_container.evaluate(seqs=pgen_seqs, num_threads=1)
         for index, row in result.iterrows():
             assert (row['nt_pgen_estimate'] - expected['nt_pgen_estimate'][index]) < 0.0000001
+
+
+@pytest.mark.parametrize(
+    'num_seqs, num_threads, seed',
+    [
+        (1, 1, None),
+        (25, 1, 42),
+        (25, 3, 42),
+        (2, 4, 7)
+    ]
+)
+def test_olga_container_generate(num_seqs, num_threads, seed):
+    """Test if the container generates the requested number of CDR3's and reproduces them for a given seed.
+
+    Parameters
+    ----------
+    num_seqs : int
+        The number of sequences to generate.
+    num_threads : int
+        The number of threads to use for generating the sequences.
+    seed : int
+        The master seed value for the random number generators.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    model = IgorLoader(model_type='alpha',
+                       model_params='tests/data/human_t_alpha/model_params.txt',
+                       model_marginals='tests/data/human_t_alpha/model_marginals.txt')
+    model.set_anchor(gene='V', file='tests/data/human_t_alpha/V_gene_CDR3_anchors.csv')
+    model.set_anchor(gene='J', file='tests/data/human_t_alpha/J_gene_CDR3_anchors.csv')
+    model.initialize_model()
+    olga_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice')
+    result = olga_container.generate(num_seqs=num_seqs, num_threads=num_threads, seed=seed)
+    assert len(result) == num_seqs
+    assert list(result.columns) == ['nt_sequence', 'aa_sequence', 'v_gene_choice', 'j_gene_choice']
+    assert not result.isnull().any().any()
+    if seed is not None:
+        repeated = olga_container.generate(num_seqs=num_seqs, num_threads=num_threads, seed=seed)
+        assert result.equals(repeated)
+
+
+@pytest.mark.parametrize(
+    'num_seqs, chunk_sizes, num_threads, seed',
+    [
+        (250, [250, 100, 30], [1, 3], 42)
+    ]
+)
+def test_olga_container_generate_seed(num_seqs, chunk_sizes, num_threads, seed):
+    """Test if the generated CDR3's for a given seed are independent of the chunk size and number of threads.
+
+    Parameters
+    ----------
+    num_seqs : int
+        The number of sequences to generate.
+    chunk_sizes : list
+        The maximum number of sequences in each chunk to compare.
+    num_threads : list
+        The number of threads for generating the sequences to compare.
+    seed : int
+        The master seed value for the random number generators.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    model = IgorLoader(model_type='alpha',
+                       model_params='tests/data/human_t_alpha/model_params.txt',
+                       model_marginals='tests/data/human_t_alpha/model_marginals.txt')
+    model.set_anchor(gene='V', file='tests/data/human_t_alpha/V_gene_CDR3_anchors.csv')
+    model.set_anchor(gene='J', file='tests/data/human_t_alpha/J_gene_CDR3_anchors.csv')
+    model.initialize_model()
+    olga_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice')
+    results = [pandas.concat(olga_container.generate_chunks(num_seqs=num_seqs, chunk_size=i, num_threads=j, seed=seed))
+               for i in chunk_sizes for j in num_threads]
+    assert len(results[0]) == num_seqs
+    assert all(results[0].equals(i) for i in results[1:])
+    other = pandas.concat(olga_container.generate_chunks(num_seqs=num_seqs, chunk_size=num_seqs, seed=seed + 1))
+    assert not results[0].equals(other)
+
+
+@pytest.mark.parametrize(
+    'num_seqs, chunk_size, expected',
+    [
+        (10, 4, [4, 4, 2]),
+        (10, 10, [10]),
+        (3, 5, [3])
+    ]
+)
+def test_olga_container_generate_chunks(tmpdir, num_seqs, chunk_size, expected):
+    """Test if the container generates the CDR3's in chunks with a continuous index, equal to the non-streaming output.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory for writing the persistent Pgen store to.
+    num_seqs : int
+        The number of sequences to generate.
+    chunk_size : int
+        The maximum number of sequences in each chunk.
+    expected : list
+        The expected number of sequences in each of the chunks.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    model = IgorLoader(model_type='alpha',
+                       model_params='tests/data/human_t_alpha/model_params.txt',
+                       model_marginals='tests/data/human_t_alpha/model_marginals.txt')
+    model.set_anchor(gene='V', file='tests/data/human_t_alpha/V_gene_CDR3_anchors.csv')
+    model.set_anchor(gene='J', file='tests/data/human_t_alpha/J_gene_CDR3_anchors.csv')
+    model.initialize_model()
+    olga_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice')
+    chunks = list(olga_container.generate_chunks(num_seqs=num_seqs, chunk_size=chunk_size, num_threads=2, seed=1))
+    assert [len(i) for i in chunks] == expected
+    assert list(pandas.concat(chunks).index) == list(range(num_seqs))
+    assert pandas.concat(chunks).equals(olga_container.generate(num_seqs=num_seqs, num_threads=1, seed=1))
+
+    # Generate with a container that has a cache and persistent store, which are not send to the workers.
+    pgen_store = PgenStore(file=os.path.join(str(tmpdir), 'pgen.sqlite'))
+    store_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice',
+        cache_size=10,
+        pgen_store=pgen_store)
+    stored_chunks = list(store_container.generate_chunks(num_seqs=num_seqs, chunk_size=chunk_size, num_threads=2, seed=1))
+    pgen_store.close()
+    assert all(i.equals(j) for i, j in zip(chunks, stored_chunks))
+
+
+@pytest.mark.parametrize(
+    'seqs, cache_size',
+    [
+        (
+            pandas.DataFrame(
+                [
+                    ['TGTGCAGGAATAAACTTTGGAAATGAGAAATTAACCTTT', 'TRAV12-2', 'TRAJ48'],
+                    ['TGTGCATTGAACAGAGATGACAAGATCATCTTT', numpy.nan, numpy.nan],
+                    ['TGTGCAGGAATAAACTTTGGAAATGAGAAATTAACCTTT', 'TRAV12-2', 'TRAJ48'],
+                    ['TGTGCAGGAATAAACTTTGGAAATGAGAAATTAACCTTT', numpy.nan, numpy.nan],
+                    ['TGTGCATTGAACAGAGATGACAAGATCATCTTT', numpy.nan, numpy.nan]
+                ],
+                columns=['nt_sequence', 'v_gene_choice', 'j_gene_choice'],
+                index=[10, 11, 12, 13, 14]
+            ),
+            10
+        )
+    ]
+)
+def test_olga_container_evaluate_duplicates(tmpdir, seqs, cache_size):
+    """Test if duplicated rows are evaluated once and reused from the container's cache.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory for writing the persistent Pgen store to.
+    seqs : pandas.DataFrame
+        The input sequences containing duplicated rows.
+    cache_size : int
+        The maximum number of evaluated sequences to keep in the cache.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    model = IgorLoader(model_type='alpha',
+                       model_params='tests/data/human_t_alpha/model_params.txt',
+                       model_marginals='tests/data/human_t_alpha/model_marginals.txt')
+    model.set_anchor(gene='V', file='tests/data/human_t_alpha/V_gene_CDR3_anchors.csv')
+    model.set_anchor(gene='J', file='tests/data/human_t_alpha/J_gene_CDR3_anchors.csv')
+    model.initialize_model()
+    olga_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice',
+        cache_size=cache_size)
+    result = olga_container.evaluate(seqs=seqs.copy(), num_threads=2, use_allele=False, default_allele='01')
+    assert list(result.index) == list(seqs.index)
+    assert result.loc[10, 'nt_pgen_estimate'] == result.loc[12, 'nt_pgen_estimate']
+    assert result.loc[11, 'nt_pgen_estimate'] == result.loc[14, 'nt_pgen_estimate']
+    assert result.loc[10, 'nt_pgen_estimate'] != result.loc[13, 'nt_pgen_estimate']
+    assert len(olga_container.cache) == 3
+    repeated = olga_container.evaluate(seqs=seqs.copy(), num_threads=2, use_allele=False, default_allele='01')
+    assert olga_container.cache.hits == 3
+    assert result.equals(repeated)
+
+    # Evaluate with the persistent store and reuse the stored values in a new container.
+    pgen_store = PgenStore(file=os.path.join(str(tmpdir), 'pgen.sqlite'))
+    olga_container.pgen_store = pgen_store
+    olga_container.cache.clear()
+    olga_container.evaluate(seqs=seqs.copy(), num_threads=2, use_allele=False, default_allele='01')
+    pgen_store.connection.execute('UPDATE pgen SET nt_pgen = 1.0, aa_pgen = 2.0')
+    new_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice',
+        pgen_store=pgen_store)
+    stored = new_container.evaluate(seqs=seqs.copy(), num_threads=2, use_allele=False, default_allele='01')
+    pgen_store.close()
+    assert (stored['nt_pgen_estimate'] == 1.0).all()
+    assert (stored['aa_pgen_estimate'] == 2.0).all()
+
+
+@pytest.mark.parametrize(
+    'first_seqs, second_seqs',
+    [
+        (
+            pandas.DataFrame({'aa_sequence': ['CAGINFGNEKLTF']}),
+            pandas.DataFrame({'j_gene_choice': ['CAGINFGNEKLTF']})
+        )
+    ]
+)
+def test_olga_container_evaluate_key_columns(tmpdir, first_seqs, second_seqs):
+    """Test if the same values in different input columns are not reused from the cache or persistent store.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory for writing the persistent Pgen store to.
+    first_seqs : pandas.DataFrame
+        The input sequences to evaluate first.
+    second_seqs : pandas.DataFrame
+        The input sequences with the same values in a different column.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    model = IgorLoader(model_type='alpha',
+                       model_params='tests/data/human_t_alpha/model_params.txt',
+                       model_marginals='tests/data/human_t_alpha/model_marginals.txt')
+    model.set_anchor(gene='V', file='tests/data/human_t_alpha/V_gene_CDR3_anchors.csv')
+    model.set_anchor(gene='J', file='tests/data/human_t_alpha/J_gene_CDR3_anchors.csv')
+    model.initialize_model()
+    pgen_store = PgenStore(file=os.path.join(str(tmpdir), 'pgen.sqlite'))
+    olga_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice',
+        cache_size=10,
+        pgen_store=pgen_store)
+    first = olga_container.evaluate(seqs=first_seqs, num_threads=1)
+    assert first['aa_pgen_estimate'].notnull().all()
+    second = olga_container.evaluate(seqs=second_seqs, num_threads=1)
+    olga_container.cache.clear()
+    stored = olga_container.evaluate(seqs=second_seqs, num_threads=1)
+    pgen_store.close()
+    assert second['aa_pgen_estimate'].isnull().all()
+    assert stored['aa_pgen_estimate'].isnull().all()
+
+
+@pytest.mark.parametrize(
+    'seqs, separator',
+    [
+        (
+            pandas.DataFrame(
+                [
+                    ['TGTGCAGGAATAAACTTTGGAAATGAGAAATTAACCTTT', 'TRAV12-2', 'TRAJ48'],
+                    ['TGTGCATTGAACAGAGATGACAAGATCATCTTT', numpy.nan, numpy.nan],
+                    ['TGTGCAGGAATAAACTTTGGAAATGAGAAATTAACCTTT', 'TRAV12-2', 'TRAJ48']
+                ],
+                columns=['nt_sequence', 'v_gene_choice', 'j_gene_choice']
+            ),
+            '\t'
+        ),
+        (
+            pandas.DataFrame(
+                [
+                    ['TGTGCAGGAATAAACTTTGGAAATGAGAAATTAACCTTT', 'TRAV12-2', 'TRAJ48'],
+                    ['TGTGCATTGAACAGAGATGACAAGATCATCTTT', numpy.nan, numpy.nan]
+                ],
+                columns=['nt_sequence', 'v_gene_choice', 'j_gene_choice']
+            ),
+            r'\t'
+        )
+    ]
+)
+def test_olga_container_evaluate_read_dtypes(tmpdir, seqs, separator):
+    """Test if sequences read with the declared categorical gene choice types are evaluated like object columns.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the input file to.
+    seqs : pandas.DataFrame
+        The input sequences to write and read back.
+    separator : str
+        The separator for reading the file, a regex separator is read by the python engine.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    file = os.path.join(str(tmpdir), 'input_file.tsv')
+    seqs.to_csv(file, sep='\t', index=False)
+    read_seqs = read_separated_to_dataframe(file=file, separator=separator)
+    assert str(read_seqs['v_gene_choice'].dtype) == 'category'
+    model = IgorLoader(model_type='alpha',
+                       model_params='tests/data/human_t_alpha/model_params.txt',
+                       model_marginals='tests/data/human_t_alpha/model_marginals.txt')
+    model.set_anchor(gene='V', file='tests/data/human_t_alpha/V_gene_CDR3_anchors.csv')
+    model.set_anchor(gene='J', file='tests/data/human_t_alpha/J_gene_CDR3_anchors.csv')
+    model.initialize_model()
+    olga_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice')
+    result = olga_container.evaluate(seqs=read_seqs, num_threads=2, use_allele=False, default_allele='01')
+    expected = olga_container.evaluate(seqs=seqs.copy(), num_threads=2, use_allele=False, default_allele='01')
+    assert result.reset_index(drop=True).equals(expected.reset_index(drop=True))
+    assert result['nt_pgen_estimate'].notnull().all()
+
+
+@pytest.mark.parametrize(
+    'ary, expected_nan',
+    [
+        (
+            pandas.DataFrame({'nt_sequence': ['TGTGCAGGAATAAACTTTGGAAATGAGAAATTAACCTTT', numpy.nan]}, index=[3, 7]),
+            [[False, True], [True, True]]
+        ),
+        (
+            pandas.DataFrame({'aa_sequence': ['CAGINFGNEKLTF'],
+                              'v_gene_choice': ['TRAV12-2'],
+                              'j_gene_choice': ['TRAJ48']}, index=[5]),
+            [[True], [False]]
+        )
+    ]
+)
+def test_olga_container_evaluate_kernel(ary, expected_nan):
+    """Test if the evaluation kernel returns float64 columns with NaN values for missing sequences.
+
+    Parameters
+    ----------
+    ary : pandas.DataFrame
+        The chunk of sequences to evaluate.
+    expected_nan : list
+        Containing the expected NaN mask for the nucleotide and aminoacid Pgen columns.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    model = IgorLoader(model_type='alpha',
+                       model_params='tests/data/human_t_alpha/model_params.txt',
+                       model_marginals='tests/data/human_t_alpha/model_marginals.txt')
+    model.set_anchor(gene='V', file='tests/data/human_t_alpha/V_gene_CDR3_anchors.csv')
+    model.set_anchor(gene='J', file='tests/data/human_t_alpha/J_gene_CDR3_anchors.csv')
+    model.initialize_model()
+    olga_container = OlgaContainer(
+        igor_model=model,
+        nt_col='nt_sequence',
+        nt_p_col='nt_pgen_estimate',
+        aa_col='aa_sequence',
+        aa_p_col='aa_pgen_estimate',
+        v_gene_choice_col='v_gene_choice',
+        j_gene_choice_col='j_gene_choice')
+    pgen_model = olga_pgen.GenerationProbabilityVJ(model.get_generative_model(), model.get_genomic_data())
+    result = olga_container._evaluate((ary, {'model': pgen_model, 'use_allele': False}))
+    assert list(result.index) == list(ary.index)
+    assert list(result.dtypes) == [numpy.float64, numpy.float64]
+    assert result['nt_pgen_estimate'].isna().tolist() == expected_nan[0]
+    assert result['aa_pgen_estimate'].isna().tolist() == expected_nan[1]
+    assert (result.fillna(1) > 0).all().all()
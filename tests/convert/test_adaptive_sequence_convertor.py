@@ -18,6 +18,8 @@
 """Test file for testing immuno_probs.convert.adaptive_sequence_convertor file."""
 
 
+import os
+
 import pandas
 import pytest
 
@@ -105,6 +107,57 @@ def test_build_resolved_pattern(value, use_allele, default_allele, expected):
         assert pat in patterns
 
 
+@pytest.mark.parametrize(
+    'value, use_allele, expected',
+    [
+        ('TCRBV07-09*01', True, ('TRBV7-9*01', 'TRBV7-9*01')),
+        ('TCRBV12-03/12-04', True, ('TRBV12-3*01|TRBV12-4*01', 'TRBV12-4*01')),
+        ('TCRBV06-05/99-01*02', False, ('TRBV6-5*01', None)),
+        ('TCRBV99-01', True, (None, None)),
+    ]
+)
+def test_build_resolved_lookup(value, use_allele, expected):
+    """Test if the resolved gene values are looked up in the reference genes.
+
+    Parameters
+    ----------
+    value : str
+        The resolved gene value to look up.
+    use_allele : bool
+        If the allele information from the resolved gene value should be used.
+    expected : tuple
+        The expected gene choices and name of the reference gene for the reference sequence, None if not found.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    v_genes = _process_gene_df(
+        file='tests/data/human_t_beta/ref_genomes/TRBV.fasta',
+        nt_col='nt_sequence',
+        resolved_col='v_resolved')
+    asc = AdaptiveSequenceConvertor()
+    lookup = asc.build_resolved_lookup(
+        values=[value, float('nan')],
+        ref_genes=v_genes,
+        resolved_col='v_resolved',
+        nt_col='nt_sequence',
+        use_allele=use_allele,
+        default_allele='01')
+    assert list(lookup) == [value]
+    gene_choices, ref_seq = lookup[value]
+    if expected[0] is None:
+        assert pandas.isnull(gene_choices)
+    else:
+        assert gene_choices == expected[0]
+    if expected[1] is None:
+        assert ref_seq is None
+    else:
+        assert ref_seq == v_genes.loc[v_genes['v_resolved'] == expected[1], 'nt_sequence'].values[0]
+
+
 @pytest.mark.parametrize(
     'full, partial, expected',
     [
@@ -118,6 +171,16 @@ def test_build_resolved_pattern(value, use_allele, default_allele, expected):
             'AGGCA',
             'AGGCA'
         ),
+        (
+            'GATGCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGAAGGCAGGTGACC',
+            'GACAGTTCCCAG',
+            'CCCAG'
+        ),
+        (
+            'GATGCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGAAGGCAGGTGACC',
+            'NNN',
+            ''
+        ),
     ]
 )
 def test_find_longest_substring(full, partial, expected):
@@ -145,17 +208,63 @@ def test_find_longest_substring(full, partial, expected):
 
 
 @pytest.mark.parametrize(
-    'seqs, v_genes, j_genes, expected',
+    'gene, ref_seq, segment, expected',
+    [
+        ('V', 'GATGCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGAAGGCAGGTGACC', 'AGGCA', 'GATGCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGA'),
+        ('V', 'GATGCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGAAGGCAGGTGACC', 'GATGCTG', None),
+        ('J', 'GATGCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGAAGGCAGGTGACC', 'GAT', 'GCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGAAGGCAGGTGACC'),
+        ('J', 'GATGCTGAAATCACCCAGAGCCCAAGACACAAGATCACAGAGACAGGAAGGCAGGTGACC', 'AGGCA', None),
+    ]
+)
+def test_get_template(gene, ref_seq, segment, expected):
+    """Test if the reassembly templates are created and reused from the cache.
+
+    Parameters
+    ----------
+    gene : str
+        A gene identifier, either 'V' or 'J'.
+    ref_seq : str
+        A reference gene sequence string.
+    segment : str
+        The overlap between the reference gene and CDR3 sequence.
+    expected : str
+        The expected part of the reference gene sequence, None if the overlap is invalid.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    asc = AdaptiveSequenceConvertor()
+    hits = asc._templates.hits
+    assert asc.get_template(gene, ref_seq, segment) == expected
+    assert asc.get_template(gene, ref_seq, segment) == expected
+    assert asc._templates.hits == hits + 1
+    with pytest.raises(ValueError):
+        asc.get_template('D', ref_seq, segment)
+
+
+@pytest.mark.parametrize(
+    'seqs, v_genes, j_genes, n_random, expected',
     [
         (
             'tests/data/human_t_beta/10_sequence_samples.tsv',
             'tests/data/human_t_beta/ref_genomes/TRBV.fasta',
             'tests/data/human_t_beta/ref_genomes/TRBJ.fasta',
+            0,
             [6, 4, 2, 6]
         ),
+        (
+            'tests/data/human_t_beta/10_sequence_samples.tsv',
+            'tests/data/human_t_beta/ref_genomes/TRBV.fasta',
+            'tests/data/human_t_beta/ref_genomes/TRBJ.fasta',
+            1,
+            [2, 1, 1, 1]
+        ),
     ]
 )
-def test_convert(seqs, v_genes, j_genes, expected):
+def test_convert(seqs, v_genes, j_genes, n_random, expected):
     """Test if converted data is returned.
 
     Parameters
@@ -166,6 +275,8 @@ def test_convert(seqs, v_genes, j_genes, expected):
         A filepath to a file containing V gene sequences.
     j_genes : str
         A filepath to a file containing J gene sequences.
+    n_random : int
+        The number of random productive and unproductive sequences to convert, 0 for all sequences.
     expected : pandas.DataFrame
         The expected output pandas.Dataframe with correct columns and values.
 
@@ -202,8 +313,152 @@ def test_convert(seqs, v_genes, j_genes, expected):
         j_resolved_col='j_resolved',
         j_gene_choice_col='j_gene_choice',
         use_allele=True,
-        default_allele='01')
+        default_allele='01',
+        n_random=n_random)
     assert len(cdr3_df) == expected[0]
     assert len(full_prod_df) == expected[1]
     assert len(full_unprod_df) == expected[2]
     assert len(full_df) == expected[3]
+    assert asc.template_hits + asc.template_misses >= 2 * (expected[1] + expected[2])
+
+
+@pytest.mark.parametrize(
+    'seqs, v_genes, j_genes, n_random, expected',
+    [
+        (
+            'tests/data/human_t_beta/10_sequence_samples.tsv',
+            'tests/data/human_t_beta/ref_genomes/TRBV.fasta',
+            'tests/data/human_t_beta/ref_genomes/TRBJ.fasta',
+            2,
+            [4, 2, 2, 2]
+        ),
+    ]
+)
+def test_convert_random_sample(seqs, v_genes, j_genes, n_random, expected):
+    """Test if the random subsample is taken from the file chunks and is reproducible with a seed.
+
+    Parameters
+    ----------
+    seqs : str
+        A filepath to a file containing sequences.
+    v_genes : str
+        A filepath to a file containing V gene sequences.
+    j_genes : str
+        A filepath to a file containing J gene sequences.
+    n_random : int
+        The number of random productive and unproductive sequences to convert.
+    expected : list
+        The expected number of rows in each of the output pandas.DataFrame objects.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    v_genes = _process_gene_df(file=v_genes, nt_col='nt_sequence', resolved_col='v_resolved')
+    j_genes = _process_gene_df(file=j_genes, nt_col='nt_sequence', resolved_col='j_resolved')
+    results = []
+    for chunksize in [3, None, None]:
+        asc = AdaptiveSequenceConvertor()
+        results.append(asc.convert(
+            num_threads=1,
+            seqs=read_separated_to_dataframe(file=seqs, separator='\t', chunksize=chunksize),
+            ref_v_genes=v_genes,
+            ref_j_genes=j_genes,
+            row_id_col='row_id',
+            nt_col='nt_sequence',
+            aa_col='aa_sequence',
+            frame_type_col='frame_type',
+            cdr3_length_col='cdr3_length',
+            v_resolved_col='v_resolved',
+            v_gene_choice_col='v_gene_choice',
+            j_resolved_col='j_resolved',
+            j_gene_choice_col='j_gene_choice',
+            use_allele=True,
+            default_allele='01',
+            n_random=n_random,
+            seed=42))
+    assert [len(i) for i in results[0]] == expected
+    for output in range(4):
+        assert results[0][output].equals(results[1][output])
+        assert results[1][output].equals(results[2][output])
+
+
+@pytest.mark.parametrize(
+    'seqs, v_genes, j_genes, separator',
+    [
+        (
+            'tests/data/human_t_beta/10_sequence_samples.tsv',
+            'tests/data/human_t_beta/ref_genomes/TRBV.fasta',
+            'tests/data/human_t_beta/ref_genomes/TRBJ.fasta',
+            '\t'
+        ),
+        (
+            'tests/data/human_t_beta/10_sequence_samples.tsv',
+            'tests/data/human_t_beta/ref_genomes/TRBV.fasta',
+            'tests/data/human_t_beta/ref_genomes/TRBJ.fasta',
+            r'\t'
+        ),
+    ]
+)
+def test_convert_read_dtypes(tmpdir, seqs, v_genes, j_genes, separator):
+    """Test if a file read with the declared categorical gene and nullable integer CDR3 length types is converted.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the input file with a missing CDR3 length to.
+    seqs : str
+        A filepath to a file containing sequences.
+    v_genes : str
+        A filepath to a file containing V gene sequences.
+    j_genes : str
+        A filepath to a file containing J gene sequences.
+    separator : str
+        The separator for reading the file, a regex separator is read by the python engine.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    # Remove the CDR3 length of the first sequence.
+    file = os.path.join(str(tmpdir), 'input_file.tsv')
+    with open(seqs, 'r') as infile, open(file, 'w') as outfile:
+        outfile.write(next(infile))
+        fields = next(infile).split('\t')
+        fields[2] = ''
+        outfile.write('\t'.join(fields))
+        for line in infile:
+            outfile.write(line)
+
+    v_genes = _process_gene_df(file=v_genes, nt_col='nt_sequence', resolved_col='v_resolved')
+    j_genes = _process_gene_df(file=j_genes, nt_col='nt_sequence', resolved_col='j_resolved')
+    results = []
+    for input_file in [seqs, file]:
+        seqs_df = read_separated_to_dataframe(file=input_file, separator=separator)
+        assert str(seqs_df['v_resolved'].dtype) == 'category'
+        assert str(seqs_df['cdr3_length'].dtype) == ('Int64' if input_file == file else 'int64')
+        results.append(AdaptiveSequenceConvertor().convert(
+            num_threads=1,
+            seqs=seqs_df,
+            ref_v_genes=v_genes,
+            ref_j_genes=j_genes,
+            row_id_col='row_id',
+            nt_col='nt_sequence',
+            aa_col='aa_sequence',
+            frame_type_col='frame_type',
+            cdr3_length_col='cdr3_length',
+            v_resolved_col='v_resolved',
+            v_gene_choice_col='v_gene_choice',
+            j_resolved_col='j_resolved',
+            j_gene_choice_col='j_gene_choice',
+            use_allele=True,
+            default_allele='01',
+            n_random=0))
+    assert len(results[0][0]) == 6
+    assert sorted(results[1][0]['row_id']) == sorted(i for i in results[0][0]['row_id'] if i != 0)
+    for output in results[1][1:]:
+        assert output['nt_sequence'].map(lambda value: isinstance(value, str)).all()
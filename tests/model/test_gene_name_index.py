@@ -0,0 +1,62 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test file for testing immuno_probs.model.gene_name_index file."""
+
+
+import pytest
+
+from immuno_probs.model.gene_name_index import GeneNameIndex
+
+
+REF_GENES = ['TRBV1*01', 'TRBV10-1*01', 'TRBV10-1*02', 'TRBV10-2*01', 'TRBV6-5*01', 'TRBV6-6*02']
+
+
+@pytest.mark.parametrize(
+    'choice, use_allele, expected',
+    [
+        ('TRBV1', False, ('TRBV1*01', 'TRBV10-1*01', 'TRBV10-1*02', 'TRBV10-2*01')),
+        ('TRBV10-1', False, ('TRBV10-1*01', 'TRBV10-1*02')),
+        ('TRBV10-1*02', False, ('TRBV10-1*01', 'TRBV10-1*02')),
+        ('TRBV10-1*02', True, ('TRBV10-1*02',)),
+        ('TRBV6-5|TRBV6-6*02', True, ('TRBV6-5*01', 'TRBV6-6*02')),
+        ('TRBV6-6*01', True, ()),
+        ('TRBV99', False, ()),
+        ('', False, ())
+    ]
+)
+def test_gene_name_index(choice, use_allele, expected):
+    """Test if the gene choices are located in the reference gene names and memoized.
+
+    Parameters
+    ----------
+    choice : str
+        The '|' separated gene choice string to locate.
+    use_allele : bool
+        If the allele information from the gene choice should be used.
+    expected : tuple
+        The expected sorted tuple of located reference gene names.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    gene_index = GeneNameIndex(REF_GENES)
+    result = gene_index.locate(choice=choice, use_allele=use_allele)
+    assert result == expected
+    assert gene_index.locate(choice=choice, use_allele=use_allele) is result
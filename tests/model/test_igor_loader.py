@@ -18,6 +18,10 @@
 """Test file for testing immuno_probs.model.igor_loader file."""
 
 
+import os
+
+import numpy
+import olga.load_model as olga_load_model
 import pytest
 
 from immuno_probs.model.igor_loader import IgorLoader
@@ -58,3 +62,61 @@ def test_igor_loader(infiles, expected):
     model.set_anchor(gene='J', file=infiles[3])
     model.initialize_model()
     assert isinstance(model, expected)
+    assert model.get_gene_index('V').locate('TRAV1-2', False) == ('TRAV1-2*01', 'TRAV1-2*02')
+    assert model.get_gene_index('j').locate('TRAJ48*01', True) == ('TRAJ48*01',)
+    assert model.get_marginals().get_model_type() == 'VJ'
+    olga_model = olga_load_model.GenerativeModelVJ()
+    olga_model.load_and_process_igor_model(infiles[1])
+    assert numpy.array_equal(model.get_generative_model().PVJ, olga_model.PVJ)
+    assert numpy.array_equal(model.get_generative_model().Rvj, olga_model.Rvj)
+
+
+@pytest.mark.parametrize(
+    'infiles',
+    [
+        [
+            'tests/data/human_t_alpha/model_params.txt',
+            'tests/data/human_t_alpha/model_marginals.txt',
+            'tests/data/human_t_alpha/V_gene_CDR3_anchors.csv',
+            'tests/data/human_t_alpha/J_gene_CDR3_anchors.csv'
+        ]
+    ]
+)
+def test_igor_loader_cache(tmpdir, monkeypatch, infiles):
+    """Test if the loaded and initialized model is reused from the cache directory without parsing the model files.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to use as cache directory.
+    monkeypatch : _pytest.monkeypatch.MonkeyPatch
+        Object for replacing the model file parsing functions.
+    infiles : list
+        A list of file paths to an IGoR model and CDR3 anchor files.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    models = []
+    for _ in range(2):
+        model = IgorLoader(model_type='alpha', model_params=infiles[0], model_marginals=infiles[1],
+                           cache_dir=str(tmpdir))
+        model.set_anchor(gene='V', file=infiles[2])
+        model.set_anchor(gene='J', file=infiles[3])
+        model.initialize_model()
+        models.append(model)
+
+        # The second model should be loaded from the cache files.
+        monkeypatch.setattr(IgorLoader, '_check_type', None)
+        monkeypatch.setattr(IgorLoader, '_load_params', None)
+        monkeypatch.setattr(IgorLoader, '_load_model', None)
+    assert len([i for i in os.listdir(str(tmpdir)) if i.endswith('.pkl')]) == 2
+    assert models[1].get_type() == 'VJ'
+    assert models[1].get_genomic_data().cutV_genomic_CDR3_segs == models[0].get_genomic_data().cutV_genomic_CDR3_segs
+    assert (models[1].get_generative_model().PVJ == models[0].get_generative_model().PVJ).all()
+    assert models[1].get_gene_index('V').locate('TRAV1-2', False) == ('TRAV1-2*01', 'TRAV1-2*02')
+    monkeypatch.setattr('immuno_probs.model.igor_loader.hash_files', None)
+    assert models[1].get_fingerprint() == models[0].get_fingerprint()
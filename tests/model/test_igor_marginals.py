@@ -0,0 +1,57 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test file for testing immuno_probs.model.igor_marginals file."""
+
+
+import numpy
+import olga.load_model as olga_load_model
+import pytest
+
+from immuno_probs.model.igor_marginals import IgorMarginals
+
+
+@pytest.mark.parametrize(
+    'infile, expected',
+    [
+        ('tests/data/human_t_alpha/model_marginals.txt', 'VJ'),
+        ('immuno_probs/data/human_t_beta/model_marginals.txt', 'VDJ'),
+        ('immuno_probs/data/human_b_heavy/model_marginals.txt', 'VDJ')
+    ]
+)
+def test_igor_marginals(infile, expected):
+    """Test if the marginals file is parsed into the same arrays as OLGA's marginals file reader.
+
+    Parameters
+    ----------
+    infile : str
+        A file path to an IGoR model marginals file.
+    expected : str
+        The expected model type of the marginals file.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    marginals = IgorMarginals(infile)
+    olga_model = olga_load_model.read_igor_marginals_txt(infile, dim_names=True)
+    assert marginals.get_model_type() == expected
+    assert marginals.dimensions == olga_model[1]
+    assert sorted(marginals.arrays) == sorted(olga_model[0])
+    for event, array in olga_model[0].items():
+        assert numpy.array_equal(marginals.get_array(event), array)
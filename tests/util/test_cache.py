@@ -0,0 +1,242 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test file for testing immuno_probs.util.cache file."""
+
+
+import os
+import stat
+import time
+
+import pytest
+
+from immuno_probs.util.cache import LRUCache, PgenStore, hash_files, get_cache_dir, is_private_dir, clean_cache_dir
+from immuno_probs.util.constant import CONFIG_DATA
+
+
+@pytest.mark.parametrize(
+    'max_size, items, lookups, expected',
+    [
+        (
+            2,
+            [('a', 1), ('b', 2), ('c', 3)],
+            ['a', 'b', 'c'],
+            [None, 2, 3]
+        ),
+        (
+            2,
+            [('a', 1), ('b', 2), ('a', 4), ('c', 3)],
+            ['a', 'b', 'c'],
+            [4, None, 3]
+        )
+    ]
+)
+def test_lru_cache(max_size, items, lookups, expected):
+    """Test if the cache discards the least recently used items and counts the hits and misses.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of items in the cache.
+    items : list
+        Containing key and value pairs to add to the cache.
+    lookups : list
+        Containing the keys to look up after adding the items.
+    expected : list
+        The expected values for each of the lookups.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    cache = LRUCache(max_size=max_size)
+    for key, value in items:
+        cache.put(key, value)
+    assert len(cache) == max_size
+    assert [cache.get(key) for key in lookups] == expected
+    assert cache.hits == len([i for i in expected if i is not None])
+    assert cache.misses == len([i for i in expected if i is None])
+
+
+@pytest.mark.parametrize(
+    'items, lookups, expected',
+    [
+        (
+            [((True, '01', 'TGT', 'C'), 0.1, 0.2), ((False, None, 'TGC', 'C'), float('nan'), 0.3)],
+            [(True, '01', 'TGT', 'C'), (False, None, 'TGC', 'C'), (True, '01', 'TTT', 'F')],
+            [(0.1, 0.2), (None, 0.3), None]
+        )
+    ]
+)
+def test_pgen_store(tmpdir, items, lookups, expected):
+    """Test if the Pgen values are persisted per model and NaN values survive the round trip.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory for writing the database file to.
+    items : list
+        Containing key, nucleotide Pgen and aminoacid Pgen tuples to store.
+    lookups : list
+        Containing the keys to look up after reopening the store.
+    expected : list
+        The expected (nucleotide, aminoacid) values for each of the lookups, None values indicate NaN or missing keys.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    file = os.path.join(str(tmpdir), 'pgen.sqlite')
+    store = PgenStore(file=file)
+    store.put_many('model_a', items)
+    store.close()
+    store = PgenStore(file=file)
+    found = store.get_many('model_a', lookups)
+    for key, value in zip(lookups, expected):
+        if value is None:
+            assert key not in found
+        else:
+            assert [None if i != i else i for i in found[key]] == list(value)
+    assert store.get_many('model_b', lookups) == {}
+    store.close()
+
+
+@pytest.mark.parametrize(
+    'contents, salt, expected_equal',
+    [
+        (['ACGT', 'ACGT'], '', True),
+        (['ACGT', 'ACGA'], '', False),
+        (['ACGT', 'ACGT'], 'VJ', False)
+    ]
+)
+def test_hash_files(tmpdir, contents, salt, expected_equal):
+    """Test if the file hash only changes when the content of the file or the salt changes.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the files to.
+    contents : list
+        Containing the content of the first and second file to hash.
+    salt : str
+        The salt value to hash the second file with.
+    expected_equal : bool
+        True if the hash values are expected to be the same.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    files = []
+    for i, content in enumerate(contents):
+        files.append(os.path.join(str(tmpdir), 'file_{}'.format(i)))
+        with open(files[-1], 'w') as outfile:
+            outfile.write(content)
+    assert (hash_files(files=[files[0]]) == hash_files(files=[files[1]], salt=salt)) == expected_equal
+
+
+@pytest.mark.parametrize(
+    'use_cache, cache_mode, expected',
+    [
+        ('true', None, 'references'),
+        ('true', 0o755, 'references'),
+        ('true', 0o777, None),
+        ('false', None, None)
+    ]
+)
+def test_get_cache_dir(tmpdir, use_cache, cache_mode, expected):
+    """Test if the private cache directory is created in the configured location, or disabled.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory for creating the cache directory in.
+    use_cache : str
+        The configured value for using the cache.
+    cache_mode : int
+        The permissions of the existing cache directory, None if it does not exist yet.
+    expected : str
+        The expected name of the created cache directory, None if caching is disabled.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    base_dir = os.path.join(str(tmpdir), 'cache')
+    if cache_mode is not None:
+        os.mkdir(base_dir)
+        os.chmod(base_dir, cache_mode)
+    options = dict((i, CONFIG_DATA.get('EXPERT', i)) for i in ['USE_CACHE', 'CACHE_DIR'])
+    try:
+        CONFIG_DATA.set('EXPERT', 'USE_CACHE', use_cache)
+        CONFIG_DATA.set('EXPERT', 'CACHE_DIR', base_dir)
+        result = get_cache_dir('references')
+    finally:
+        for option, value in options.items():
+            CONFIG_DATA.set('EXPERT', option, value)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == os.path.join(base_dir, expected)
+        assert os.path.isdir(result)
+        assert stat.S_IMODE(os.stat(result).st_mode) == 0o700
+        assert is_private_dir(base_dir)
+
+
+@pytest.mark.parametrize(
+    'ages, max_age, expected',
+    [
+        ([1, 10, 40], 30, ['file_0', 'file_1']),
+        ([1, 10, 40], 5, ['file_0']),
+        ([1, 10, 40], 0, ['file_0', 'file_1', 'file_2'])
+    ]
+)
+def test_clean_cache_dir(tmpdir, ages, max_age, expected):
+    """Test if the files that have not been used for the maximum number of days are removed from the cache directory.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to use as cache directory.
+    ages : list
+        The number of days since each of the files was last used.
+    max_age : float
+        The maximum number of days since a file was last used.
+    expected : list
+        The names of the files that are expected to be kept.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    for i, age in enumerate(ages):
+        file = os.path.join(str(tmpdir), 'file_{}'.format(i))
+        with open(file, 'w') as outfile:
+            outfile.write('cached')
+        modified = time.time() - age * 86400
+        os.utime(file, (modified, modified))
+    assert clean_cache_dir(str(tmpdir), max_age) == len(ages) - len(expected)
+    assert sorted(os.listdir(str(tmpdir))) == expected
@@ -18,10 +18,17 @@
 """Test file for testing immuno_probs.util.io file."""
 
 
+import bz2
+import gzip
+import os
+from shutil import copyfileobj
+
 import pandas
 import pytest
 
-from immuno_probs.util.io import read_fasta_as_dataframe
+from immuno_probs.util.io import read_fasta_as_dataframe, read_separated_to_dataframe, write_dataframe_to_separated, \
+    append_dataframe_to_separated, detect_input_file, copy_to_dir, preprocess_separated_file, write_dataframe_to_columnar, \
+    preprocess_reference_file, ColumnarFileWriter
 
 
 @pytest.mark.parametrize(
@@ -63,3 +70,554 @@ def test_read_fasta_as_dataframe(file, expected):
     """
     result = read_fasta_as_dataframe(file=file, col='nt_sequence')
     assert (result.head() == expected).all().all()
+
+
+@pytest.mark.parametrize(
+    'chunks, separator, compression',
+    [
+        (
+            [
+                pandas.DataFrame([['TGTGCC', 'CA'], ['TGTGCA', 'CA']], columns=['nt_sequence', 'aa_sequence']),
+                pandas.DataFrame([['TGTGCT', 'CA']], columns=['nt_sequence', 'aa_sequence'], index=[2])
+            ],
+            '\t',
+            None
+        ),
+        (
+            [
+                pandas.DataFrame([['TGTGCC', 'CA'], ['TGTGCA', 'CA']], columns=['nt_sequence', 'aa_sequence']),
+                pandas.DataFrame([['TGTGCT', 'CA']], columns=['nt_sequence', 'aa_sequence'], index=[2]),
+                pandas.DataFrame([['TGTGCG', 'CA']], columns=['nt_sequence', 'aa_sequence'], index=[3])
+            ],
+            ',',
+            'gz'
+        ),
+        (
+            [
+                pandas.DataFrame([['TGTGCC', 'CA'], ['TGTGCA', 'CA']], columns=['nt_sequence', 'aa_sequence']),
+                pandas.DataFrame([['TGTGCT', 'CA']], columns=['nt_sequence', 'aa_sequence'], index=[2]),
+                pandas.DataFrame([['TGTGCG', 'CA']], columns=['nt_sequence', 'aa_sequence'], index=[3])
+            ],
+            '\t',
+            'bz2'
+        )
+    ]
+)
+def test_append_dataframe_to_separated(tmpdir, chunks, separator, compression):
+    """Test if dataframe chunks can be appended to a single separated file.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the file to.
+    chunks : list
+        Containing the pandas dataframe chunks to write.
+    separator : str
+        A separator character used for separating the fields in the file.
+    compression : str
+        The extension of the compression to write the file with.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    directory, filename = write_dataframe_to_separated(
+        dataframe=chunks[0], filename='chunks', directory=str(tmpdir), separator=separator, index_name='seq_index',
+        compression=compression)
+    if compression:
+        assert filename.endswith('.' + compression)
+    for chunk in chunks[1:]:
+        append_dataframe_to_separated(
+            dataframe=chunk, filename=filename, directory=directory, separator=separator, index_name='seq_index')
+    result = read_separated_to_dataframe(
+        file=os.path.join(directory, filename), separator=separator, index_col='seq_index')
+    assert (result == pandas.concat(chunks)).all().all()
+
+
+@pytest.mark.parametrize(
+    'compression, module',
+    [
+        ('xz', 'backports.lzma'),
+        ('zst', 'zstandard')
+    ]
+)
+def test_write_compressed_separated(tmpdir, compression, module):
+    """Test if dataframe chunks can be written to and read from a xz or zstd compressed separated file.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the file to.
+    compression : str
+        The extension of the compression to write the file with.
+    module : str
+        The name of the module required for the compression, the test is skipped if not installed.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    pytest.importorskip(module)
+    chunks = [
+        pandas.DataFrame([['TGTGCC', 'CA'], ['TGTGCA', 'CA']], columns=['nt_sequence', 'aa_sequence']),
+        pandas.DataFrame([['TGTGCT', 'CA']], columns=['nt_sequence', 'aa_sequence'], index=[2])
+    ]
+    directory, filename = write_dataframe_to_separated(
+        dataframe=chunks[0], filename='chunks', directory=str(tmpdir), separator='\t', index_name='seq_index',
+        compression=compression)
+    assert filename == 'chunks.tsv.' + compression
+    append_dataframe_to_separated(
+        dataframe=chunks[1], filename=filename, directory=directory, separator='\t', index_name='seq_index')
+    result = read_separated_to_dataframe(
+        file=os.path.join(directory, filename), separator='\t', index_col='seq_index')
+    assert (result == pandas.concat(chunks)).all().all()
+
+
+@pytest.mark.parametrize(
+    'file, chunksize, expected_sizes',
+    [
+        ('tests/data/human_t_beta/ref_genomes/TRBJ.fasta', 5, [5, 5, 5, 1]),
+        ('tests/data/human_t_beta/ref_genomes/TRBJ.fasta', 100, [16])
+    ]
+)
+def test_read_fasta_as_dataframe_chunks(file, chunksize, expected_sizes):
+    """Test if the FASTA file can be read in chunks that combine into the same pandas.DataFrame.
+
+    Parameters
+    ----------
+    file : str
+        Location of the FASTA file to be read in.
+    chunksize : int
+        The maximum number of records in each chunk.
+    expected_sizes : list
+        The expected number of records in each of the chunks.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    chunks = list(read_fasta_as_dataframe(file=file, col='nt_sequence', header='name', chunksize=chunksize))
+    assert [len(i) for i in chunks] == expected_sizes
+    expected = read_fasta_as_dataframe(file=file, col='nt_sequence', header='name')
+    pandas.testing.assert_frame_equal(pandas.concat(chunks), expected, check_index_type=False)
+
+
+@pytest.mark.parametrize(
+    'file, chunksize, expected_sizes',
+    [
+        ('tests/data/human_t_beta/10_sequence_samples.tsv', 4, [4, 4, 2]),
+        ('tests/data/human_t_beta/10_sequence_samples.tsv', 10, [10])
+    ]
+)
+def test_read_separated_to_dataframe_chunks(file, chunksize, expected_sizes):
+    """Test if the separated file can be read in chunks that combine into the same pandas.DataFrame.
+
+    Parameters
+    ----------
+    file : str
+        Location of the separated file to be read in.
+    chunksize : int
+        The maximum number of rows in each chunk.
+    expected_sizes : list
+        The expected number of rows in each of the chunks.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    chunks = list(read_separated_to_dataframe(file=file, separator='\t', chunksize=chunksize))
+    assert [len(i) for i in chunks] == expected_sizes
+    expected = read_separated_to_dataframe(file=file, separator='\t')
+    pandas.testing.assert_frame_equal(pandas.concat(chunks).astype(object), expected.astype(object))
+
+
+@pytest.mark.parametrize(
+    'content, expected',
+    [
+        ('>seq_1\nACGT\n>seq_2\nTTGA\n', 'fasta'),
+        ('# A comment line.\n\n>seq_1\nACGT\n', 'fasta'),
+        ('nt_sequence\tv_gene_choice\nACGT\tTRBV1\n', 'separated'),
+        ('nt_sequence\tv_gene_choice\n', None),
+        ('', None)
+    ]
+)
+def test_detect_input_file(tmpdir, content, expected):
+    """Test if the input file format is detected from the start of the file and cached.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory for writing the input file to.
+    content : str
+        The content of the input file.
+    expected : str
+        The expected file type of the reader, None if the format should not be detected.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    file = os.path.join(str(tmpdir), 'input_file')
+    with open(file, 'w') as outfile:
+        outfile.write(content)
+    reader = detect_input_file(file, '\t')
+    if expected is None:
+        assert reader is None
+    else:
+        assert reader.file_type == expected
+        assert reader.is_fasta() == (expected == 'fasta')
+        assert detect_input_file(file, '\t') is reader
+        assert len(reader.read(col='nt_sequence')) > 0
+
+
+@pytest.mark.parametrize(
+    'separator, expected_dtypes',
+    [
+        ('\t', {'nt_sequence': 'object', 'cdr3_length': 'int64', 'v_resolved': 'category', 'frame_type': 'object'}),
+        (r'\t', {'nt_sequence': 'object', 'cdr3_length': 'int64', 'v_resolved': 'category', 'frame_type': 'object'})
+    ]
+)
+def test_read_separated_to_dataframe_dtypes(separator, expected_dtypes):
+    """Test if the known columns are read with their declared data types by the C engine as well as the python engine.
+
+    Parameters
+    ----------
+    separator : str
+        A separator character used for separating the fields in the file.
+    expected_dtypes : dict
+        Containing the column names with their expected data type name.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    result = read_separated_to_dataframe(file='tests/data/human_t_beta/10_sequence_samples.tsv', separator=separator)
+    for col, dtype in expected_dtypes.items():
+        assert str(result[col].dtype) == dtype
+    assert isinstance(result['v_resolved'].values[0], str)
+
+
+@pytest.mark.parametrize(
+    'chunksize, expected_sizes',
+    [
+        (None, [6]),
+        (2, [2, 2, 2]),
+        (4, [4, 2])
+    ]
+)
+def test_read_separated_to_dataframe_fallback(tmpdir, chunksize, expected_sizes):
+    """Test if the python engine is used when the C engine fails to parse a (chunk of the) file, without changing the columns.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the file to.
+    chunksize : int
+        The maximum number of rows in each chunk, None to read the whole file at once.
+    expected_sizes : list
+        The expected number of rows in each of the chunks.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    file = os.path.join(str(tmpdir), 'input_file.tsv')
+    with open(file, 'w') as outfile:
+        outfile.write('seq_index\tnt_sequence\tcount\n')
+        for index, count in enumerate(['1', '2', '3', '4', 'x', '6']):
+            outfile.write('{}\tTGTGCC\t{}\n'.format(index, count))
+    cols = ['nt_sequence', 'count']
+    result = read_separated_to_dataframe(file=file, separator='\t', index_col='seq_index', cols=cols,
+                                         chunksize=chunksize, dtypes={'count': 'int64'})
+    chunks = [result] if chunksize is None else list(result)
+    assert [len(i) for i in chunks] == expected_sizes
+    result = pandas.concat(chunks)
+    assert result.index.tolist() == list(range(6))
+    assert result['count'].astype(str).tolist() == ['1', '2', '3', '4', 'x', '6']
+    assert cols == ['nt_sequence', 'count']
+
+
+@pytest.mark.parametrize(
+    'file, compression, expected_type',
+    [
+        ('tests/data/human_t_beta/ref_genomes/TRBJ.fasta', gzip.open, 'fasta'),
+        ('tests/data/human_t_beta/10_sequence_samples.tsv', gzip.open, 'separated'),
+        ('tests/data/human_t_beta/10_sequence_samples.tsv', bz2.BZ2File, 'separated')
+    ]
+)
+def test_read_compressed_input_file(tmpdir, file, compression, expected_type):
+    """Test if compressed input files are detected, read and decompressed like the uncompressed file.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the compressed file to.
+    file : str
+        Location of the uncompressed input file.
+    compression : function
+        The function for opening the compressed file for writing.
+    expected_type : str
+        The expected detected file format.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    extension = {gzip.open: '.gz', bz2.BZ2File: '.bz2'}[compression]
+    compressed_file = os.path.join(str(tmpdir), os.path.basename(file) + extension)
+    with open(file, 'rb') as infile, compression(compressed_file, 'wb') as outfile:
+        copyfileobj(infile, outfile)
+
+    # Compare the detected and read in files.
+    reader = detect_input_file(compressed_file, '\t')
+    assert reader.file_type == expected_type
+    expected = detect_input_file(file, '\t').read(col='nt_sequence', index_col='seq_index')
+    result = reader.read(col='nt_sequence', index_col='seq_index')
+    assert result.astype(object).equals(expected.astype(object))
+    chunks = list(reader.read(col='nt_sequence', index_col='seq_index', chunksize=3))
+    assert sum(len(i) for i in chunks) == len(expected)
+
+    # Check that the decompressed copy is equal to the original file.
+    copied_file = copy_to_dir(str(tmpdir), compressed_file, os.path.splitext(file)[1][1:])
+    assert not copied_file.endswith(extension)
+    with open(file, 'rb') as infile, open(copied_file, 'rb') as copyfile:
+        assert infile.read() == copyfile.read()
+    if expected_type == 'separated':
+        assert preprocess_separated_file(os.path.join(str(tmpdir), 'input'), compressed_file, '\t', '\t') \
+            != compressed_file
+
+
+@pytest.mark.parametrize(
+    'file_format, expected',
+    [
+        ('parquet', 'pgen.parquet'),
+        ('feather', 'pgen.feather'),
+        ('hdf5', ValueError)
+    ]
+)
+def test_write_dataframe_to_columnar(tmpdir, file_format, expected):
+    """Test if the dataframe is written to a columnar file, keeping the gene and Pgen column types.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the file to.
+    file_format : str
+        The columnar file format to write.
+    expected : str or Exception
+        The expected name of the written file, or the raised exception.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    dataframe = pandas.DataFrame(
+        [['TGTGCC', 'TRBV5-1*01', 1.5e-10], ['TGTGCA', 'TRBV6-1*01', float('nan')]],
+        columns=['nt_sequence', 'v_gene_choice', 'nt_pgen_estimate'],
+        index=pandas.Index([4, 5], name='seq_index'))
+    if not isinstance(expected, str):
+        with pytest.raises(expected):
+            write_dataframe_to_columnar(
+                dataframe=dataframe, filename='pgen', directory=str(tmpdir), file_format=file_format)
+        return
+    pytest.importorskip('pyarrow')
+    directory, filename = write_dataframe_to_columnar(
+        dataframe=dataframe, filename='pgen', directory=str(tmpdir), file_format=file_format, index_name='seq_index')
+    assert filename == expected
+    if file_format == 'parquet':
+        result = pandas.read_parquet(os.path.join(directory, filename))
+    else:
+        result = pandas.read_feather(os.path.join(directory, filename))
+    assert list(result['seq_index']) == [4, 5]
+    assert str(result['v_gene_choice'].dtype) == 'category'
+    assert str(result['nt_pgen_estimate'].dtype) == 'float64'
+
+
+@pytest.mark.parametrize(
+    'file_format, expected',
+    [
+        ('parquet', 'pgen.parquet'),
+        ('feather', 'pgen.feather')
+    ]
+)
+def test_columnar_file_writer(tmpdir, file_format, expected):
+    """Test if dataframe chunks with different gene categories are written to a single columnar file.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the file to.
+    file_format : str
+        The columnar file format to write.
+    expected : str
+        The expected name of the written file.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    pytest.importorskip('pyarrow')
+    chunks = [
+        pandas.DataFrame([['TGTGCC', 'TRBV5-1*01', 1.5e-10], ['TGTGCA', 'TRBV6-1*01', float('nan')]],
+                         columns=['nt_sequence', 'v_gene_choice', 'nt_pgen_estimate'],
+                         index=pandas.Index([0, 1], name='seq_index')),
+        pandas.DataFrame([['TGTGCT', 'TRBV7-2*01', 2.5e-10]],
+                         columns=['nt_sequence', 'v_gene_choice', 'nt_pgen_estimate'],
+                         index=pandas.Index([2], name='seq_index'))
+    ]
+    writer = ColumnarFileWriter(filename='pgen', directory=str(tmpdir), file_format=file_format, index_name='seq_index')
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.close()
+    assert writer.filename == expected
+    assert os.listdir(str(tmpdir)) == [expected]
+    if file_format == 'parquet':
+        result = pandas.read_parquet(os.path.join(str(tmpdir), expected))
+    else:
+        result = pandas.read_feather(os.path.join(str(tmpdir), expected))
+    assert list(result['seq_index']) == [0, 1, 2]
+    assert list(result['v_gene_choice']) == ['TRBV5-1*01', 'TRBV6-1*01', 'TRBV7-2*01']
+    assert str(result['v_gene_choice'].dtype) == 'category'
+    assert str(result['nt_pgen_estimate'].dtype) == 'float64'
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'feather'])
+def test_columnar_file_writer_missing_values(tmpdir, file_format):
+    """Test if a first dataframe chunk without values in the gene and other columns does not fix their types to the file.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the file to.
+    file_format : str
+        The columnar file format to write.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    pytest.importorskip('pyarrow')
+    chunks = [
+        pandas.DataFrame([['TGTGCC', float('nan'), float('nan')]],
+                         columns=['nt_sequence', 'v_gene_choice', 'comment']),
+        pandas.DataFrame([['TGTGCA', 'TRBV6-1*01', 'productive']],
+                         columns=['nt_sequence', 'v_gene_choice', 'comment'])
+    ]
+    with ColumnarFileWriter(filename='pgen', directory=str(tmpdir), file_format=file_format) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    if file_format == 'parquet':
+        result = pandas.read_parquet(os.path.join(str(tmpdir), writer.filename))
+    else:
+        result = pandas.read_feather(os.path.join(str(tmpdir), writer.filename))
+    assert list(result['v_gene_choice'].isna()) == [True, False]
+    assert result['v_gene_choice'][1] == 'TRBV6-1*01'
+    assert str(result['v_gene_choice'].dtype) == 'category'
+    assert list(result['comment'].isna()) == [True, False]
+    assert result['comment'][1] == 'productive'
+
+
+@pytest.mark.parametrize(
+    'file, extension, expected_link',
+    [
+        ('tests/data/human_t_beta/ref_genomes/TRBJ.fasta', 'fasta', None),
+        ('tests/data/human_t_beta/ref_genomes/TRBJ.fasta', 'fa', True),
+        ('tests/data/human_t_beta/10_sequence_samples.tsv', 'csv', True)
+    ]
+)
+def test_copy_to_dir(tmpdir, file, extension, expected_link):
+    """Test if files are staged in the directory by linking them instead of copying their content.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to stage the file in.
+    file : str
+        Location of the file to stage.
+    extension : str
+        The extension name of the staged file.
+    expected_link : bool
+        True if the file is expected to be linked, None if the input file is expected to be returned.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    result = copy_to_dir(str(tmpdir), file, extension)
+    if expected_link is None:
+        assert result == file
+        return
+    assert result == os.path.join(str(tmpdir), os.path.splitext(os.path.basename(file))[0] + '.' + extension)
+    assert os.path.islink(result) or os.stat(result).st_ino == os.stat(file).st_ino
+    with open(file, 'rb') as infile, open(result, 'rb') as stagedfile:
+        assert infile.read() == stagedfile.read()
+
+    # Staging the file again replaces the existing link.
+    assert copy_to_dir(str(tmpdir), file, extension) == result
+
+
+@pytest.mark.parametrize(
+    'file, index',
+    [
+        ('tests/data/human_t_beta/ref_genomes/TRBJ.fasta', 1),
+        ('tests/data/human_t_beta/ref_genomes/TRBJ.fasta', None)
+    ]
+)
+def test_preprocess_reference_file_cache(tmpdir, file, index):
+    """Test if the formatted reference file is reused from the cache until the content of the input file changes.
+
+    Parameters
+    ----------
+    tmpdir : py.path.local
+        A temporary directory to write the files to.
+    file : str
+        Location of the reference FASTA file.
+    index : int
+        Index of the header line to keep after splitting on '|'.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    cache_dir = os.path.join(str(tmpdir), 'cache')
+    os.makedirs(cache_dir)
+    expected = preprocess_reference_file(os.path.join(str(tmpdir), 'plain'), file, index)
+    result = preprocess_reference_file(os.path.join(str(tmpdir), 'first'), file, index, cache_dir=cache_dir)
+    assert os.path.dirname(result) == cache_dir
+    with open(expected, 'r') as expected_file, open(result, 'r') as result_file:
+        assert expected_file.read() == result_file.read()
+    assert preprocess_reference_file(os.path.join(str(tmpdir), 'second'), file, index, cache_dir=cache_dir) == result
+
+    # Modify the input file, which should create a new cached file.
+    modified_file = os.path.join(str(tmpdir), os.path.basename(file))
+    with open(file, 'r') as infile, open(modified_file, 'w') as outfile:
+        outfile.write(infile.read().lower())
+    assert preprocess_reference_file(os.path.join(str(tmpdir), 'third'), modified_file, index, cache_dir=cache_dir) \
+        != result
+    assert len(os.listdir(cache_dir)) == 2
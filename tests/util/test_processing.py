@@ -20,7 +20,11 @@
 
 import pytest
 
-from immuno_probs.util.processing import multiprocess_array
+from immuno_probs.util import processing
+from immuno_probs.util.processing import WorkerPool, close_shared_pools, get_shared_pool, multiprocess_array
+
+
+WORKER_DATA = {}
 
 
 def sum_integers_plus_value(args):
@@ -29,6 +33,22 @@ def sum_integers_plus_value(args):
     return sum(ary) + kwargs['plus']
 
 
+def set_worker_value(value):
+    """Sets the value to add in the worker process."""
+    WORKER_DATA['plus'] = value
+
+
+def set_worker_first_value(values):
+    """Sets the first of the given values as the value to add in the worker process."""
+    WORKER_DATA['plus'] = values[0]
+
+
+def sum_integers_plus_worker_value(args):
+    """Sums list of integers and add the integer set by the worker initializer to the sum."""
+    ary, _ = args
+    return sum(ary) + WORKER_DATA['plus']
+
+
 @pytest.mark.parametrize(
     'ary, func, num_workers, plus, expected',
     [
@@ -80,3 +100,199 @@ def test_multiprocess_array(ary, func, num_workers, plus, expected):
     result = multiprocess_array(ary=ary, func=func, num_workers=num_workers,
                                 plus=plus)
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    'ary, num_workers, plus, expected',
+    [
+        (
+            [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+            1,
+            10,
+            [55]
+        ),
+        (
+            [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+            2,
+            5,
+            [15, 40]
+        )
+    ]
+)
+def test_multiprocess_array_initializer(ary, num_workers, plus, expected):
+    """Test if the worker processes are initialized once and use the values set by the initializer.
+
+    Parameters
+    ----------
+    ary : list
+        List 'like' object to be split for multiple workers.
+    num_workers : int
+        The number of workers/threads to spawn.
+    plus : int
+        The value to set in the worker processes through the initializer.
+    expected : list
+        The expected output list with values.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    result = multiprocess_array(ary=ary, func=sum_integers_plus_worker_value, num_workers=num_workers,
+                                initializer=set_worker_value, initargs=(plus,))
+    assert result == expected
+    assert 'plus' not in WORKER_DATA
+
+
+def test_multiprocess_array_pool_key():
+    """Test if the shared pools with initializer arguments are identified by the pool key, and not by the arguments.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    ary = [0, 1, 2, 3]
+    plus = [1]
+    result = multiprocess_array(ary=ary, func=sum_integers_plus_worker_value, num_workers=2,
+                                initializer=set_worker_first_value, initargs=(plus,), pool_key='a')
+    assert result == [2, 6]
+    assert get_shared_pool(num_workers=2, initializer=set_worker_first_value, initargs=(plus,), key='a') is \
+        get_shared_pool(num_workers=2, initializer=set_worker_first_value, initargs=(plus,), key='a')
+
+    # Changing the arguments in place requires a new key, or no key to use a new pool.
+    plus[0] = 2
+    assert multiprocess_array(ary=ary, func=sum_integers_plus_worker_value, num_workers=2,
+                              initializer=set_worker_first_value, initargs=(plus,), pool_key='b') == [3, 7]
+    plus[0] = 3
+    assert multiprocess_array(ary=ary, func=sum_integers_plus_worker_value, num_workers=2,
+                              initializer=set_worker_first_value, initargs=(plus,)) == [4, 8]
+    with pytest.raises(ValueError):
+        get_shared_pool(num_workers=2, initializer=set_worker_first_value, initargs=(plus,))
+    close_shared_pools()
+
+
+@pytest.mark.parametrize(
+    'arys, num_workers, expected',
+    [
+        (
+            [[0, 1, 2, 3], [4, 5], [6]],
+            2,
+            [[1, 5], [4, 5], [6]]
+        )
+    ]
+)
+def test_worker_pool(arys, num_workers, expected):
+    """Test if a pool of worker processes can be reused for multiple calls and shuts down.
+
+    Parameters
+    ----------
+    arys : list
+        Containing multiple list 'like' objects to be split for the workers.
+    num_workers : int
+        The number of workers/threads to spawn.
+    expected : list
+        The expected output lists with values for each of the input arrays.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    with WorkerPool(num_workers=num_workers) as pool:
+        result = [multiprocess_array(ary=i, func=sum_integers_plus_value, num_workers=num_workers, pool=pool, plus=0)
+                  for i in arys]
+        assert result == expected
+    assert pool.pool is None
+
+    # The shared pools are reused for the same number of workers and initializer.
+    shared_pool = get_shared_pool(num_workers=num_workers)
+    result = [multiprocess_array(ary=i, func=sum_integers_plus_value, num_workers=num_workers, plus=0) for i in arys]
+    assert result == expected
+    assert get_shared_pool(num_workers=num_workers) is shared_pool
+    close_shared_pools()
+    assert shared_pool.pool is None
+    assert get_shared_pool(num_workers=num_workers) is not shared_pool
+
+
+@pytest.mark.parametrize(
+    'ary, num_workers, chunk_size, expected',
+    [
+        (
+            [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+            2,
+            0,
+            [10, 35]
+        ),
+        (
+            [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+            2,
+            3,
+            [3, 12, 13, 17]
+        ),
+        (
+            [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+            4,
+            100,
+            [3, 12, 13, 17]
+        )
+    ]
+)
+def test_multiprocess_array_chunk_size(ary, num_workers, chunk_size, expected):
+    """Test if the array is divided into segments of the given chunk size, with at least one segment per worker.
+
+    Parameters
+    ----------
+    ary : list
+        List 'like' object to be split for multiple workers.
+    num_workers : int
+        The number of workers/threads to spawn.
+    chunk_size : int
+        The maximum number of items in a segment.
+    expected : list
+        The expected output list with values.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    result = multiprocess_array(ary=ary, func=sum_integers_plus_value, num_workers=num_workers, chunk_size=chunk_size,
+                                plus=0)
+    assert result == expected
+
+
+def test_shared_pool_eviction(monkeypatch):
+    """Test if the shared pools are reused for any array size and the least recently used pools are shut down.
+
+    Parameters
+    ----------
+    monkeypatch : _pytest.monkeypatch.MonkeyPatch
+        Object for lowering the maximum number of shared pools.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    close_shared_pools()
+    monkeypatch.setattr(processing, 'MAX_SHARED_POOLS', 2)
+    assert multiprocess_array(ary=[1, 2], func=sum_integers_plus_value, num_workers=4, plus=0) == [1, 2]
+    assert multiprocess_array(ary=[1], func=sum_integers_plus_value, num_workers=4, plus=0) == [1]
+    assert multiprocess_array(ary=[], func=sum_integers_plus_value, num_workers=4, plus=0) == []
+    assert [i.num_workers for i in processing._SHARED_POOLS.values()] == [4]
+    first_pool = get_shared_pool(num_workers=2)
+    second_pool = get_shared_pool(num_workers=3)
+    assert first_pool.pool is not None
+    get_shared_pool(num_workers=2)
+    get_shared_pool(num_workers=1)
+    assert second_pool.pool is None
+    assert first_pool.pool is not None
+    assert len(processing._SHARED_POOLS) == 2
+    close_shared_pools()
+    assert first_pool.pool is None
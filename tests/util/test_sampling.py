@@ -0,0 +1,113 @@
+# Create IGoR models and calculate the generation probability of V(D)J and
+# CDR3 sequences. Copyright (C) 2019 Wout van Helvoirt
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test file for testing immuno_probs.util.sampling file."""
+
+
+import numpy
+import pandas
+import pytest
+
+from immuno_probs.util.sampling import reservoir_sample
+
+
+def get_frame_strata(chunk):
+    """Returns the frame type of each row as stratum, except for the 'Other' frame type."""
+    return chunk['frame_type'].where(chunk['frame_type'] != 'Other')
+
+
+@pytest.mark.parametrize(
+    'size, chunk_size, expected',
+    [
+        (10, 1000, {'In': 10, 'Out': 10}),
+        (10, 7, {'In': 10, 'Out': 10}),
+        (500, 100, {'In': 500, 'Out': 250}),
+    ]
+)
+def test_reservoir_sample(size, chunk_size, expected):
+    """Test if the given number of rows is sampled for each stratum, independent of the chunk size.
+
+    Parameters
+    ----------
+    size : int
+        The number of rows to sample for each stratum.
+    chunk_size : int
+        The number of rows in each chunk.
+    expected : dict
+        The expected number of sampled rows for each stratum.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    dataframe = pandas.DataFrame({'frame_type': ['In', 'Out', 'In', 'Other'] * 250, 'value': range(1000)})
+    chunks = [dataframe.iloc[i:i + chunk_size] for i in range(0, len(dataframe), chunk_size)]
+    sample = reservoir_sample(chunks=chunks, size=size, strata=get_frame_strata, random_state=42)
+    assert sample['frame_type'].value_counts().to_dict() == expected
+    assert sample.index.is_unique
+    assert (dataframe.loc[sample.index, 'value'] == sample['value']).all()
+    whole = reservoir_sample(chunks=[dataframe], size=size, strata=get_frame_strata,
+                             random_state=numpy.random.RandomState(42))
+    assert sample.index.tolist() == whole.index.tolist()
+    with pytest.raises(ValueError):
+        reservoir_sample(chunks=chunks, size=0, strata=get_frame_strata)
+
+
+@pytest.mark.parametrize(
+    'size, chunk_size',
+    [
+        (10, 1000),
+        (10, 7),
+        (300, 100)
+    ]
+)
+def test_reservoir_sample_accept(size, chunk_size):
+    """Test if the accepted rows with the smallest keys are sampled, trying at most the given number of rows at a time.
+
+    Parameters
+    ----------
+    size : int
+        The number of rows to sample for each stratum.
+    chunk_size : int
+        The number of rows in each chunk.
+
+    Raises
+    -------
+    AssertionError
+        If the performed test failed.
+
+    """
+    dataframe = pandas.DataFrame({'frame_type': ['In', 'Out', 'In', 'Other'] * 250, 'value': range(1000)})
+    chunks = [dataframe.iloc[i:i + chunk_size] for i in range(0, len(dataframe), chunk_size)]
+    tried = []
+
+    def accept(rows):
+        """Accepts the rows with a value that is not a multiple of three."""
+        assert 0 < len(rows) <= size
+        assert rows['frame_type'].nunique() == 1
+        tried.extend(rows.index)
+        return (rows['value'] % 3 != 0).values
+
+    sample = reservoir_sample(chunks=chunks, size=size, strata=get_frame_strata, random_state=42, accept=accept)
+    assert len(tried) == len(set(tried))
+
+    # Compare with trying all of the rows in key order.
+    keys = pandas.Series(numpy.random.RandomState(42).random_sample(len(dataframe)), index=dataframe.index)
+    accepted = dataframe[(dataframe['frame_type'] != 'Other') & (dataframe['value'] % 3 != 0)]
+    expected = accepted.loc[keys[accepted.index].sort_values(kind='mergesort').index].groupby('frame_type').head(size)
+    assert sample.index.tolist() == expected.index.tolist()